@@ -0,0 +1,121 @@
+# benchmarks/bench_json_formatter.py
+"""
+Records/detik JSONFormatter: versi lama (disalin di bawah) vs versi sekarang dengan json stdlib
+dan dengan orjson (kalau terpasang). Output tiap varian dicek sama dengan versi lama
+(orjson menulis JSON tanpa spasi, jadi dibandingkan setelah di-parse).
+
+    uv run python benchmarks/bench_json_formatter.py --records 50000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class LegacyJSONFormatter(logging.Formatter):
+    """Salinan JSONFormatter.format sebelum optimasi (pembanding)."""
+
+    def format(self, record):
+        from pytz import timezone
+        from settings import TZ
+
+        log_data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone(TZ)),
+            "level": record.levelname,
+            "logger_name": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "thread": record.thread,
+            "thread_name": record.threadName,
+        }
+        log_data["process_id"] = record.process
+        log_data["environment"] = os.environ.get("ENVIRONTMENT", "development")
+        log_data["application"] = "be-sercvice"
+        log_data["version"] = os.environ.get("APP_VERSION", "1.0.0")
+        for attr, key in (("request_id", "request_id"), ("user_id", "user_id"), ("endpoint", "endpoint"),
+                          ("method", "method"), ("status_code", "status_code"),
+                          ("response_time", "response_time_ms")):
+            if hasattr(record, attr):
+                log_data[key] = getattr(record, attr)
+        if record.exc_info:
+            log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
+                           'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
+                           'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
+                           'thread', 'threadName', 'processName', 'process', 'getMessage']:
+                if not key.startswith('_'):
+                    log_data[key] = value
+        return json.dumps(log_data, ensure_ascii=False, default=str)
+
+
+def _records():
+    """Campuran record tipikal: log biasa, access log (extra banyak), dan error."""
+    plain = logging.LogRecord("be-service", logging.INFO, __file__, 10, "Job %s completed", ("j-1",), None)
+    access = logging.LogRecord("be-service", logging.INFO, __file__, 20, "GET /result/{job_id} 200", (), None)
+    access.__dict__.update({
+        "event_type": "access", "request_id": "3f2b", "method": "GET", "endpoint": "/result/abc",
+        "route": "/result/{job_id}", "status_code": 200, "response_time": 12.5, "response_size": 2048,
+        "user_agent": "curl/8.5.0", "ip_address": "10.0.0.1", "sample_rate": 1.0,
+    })
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        error = logging.LogRecord("be-service", logging.ERROR, __file__, 30, "Pipeline failed", (), sys.exc_info())
+    return [plain, access, access, access, error]
+
+
+def _run(fmt, records, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fmt.format(records[i % len(records)])
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSONFormatter throughput")
+    parser.add_argument("--records", type=int, default=50000)
+    args = parser.parse_args()
+
+    from core import logging_config
+    from core.logging_config import JSONFormatter, _dumps_json
+
+    records = _records()
+    legacy = LegacyJSONFormatter()
+    variants = [("legacy", legacy)]
+    stdlib = JSONFormatter()
+    stdlib._dumps = _dumps_json
+    variants.append(("json", stdlib))
+    if logging_config.orjson is not None:
+        variants.append(("orjson", JSONFormatter()))
+    else:
+        print("orjson tidak terpasang: varian orjson dilewati")
+
+    for rec in records:
+        rec.exc_text = None
+        expected = legacy.format(rec)
+        for name, fmt in variants[1:]:
+            if json.loads(fmt.format(rec)) != json.loads(expected):
+                print(f"{name}: output berbeda dari legacy untuk {rec.getMessage()!r}")
+
+    base = None
+    for name, fmt in variants:
+        _run(fmt, records, min(args.records, 2000))  # warmup
+        rate = _run(fmt, records, args.records)
+        base = base or rate
+        print(f"{name:>7}: {rate:,.0f} records/s ({rate / base:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# benchmarks/bench_pipeline_modes.py
+"""
+Bandingkan PIPELINE_MODE staged (P1..P4) vs fused (P1 + P5) untuk input yang sama.
+
+    uv run python benchmarks/bench_pipeline_modes.py --runs 5
+    uv run python benchmarks/bench_pipeline_modes.py --cv cv.pdf --project report.pdf \\
+        --cv-ctx rubric_cv.txt --project-ctx rubric_project.txt
+
+Memakai LLM dari .env (LLM_PROVIDER=groq untuk angka nyata; default mock). Cache respons LLM
+dimatikan kecuali --use-cache, supaya setiap run benar-benar memanggil provider.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SAMPLE_CV = """Jane Doe — Backend Engineer
+Jakarta, Indonesia
+
+Summary
+Backend engineer with 4 years building Python services (FastAPI, Django) on PostgreSQL and Redis.
+
+Experience
+Payments API (2021-2024): designed REST and gRPC services on AWS, cut p95 latency by 40%.
+Search platform: built a RAG pipeline with a vector DB and LLM re-ranking; mentored 3 juniors.
+
+Skills
+python, golang, fastapi, postgresql, redis, docker, kubernetes, aws, rest, grpc, rag, llm
+"""
+
+SAMPLE_PROJECT = """Project report: AI CV evaluator
+The service accepts CV and project uploads, runs an async job pipeline and stores results in Postgres.
+Retries with exponential backoff and a circuit breaker protect the LLM calls.
+Unit tests cover scoring and coercion; README documents setup and endpoints.
+Results: 120 evaluations/minute on a single worker, p95 3.2 s.
+"""
+
+SAMPLE_CV_CTX = """CV rubric: skills match (backend, databases, APIs, cloud, AI), experience level and complexity,
+relevant achievements with measurable impact, cultural fit (communication, learning, teamwork).
+
+Job description: Backend engineer building APIs, integrating LLMs and RAG, owning reliability."""
+
+SAMPLE_PROJECT_CTX = """Project rubric: correctness (prompt design, chaining, RAG), code quality (modular, tested),
+resilience and error handling (retries, timeouts), documentation, creativity/bonus."""
+
+
+def _read(path: str, default: str) -> str:
+    if not path:
+        return default
+    from repository.extract_text import extract_text_from_file
+
+    return extract_text_from_file(path)
+
+
+def _pct(values, q: float) -> float:
+    xs = sorted(values)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark staged vs fused evaluation pipeline")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--cv", default="")
+    parser.add_argument("--project", default="")
+    parser.add_argument("--cv-ctx", default="")
+    parser.add_argument("--project-ctx", default="")
+    parser.add_argument("--use-cache", action="store_true", help="keep the LLM response cache enabled")
+    args = parser.parse_args()
+
+    if not args.use_cache:
+        os.environ["LLM_CACHE_ENABLED"] = "0"
+    os.environ.setdefault("USE_LLM", "1")
+
+    from repository.llm_client import get_llm
+    from repository.pipeline import _llm_stages
+    from repository.stages import run_stages
+    from settings import PIPELINE_MAX_WORKERS
+
+    cv_text = _read(args.cv, SAMPLE_CV)
+    project_text = _read(args.project, SAMPLE_PROJECT)
+    cv_ctx = _read(args.cv_ctx, SAMPLE_CV_CTX)
+    project_ctx = _read(args.project_ctx, SAMPLE_PROJECT_CTX)
+    llm = get_llm()
+    print(f"llm={type(llm).__name__} runs={args.runs}")
+
+    for mode in ("staged", "fused"):
+        wall_ms, prompt_tok, usage_tok, calls = [], [], [], 0
+        for _ in range(args.runs):
+            llm_metrics, prompt_tokens = {}, {}
+            t0 = time.perf_counter()
+            run_stages(
+                _llm_stages(
+                    llm,
+                    cv_text=cv_text,
+                    project_text=project_text,
+                    cv_ctx=cv_ctx,
+                    project_ctx=project_ctx,
+                    job_title="Backend Engineer",
+                    warnings=[],
+                    llm_raw={},
+                    engines={},
+                    llm_metrics=llm_metrics,
+                    prompt_tokens=prompt_tokens,
+                    mode=mode,
+                ),
+                max_workers=PIPELINE_MAX_WORKERS,
+            )
+            wall_ms.append((time.perf_counter() - t0) * 1000)
+            prompt_tok.append(sum(prompt_tokens.values()))
+            calls = len(prompt_tokens)
+            usage_tok.append(sum(
+                ((m or {}).get("usage") or {}).get("total_tokens", 0) for m in llm_metrics.values()
+            ))
+        print(
+            f"{mode:>6}: calls/job={calls} "
+            f"latency mean={statistics.mean(wall_ms):.0f}ms p50={_pct(wall_ms, 0.5):.0f}ms "
+            f"p95={_pct(wall_ms, 0.95):.0f}ms "
+            f"input_tokens(est)={statistics.mean(prompt_tok):.0f} "
+            f"provider_tokens={statistics.mean(usage_tok):.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
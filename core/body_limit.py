@@ -0,0 +1,73 @@
+"""
+Body Size Limit Middleware (ASGI murni)
+Tolak request yang body-nya melebihi batas sebelum parsing multipart/JSON dimulai.
+Ini satu-satunya batas ukuran yang berlaku selama body masih diterima; batas per tipe file
+(repository/upload_store.py) baru dicek setelah Starlette men-spool seluruh part.
+"""
+import json
+
+
+class BodySizeLimitMiddleware:
+    """
+    - Content-Length di atas batas: langsung 413 tanpa membaca body.
+    - Tanpa Content-Length (chunked): byte dihitung saat dibaca; begitu lewat batas, 413 dikirim
+      dan app menerima http.disconnect (exception di parser body diubah FastAPI jadi 400,
+      jadi respons app sesudahnya dibuang).
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = int(max_bytes)
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({"detail": f"Request body exceeds {self.max_bytes} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers") or ():
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > self.max_bytes
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not started:
+                        await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    LRU in-memory thread-safe dengan TTL opsional (ttl <= 0 berarti tidak kadaluarsa).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_sec: float = 0.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_sec = float(ttl_sec or 0.0)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            ts, value = item
+            if self.ttl_sec > 0 and time.time() - ts > self.ttl_sec:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+
+class DiskCache:
+    """
+    Cache persisten sederhana: satu file JSON per key (key = hex digest), di-shard 2 karakter.
+    Aman dipakai beberapa proses (tulis via file sementara + os.replace).
+    Ukuran total dibatasi `max_bytes`; file paling lama diakses dibuang dulu.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, ttl_sec: float = 0.0):
+        self.directory = directory
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_sec = float(ttl_sec or 0.0)
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.errors = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                item = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except Exception:
+            self.errors += 1
+            self.misses += 1
+            return default
+        if self.ttl_sec > 0 and time.time() - float(item.get("t", 0)) > self.ttl_sec:
+            self._remove(path)
+            self.expired += 1
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)  # tandai baru diakses untuk eviction
+        except OSError:
+            pass
+        self.hits += 1
+        return item.get("v")
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps({"t": time.time(), "v": value}, ensure_ascii=False)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            self.errors += 1
+            self._remove(tmp)
+            return
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += len(data)
+            over = self._approx_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _remove(self, path: str) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    def _files(self):
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    p = os.path.join(root, name)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    yield p, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _p, size, _m in self._files())
+
+    def _evict(self) -> None:
+        # turunkan ke 90% dari batas supaya tidak scan di setiap set
+        with self._lock:
+            files = sorted(self._files(), key=lambda x: x[2])
+            total = sum(size for _p, size, _m in files)
+            target = int(self.max_bytes * 0.9)
+            for p, _size, _m in files:
+                if total <= target:
+                    break
+                total -= self._remove(p)
+                self.evictions += 1
+            self._approx_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "approx_bytes": self._approx_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "errors": self.errors,
+        }
@@ -1,23 +1,80 @@
 # logging_config.py
+import atexit
+import copy
 import logging
+import logging.handlers
 import json
+import queue
 import sys
 import os
 from datetime import datetime
-from typing import Any, Dict
-from settings import TZ
+from typing import Any, Dict, List, Optional
+from settings import LOG_QUEUE_ENABLED, LOG_QUEUE_SIZE, TZ
 from pytz import timezone
+from core.metrics import LOG_RECORDS_DROPPED
+
+try:
+    import orjson  # opsional; tanpa orjson dipakai json stdlib
+except Exception:
+    orjson = None
+
+_TZINFO = timezone(TZ)
+
+# atribut bawaan LogRecord yang tidak ikut sebagai field extra
+_RESERVED_ATTRS = frozenset((
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
+    'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
+    'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
+    'thread', 'threadName', 'processName', 'process', 'getMessage',
+))
+
+# field request yang ditulis di posisi tetap (response_time -> response_time_ms)
+_CONTEXT_FIELDS = (
+    ("request_id", "request_id"),
+    ("user_id", "user_id"),
+    ("endpoint", "endpoint"),
+    ("method", "method"),
+    ("status_code", "status_code"),
+    ("response_time", "response_time_ms"),
+)
+
+
+def _dumps_json(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _dumps_orjson(data: Dict[str, Any]) -> str:
+    try:
+        # passthrough datetime/dataclass -> default=str, sama dengan output json stdlib
+        return orjson.dumps(
+            data, default=str,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+        ).decode()
+    except (TypeError, orjson.JSONEncodeError):
+        # mis. key non-str atau int > 64 bit
+        return _dumps_json(data)
+
 
 class JSONFormatter(logging.Formatter):
     """
     Custom JSON formatter untuk output log yang terstruktur.
     Ideal untuk container environment seperti OpenShift.
+    Field statis (environment, application, version) dan tz dihitung sekali per formatter;
+    serialisasi memakai orjson kalau terpasang.
     """
-    
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._environment = os.environ.get("ENVIRONTMENT", "development")
+        self._version = os.environ.get("APP_VERSION", "1.0.0")
+        self._dumps = _dumps_orjson if orjson is not None else _dumps_json
+
     def format(self, record: logging.LogRecord) -> str:
+        attrs = record.__dict__
         # Base log data
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.now(timezone(TZ)),
+            # waktu kejadian, bukan waktu tulis; str() = format lama dari json default=str
+            "timestamp": str(datetime.fromtimestamp(record.created, _TZINFO)),
             "level": record.levelname,
             "logger_name": record.name,
             "message": record.getMessage(),
@@ -26,52 +83,37 @@ class JSONFormatter(logging.Formatter):
             "line": record.lineno,
             "thread": record.thread,
             "thread_name": record.threadName,
+            "process_id": record.process,
+            "environment": self._environment,
+            "application": "be-sercvice",
+            "version": self._version,
         }
-        
-        # Add process info
-        log_data["process_id"] = record.process
-        
-        # Add environment info
-        environment = os.environ.get("ENVIRONTMENT", "development")
-        log_data["environment"] = environment
-        
-        # Add application info
-        log_data["application"] = "be-sercvice"
-        log_data["version"] = os.environ.get("APP_VERSION", "1.0.0")
-        
+
         # Add request context if available
-        if hasattr(record, 'request_id'):
-            log_data["request_id"] = record.request_id
-        
-        if hasattr(record, 'user_id'):
-            log_data["user_id"] = record.user_id
-            
-        if hasattr(record, 'endpoint'):
-            log_data["endpoint"] = record.endpoint
-            
-        if hasattr(record, 'method'):
-            log_data["method"] = record.method
-            
-        if hasattr(record, 'status_code'):
-            log_data["status_code"] = record.status_code
-            
-        if hasattr(record, 'response_time'):
-            log_data["response_time_ms"] = record.response_time
-        
-        # Add exception info if present
-        if record.exc_info:
-            log_data["exception"] = self.formatException(record.exc_info)
-        
+        for attr, key in _CONTEXT_FIELDS:
+            if attr in attrs:
+                log_data[key] = attrs[attr]
+
+        # Add exception info if present; dirender sekali per record (stdout + file handler),
+        # record dari QueueHandler sudah membawa exc_text
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_data["exception"] = record.exc_text
+
         # Add extra fields
-        for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 
-                          'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
-                          'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
-                          'thread', 'threadName', 'processName', 'process', 'getMessage']:
-                if not key.startswith('_'):
-                    log_data[key] = value
-        
-        return json.dumps(log_data, ensure_ascii=False, default=str)
+        for key, value in attrs.items():
+            if key not in _RESERVED_ATTRS and key[0] != '_':
+                log_data[key] = value
+
+        return self._dumps(log_data)
+
+
+_POD_INFO = {
+    'pod_name': os.environ.get('HOSTNAME', 'unknown'),
+    'namespace': os.environ.get('POD_NAMESPACE', 'default'),
+    'node_name': os.environ.get('NODE_NAME', 'unknown'),
+}
 
 
 class OpenShiftLoggerAdapter(logging.LoggerAdapter):
@@ -84,17 +126,113 @@ class OpenShiftLoggerAdapter(logging.LoggerAdapter):
         if 'extra' not in kwargs:
             kwargs['extra'] = {}
             
-        kwargs['extra']['pod_name'] = os.environ.get('HOSTNAME', 'unknown')
-        kwargs['extra']['namespace'] = os.environ.get('POD_NAMESPACE', 'default')
-        kwargs['extra']['node_name'] = os.environ.get('NODE_NAME', 'unknown')
+        kwargs['extra'].update(_POD_INFO)
         
         return msg, kwargs
 
 
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler dengan antrean terbatas: kalau penuh, record dibuang dan dihitung
+    (bukan blok di thread pemanggil / event loop).
+    """
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            global _dropped_total
+            self.dropped += 1
+            _dropped_total += 1
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Versi bawaan memformat record dan membuang exc_info/exc_text; di sini pesan hanya
+        # di-merge dengan args, traceback dirender ke exc_text supaya JSONFormatter tetap
+        # menulis field "exception", dan atribut extra tetap utuh.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # antrean bisa penuh saat shutdown: tunggu slot, jangan buang sentinel
+        self.queue.put(self._sentinel)
+
+
+_exc_formatter = logging.Formatter()
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_direct_handlers: List[logging.Handler] = []
+_dropped_total = 0
+
+
+def _attach(handler: logging.Handler) -> None:
+    """Daftarkan handler output ke listener (mode antrean) atau langsung ke root."""
+    _direct_handlers.append(handler)
+    if _listener is not None:
+        _listener.handlers = tuple(_direct_handlers)
+    else:
+        logging.getLogger().addHandler(handler)
+
+
+def shutdown_logging() -> None:
+    """
+    Hentikan writer background (sisa antrean di-flush) lalu pasang handler langsung di root
+    supaya log setelah shutdown tetap tertulis. Dipanggil dari lifespan main.py dan atexit.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    listener, qh = _listener, _queue_handler
+    _listener, _queue_handler = None, None
+    listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(qh)
+    for h in _direct_handlers:
+        root.addHandler(h)
+    if qh is not None and qh.dropped:
+        root.warning(f"Logging queue dropped {qh.dropped} record(s)")
+
+
+def _reinit_after_fork() -> None:
+    # thread listener tidak ikut ter-fork (worker job_queue): pasang antrean & listener baru
+    global _listener
+    if _queue_handler is None:
+        return
+    _queue_handler.queue = queue.Queue(maxsize=max(1, LOG_QUEUE_SIZE))
+    _listener = _QueueListener(
+        _queue_handler.queue, *_direct_handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+
+def dropped_log_records() -> int:
+    """Jumlah record yang dibuang di proses ini (juga di metrik log_records_dropped_total)."""
+    return _dropped_total
+
+
 def setup_logging():
     """
     Setup logging configuration untuk OpenShift environment.
+    Dengan LOG_QUEUE_ENABLED, root hanya punya QueueHandler; stdout & file ditulis oleh
+    satu thread QueueListener sehingga I/O lambat tidak menahan request.
     """
+    global _queue_handler, _listener
     # Determine log level from environment
     log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
     
@@ -103,8 +241,10 @@ def setup_logging():
     root_logger.setLevel(getattr(logging, log_level, logging.INFO))
     
     # Remove existing handlers
+    shutdown_logging()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    _direct_handlers.clear()
     
     # Create console handler untuk stdout
     console_handler = logging.StreamHandler(sys.stdout)
@@ -114,8 +254,15 @@ def setup_logging():
     json_formatter = JSONFormatter()
     console_handler.setFormatter(json_formatter)
     
-    # Add handler to root logger
-    root_logger.addHandler(console_handler)
+    if LOG_QUEUE_ENABLED:
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(1, LOG_QUEUE_SIZE)))
+        root_logger.addHandler(_queue_handler)
+        _listener = _QueueListener(_queue_handler.queue, respect_handler_level=True)
+        _attach(console_handler)
+        _listener.start()
+    else:
+        # Add handler to root logger
+        _attach(console_handler)
     
     # Disable propagation for third-party loggers to avoid noise
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -127,6 +274,7 @@ def setup_logging():
 
 # Initialize logging
 setup_logging()
+atexit.register(shutdown_logging)
 
 # Create main application logger
 logger = OpenShiftLoggerAdapter(logging.getLogger("be-service"), {})
@@ -153,7 +301,12 @@ def add_file_handler(logger_name: str, log_file: str, level: str = None):
     file_handler = logging.FileHandler(log_file, encoding="utf-8")
     file_handler.setLevel(getattr(logging, level, logging.INFO))
     file_handler.setFormatter(JSONFormatter())
-    logger.addHandler(file_handler)
+    if _listener is not None:
+        # di mode antrean semua record lewat root; filter nama = logger ini + turunannya
+        file_handler.addFilter(logging.Filter(logger_name))
+        _attach(file_handler)
+    else:
+        logger.addHandler(file_handler)
     return logger
 
 # Aktifkan file handler untuk logger utama dan auth
@@ -194,6 +347,27 @@ def log_response(request_id: str, status_code: int, response_time: float, user_i
     )
 
 
+def log_access(request_id: str, method: str, endpoint: str, status_code: int, response_time: float,
+               response_size: int, user_id: str = None, **fields: Any):
+    """
+    Satu record access log per request (menggantikan pasangan request_start/request_end).
+    """
+    logger.info(
+        f"{method} {endpoint} {status_code}",
+        extra={
+            "request_id": request_id,
+            "method": method,
+            "endpoint": endpoint,
+            "status_code": status_code,
+            "response_time": response_time,
+            "response_size": response_size,
+            "user_id": user_id,
+            "event_type": "access",
+            **fields,
+        }
+    )
+
+
 def log_error(request_id: str, error: Exception, user_id: str = None, context: Dict[str, Any] = None):
     """
     Log error dengan detail context.
@@ -1,22 +1,87 @@
 # logging_middleware.py
+import random
 import time
 import uuid
-from typing import Callable
+from typing import Callable, List, Tuple
 from fastapi import Request, Response
 from fastapi.responses import StreamingResponse
 import json
 
-from core.logging_config import log_request, log_response, log_error, logger
+from core.logging_config import log_access, log_error, logger
+from core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+from settings import (
+    ACCESS_LOG_EXCLUDE_PATHS,
+    ACCESS_LOG_SAMPLE_RATE,
+    ACCESS_LOG_SAMPLE_RULES,
+    ACCESS_LOG_SLOW_MS,
+)
+
+
+def _parse_paths(raw: str) -> Tuple[str, ...]:
+    return tuple(p.strip() for p in (raw or "").split(",") if p.strip())
+
+
+def _parse_rules(raw: str) -> List[Tuple[Tuple[str, ...], float]]:
+    """"/result/*=0.1,/llm/*=0.05" -> [(("/result/*",), 0.1), (("/llm/*",), 0.05)]"""
+    rules = []
+    for item in (raw or "").split(","):
+        path, sep, rate = item.partition("=")
+        if not sep or not path.strip():
+            continue
+        try:
+            rules.append(((path.strip(),), max(0.0, min(1.0, float(rate)))))
+        except ValueError:
+            continue
+    return rules
+
+
+def _match_path(path: str, patterns: Tuple[str, ...]) -> bool:
+    for p in patterns:
+        if p.endswith("*"):
+            if path.startswith(p[:-1]):
+                return True
+        elif path == p:
+            return True
+    return False
+
+
+def route_template(scope) -> str:
+    """
+    Path template route (mis. /result/{job_id}) untuk label metrik, supaya kardinalitas tidak
+    meledak karena id di path. Request yang tidak match route mana pun -> "unmatched".
+    """
+    app = scope.get("app")
+    endpoint = scope.get("endpoint")
+    routes = getattr(getattr(app, "router", None), "routes", None) or []
+    if endpoint is not None:
+        for route in routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                return getattr(route, "path", "unmatched")
+    return "unmatched"
 
 
 class LoggingMiddleware:
     """
     Middleware untuk logging semua request dan response.
     Cocok untuk monitoring di OpenShift environment.
+
+    Satu access record per request; body response hanya dihitung ukurannya (tidak disimpan).
+    Path di ACCESS_LOG_EXCLUDE_PATHS tidak di-log, sisanya di-sampling per path
+    (ACCESS_LOG_SAMPLE_RULES / ACCESS_LOG_SAMPLE_RATE). Error 5xx dan request lambat selalu di-log.
     """
     
     def __init__(self, app):
         self.app = app
+        self.exclude = _parse_paths(ACCESS_LOG_EXCLUDE_PATHS)
+        self.sample_rules = _parse_rules(ACCESS_LOG_SAMPLE_RULES)
+        self.sample_rate = float(ACCESS_LOG_SAMPLE_RATE)
+        self.slow_ms = float(ACCESS_LOG_SLOW_MS)
+
+    def _sample_rate(self, path: str) -> float:
+        for patterns, rate in self.sample_rules:
+            if _match_path(path, patterns):
+                return rate
+        return self.sample_rate
 
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
@@ -32,92 +97,73 @@ class LoggingMiddleware:
         request.state.request_id = request_id
         
         # Start timing
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # Extract request info
         method = request.method
-        url = str(request.url)
         endpoint = request.url.path
-        user_agent = request.headers.get("user-agent", "")
-        ip_address = self._get_client_ip(request)
-        
-        # Extract user ID if available (from JWT token or session)
-        user_id = await self._extract_user_id(request)
-        
-        # Log incoming request
-        log_request(
-            request_id=request_id,
-            method=method,
-            endpoint=endpoint,
-            user_id=user_id
-        )
-        
-        # Log additional request details
-        logger.info(
-            "Request details",
-            extra={
-                "request_id": request_id,
-                "url": url,
-                "user_agent": user_agent,
-                "ip_address": ip_address,
-                "content_type": request.headers.get("content-type"),
-                "content_length": request.headers.get("content-length"),
-                "event_type": "request_details"
-            }
-        )
+        excluded = _match_path(endpoint, self.exclude)
+        rate = self._sample_rate(endpoint)
+        # keputusan sampling di awal; 5xx/lambat tetap di-log walau tidak ter-sample
+        sampled = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
 
         # Process request
-        response_body = b""
+        response_size = 0
         status_code = 500
+        HTTP_IN_FLIGHT.inc()
         
         async def send_wrapper(message):
-            nonlocal response_body, status_code
+            nonlocal response_size, status_code
             
             if message["type"] == "http.response.start":
                 status_code = message["status"]
             elif message["type"] == "http.response.body":
-                response_body += message.get("body", b"")
+                response_size += len(message.get("body", b""))
             
             await send(message)
 
+        failed = False
         try:
             await self.app(scope, receive, send_wrapper)
         except Exception as e:
+            failed = True
             # Log error
             log_error(
                 request_id=request_id,
                 error=e,
-                user_id=user_id,
+                user_id=await self._extract_user_id(request),
                 context={
                     "endpoint": endpoint,
                     "method": method,
-                    "ip_address": ip_address
+                    "ip_address": self._get_client_ip(request)
                 }
             )
             raise
         finally:
             # Calculate response time
-            process_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-            
-            # Log response
-            log_response(
-                request_id=request_id,
-                status_code=status_code,
-                response_time=process_time,
-                user_id=user_id
-            )
-            
-            # Log response details
-            logger.info(
-                "Response details",
-                extra={
-                    "request_id": request_id,
-                    "status_code": status_code,
-                    "response_time": process_time,
-                    "response_size": len(response_body),
-                    "event_type": "response_details"
-                }
-            )
+            process_time = (time.perf_counter() - start_time) * 1000  # Convert to milliseconds
+
+            HTTP_IN_FLIGHT.dec()
+            route = route_template(scope)
+            HTTP_LATENCY.observe(process_time / 1000, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+
+            if not excluded and (sampled or failed or status_code >= 500 or process_time >= self.slow_ms):
+                log_access(
+                    request_id=request_id,
+                    method=method,
+                    endpoint=endpoint,
+                    status_code=status_code,
+                    response_time=round(process_time, 2),
+                    response_size=response_size,
+                    user_id=await self._extract_user_id(request),
+                    route=route,
+                    query=request.url.query or None,
+                    user_agent=request.headers.get("user-agent", ""),
+                    ip_address=self._get_client_ip(request),
+                    content_type=request.headers.get("content-type"),
+                    content_length=request.headers.get("content-length"),
+                    sample_rate=rate,
+                )
 
     def _get_client_ip(self, request: Request) -> str:
         """
@@ -0,0 +1,329 @@
+# metrics.py
+"""
+Registry metrik in-process (counter, gauge, histogram) dengan export format teks Prometheus.
+
+Multi-proses (beberapa worker uvicorn / worker.py): set METRICS_MULTIPROC_DIR. Tiap proses
+menulis snapshot JSON `<pid>.json` ke folder itu secara berkala (METRICS_FLUSH_SEC) dan saat exit;
+`/metrics` di proses mana pun menggabungkan semua snapshot. Counter & histogram dijumlahkan
+lintas proses; gauge dari proses yang sudah mati diabaikan.
+"""
+from __future__ import annotations
+
+import atexit
+import bisect
+import glob
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from settings import METRICS_ENABLED, METRICS_FLUSH_SEC, METRICS_MULTIPROC_DIR
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"values": [[list(k), v] for k, v in self._values.items()]}
+
+
+class Gauge(_Metric):
+    """
+    mode: "sum" (dijumlah lintas proses hidup), "max", atau "local" (tidak ikut snapshot,
+    hanya nilai proses yang melayani scrape — untuk gauge yang dihitung saat scrape).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (), mode: str = "sum"):
+        super().__init__(name, doc, labelnames)
+        self.mode = mode
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"values": [[list(k), v] for k, v in self._values.items()]}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # per label: [count per bucket (non-kumulatif, + slot +Inf), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(k) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[i] += 1
+            self._values[k] = (counts, total + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "values": [[list(k), list(c), s] for k, (c, s) in self._values.items()],
+            }
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, doc, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, doc: str, labelnames: Sequence[str] = (), mode: str = "sum") -> Gauge:
+        return self._register(Gauge(name, doc, labelnames, mode))  # type: ignore[return-value]
+
+    def histogram(self, name: str, doc: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, doc, labelnames, buckets))  # type: ignore[return-value]
+
+    # ---------- snapshot lintas proses ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            m.name: {"kind": m.kind, "doc": m.doc, "labels": list(m.labelnames),
+                     "mode": getattr(m, "mode", None), **m.snapshot()}
+            for m in metrics
+            if getattr(m, "mode", None) != "local"
+        }
+
+    def flush(self) -> None:
+        if not METRICS_MULTIPROC_DIR:
+            return
+        path = os.path.join(METRICS_MULTIPROC_DIR, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def _collect(self) -> Dict[str, dict]:
+        """Gabungkan snapshot semua proses (atau hanya proses ini kalau single-process)."""
+        if not METRICS_MULTIPROC_DIR:
+            snaps = [(os.getpid(), True, self.snapshot())]
+        else:
+            try:
+                self.flush()
+            except OSError:
+                pass
+            snaps = []
+            for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "*.json")):
+                try:
+                    pid = int(os.path.basename(path).split(".")[0])
+                    with open(path, encoding="utf-8") as f:
+                        snaps.append((pid, _pid_alive(pid), json.load(f)))
+                except (OSError, ValueError):
+                    continue
+
+        merged: Dict[str, dict] = {}
+        for _pid, alive, snap in snaps:
+            for name, m in snap.items():
+                out = merged.setdefault(name, {**m, "values": {}})
+                if m["kind"] == "gauge" and not alive:
+                    continue
+                for item in m["values"]:
+                    key = tuple(item[0])
+                    if m["kind"] == "histogram":
+                        counts, total = out["values"].get(key, ([0] * len(item[1]), 0.0))
+                        out["values"][key] = ([a + b for a, b in zip(counts, item[1])], total + item[2])
+                    elif m["kind"] == "gauge" and m.get("mode") == "max":
+                        out["values"][key] = max(out["values"].get(key, -math.inf), item[1])
+                    else:
+                        out["values"][key] = out["values"].get(key, 0.0) + item[1]
+        # gauge lokal (dihitung saat scrape) hanya dari proses ini
+        with self._lock:
+            local = [m for m in self._metrics.values() if getattr(m, "mode", None) == "local"]
+        for m in local:
+            merged[m.name] = {"kind": "gauge", "doc": m.doc, "labels": list(m.labelnames),
+                              "values": {tuple(k): v for k, v in m.snapshot()["values"]}}
+        return merged
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, m in sorted(self._collect().items()):
+            lines.append(f"# HELP {name} {m['doc']}")
+            lines.append(f"# TYPE {name} {m['kind']}")
+            labels = m["labels"]
+            for key, v in sorted(m["values"].items()):
+                if m["kind"] == "histogram":
+                    counts, total = v
+                    acc = 0
+                    for b, c in zip(list(m["buckets"]) + [math.inf], counts):
+                        acc += c
+                        le = 'le="%s"' % _fmt(b)
+                        lines.append(f"{name}_bucket{_labels(labels, key, le)} {acc}")
+                    lines.append(f"{name}_sum{_labels(labels, key)} {_fmt(total)}")
+                    lines.append(f"{name}_count{_labels(labels, key)} {acc}")
+                else:
+                    lines.append(f"{name}{_labels(labels, key)} {_fmt(v)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+
+
+REGISTRY = Registry()
+
+# ---------- Metrik aplikasi ----------
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being served")
+
+PIPELINE_JOBS = REGISTRY.counter("pipeline_jobs_total", "Evaluation jobs finished", ("mode", "status"))
+PIPELINE_JOB_LATENCY = REGISTRY.histogram("pipeline_job_duration_seconds", "Evaluation job wall time", ("mode",))
+PIPELINE_STAGE_LATENCY = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Pipeline stage wall time", ("stage", "engine"),
+)
+JOB_QUEUE_DEPTH = REGISTRY.gauge("job_queue_depth", "Jobs waiting in the queue", mode="local")
+
+LLM_REQUESTS = REGISTRY.counter("llm_requests_total", "LLM HTTP attempts", ("outcome",))
+LLM_LATENCY = REGISTRY.histogram("llm_request_duration_seconds", "LLM call latency (successful attempts)")
+LLM_TTFT = REGISTRY.histogram("llm_time_to_first_token_seconds", "LLM time to first token (streaming)")
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "LLM tokens reported by the provider", ("kind",))
+LLM_CACHE_HITS = REGISTRY.counter("llm_cache_hits_total", "LLM responses served from cache", ("tier",))
+LLM_CIRCUIT_OPEN = REGISTRY.gauge("llm_circuit_open", "1 while the LLM circuit breaker is open", mode="max")
+
+DB_POOL_CHECKED_OUT = REGISTRY.gauge("db_pool_checked_out", "DB connections checked out", ("engine",))
+DB_POOL_CHECKOUTS = REGISTRY.counter("db_pool_checkouts_total", "DB connection checkouts", ("engine",))
+DB_POOL_CONNECTS = REGISTRY.counter("db_pool_connections_total", "New DB connections opened", ("engine",))
+
+EXTRACT_TASKS = REGISTRY.counter("extract_tasks_total", "Document text extractions", ("kind", "outcome"))
+EXTRACT_QUEUE_WAIT = REGISTRY.histogram("extract_queue_wait_seconds", "Time an upload waited for an extraction worker")
+EXTRACT_DURATION = REGISTRY.histogram("extract_duration_seconds", "Document text extraction time", ("kind",))
+EXTRACT_PENDING = REGISTRY.gauge("extract_pending", "Extractions queued or running", mode="local")
+
+LOG_RECORDS_DROPPED = REGISTRY.counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+def instrument_engine_pool(engine, name: str) -> None:
+    """Pasang listener pool SQLAlchemy (sync engine atau async_engine.sync_engine)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(*_):
+        DB_POOL_CONNECTS.inc(engine=name)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(*_):
+        DB_POOL_CHECKED_OUT.inc(engine=name)
+        DB_POOL_CHECKOUTS.inc(engine=name)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(*_):
+        DB_POOL_CHECKED_OUT.dec(engine=name)
+
+
+# ---------- flush berkala (mode multi-proses) ----------
+_flusher: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+
+
+def _flush_loop() -> None:
+    while not _flusher_stop.wait(METRICS_FLUSH_SEC):
+        try:
+            REGISTRY.flush()
+        except OSError:
+            pass
+
+
+def start_metrics_flusher() -> None:
+    """Dipanggil sekali per proses (lifespan API / WorkerProcess.run)."""
+    global _flusher
+    if not METRICS_ENABLED or not METRICS_MULTIPROC_DIR or (_flusher and _flusher.is_alive()):
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    _flusher_stop.clear()
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+    atexit.register(stop_metrics_flusher)
+
+
+def stop_metrics_flusher() -> None:
+    _flusher_stop.set()
+    try:
+        REGISTRY.flush()
+    except OSError:
+        pass
@@ -0,0 +1,56 @@
+# ingest_rag.py
+"""
+Bulk ingest rubric / job description dari folder ke rag_docs.
+
+    uv run python ingest_rag.py ./corpus --batch-size 64 --workers 4
+    uv run python ingest_rag.py ./rubrics --type rubric --tags backend,cv
+
+Tanpa --type, tipe ditebak dari nama folder (rubric/ atau job_desc/ / jd/).
+"""
+import argparse
+import sys
+
+from models import SessionLocal
+from models.Enums import RagDocType
+from repository.rag_ingest import IngestStats, ingest_documents, iter_documents, iter_files
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk ingest rubrics / job descriptions into the vector DB")
+    parser.add_argument("path", help="file or directory")
+    parser.add_argument("--type", choices=[t.value for t in RagDocType], default=None,
+                        help="doc type for all files (default: infer from folder name)")
+    parser.add_argument("--tags", default="", help="comma-separated tags, e.g. backend,cv")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1, help="text extraction processes")
+    parser.add_argument("--no-recursive", action="store_true")
+    args = parser.parse_args()
+
+    tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+    doc_type = RagDocType(args.type) if args.type else None
+    stats = IngestStats()
+
+    def progress(s: IngestStats) -> None:
+        print(f"batch {s.batches}: {s.docs} docs in {s.seconds:.1f}s ({s.docs_per_sec:.1f} docs/sec)")
+
+    docs = iter_documents(
+        iter_files(args.path, recursive=not args.no_recursive),
+        doc_type=doc_type,
+        workers=args.workers,
+        stats=stats,
+    )
+    db = SessionLocal()
+    try:
+        ingest_documents(db, docs, tags=tags, batch_size=args.batch_size, stats=stats, on_batch=progress)
+    finally:
+        db.close()
+
+    print(
+        f"done: files={stats.files} docs={stats.docs} skipped={stats.skipped} failed={stats.failed} "
+        f"batches={stats.batches} time={stats.seconds:.1f}s rate={stats.docs_per_sec:.1f} docs/sec"
+    )
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
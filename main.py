@@ -4,7 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from core.xss_sanitizer import XSSSanitizerMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
-from models import create_all, ensure_schema_and_extensions
+from models import create_all, ensure_schema_and_extensions, engine, sync_engine, SessionLocal
 import sentry_sdk
 from core.myworker import run_scheduled_task
 from contextlib import asynccontextmanager
@@ -12,15 +12,30 @@ from fastapi_utilities import repeat_at
 from settings import (
     CORS_ALLOWED_ORIGINS,
     ENVIRONTMENT,
-    TZ
+    METRICS_ENABLED,
+    TZ,
+    UPLOAD_MAX_BODY_MB,
 )
 from pytz import timezone
-from core.logging_config import logger, log_security_event, scheduler_logger
+from core.logging_config import logger, log_security_event, scheduler_logger, shutdown_logging
 from core.logging_middleware import LoggingMiddleware, log_background_task, log_health_check
 from core.security_headers import SecurityHeadersMiddleware
+from core.body_limit import BodySizeLimitMiddleware
+from core.metrics import (
+    JOB_QUEUE_DEPTH,
+    REGISTRY,
+    instrument_engine_pool,
+    start_metrics_flusher,
+    stop_metrics_flusher,
+)
 from routes.router import router as api_router
+from repository.http_pool import close_all as close_http_clients
+from repository.extract_pool import shutdown_extract_pool
+from repository.llm_client import close_llm
+from repository.rag import start_corpus_listener, stop_corpus_listener
+from repository.job_queue import queue_depth
 
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi import Request
@@ -38,6 +53,8 @@ async def lifespan(app: FastAPI):
         # shceduler
         await ensure_schema_and_extensions()
         await create_all()
+        start_corpus_listener()
+        start_metrics_flusher()
 
 
         logger.info("Application startup completed successfully", extra={"event_type": "app_startup_complete"})
@@ -52,9 +69,17 @@ async def lifespan(app: FastAPI):
     
     logger.info("Application shutdown initiated", extra={"event_type": "app_shutdown"})
     try:
+        stop_corpus_listener()
+        close_llm()
+        close_http_clients()
+        shutdown_extract_pool()
+        stop_metrics_flusher()
         logger.info("Application shutdown completed", extra={"event_type": "app_shutdown_complete"})
     except Exception as e:
         logger.error("Application shutdown error", exc_info=True, extra={"event_type": "app_shutdown_error"})
+    finally:
+        # flush antrean log terakhir sebelum proses keluar
+        shutdown_logging()
 
 
 fastapi_kwargs = {
@@ -81,6 +106,12 @@ elif ENVIRONTMENT == 'prod':
     })
 app = FastAPI(**fastapi_kwargs)
 
+instrument_engine_pool(engine.sync_engine, "async")
+instrument_engine_pool(sync_engine, "sync")
+
+# di dalam LoggingMiddleware supaya 413 tetap tercatat di access log
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=int(UPLOAD_MAX_BODY_MB * 1024 * 1024))
+
 app.add_middleware(LoggingMiddleware)
 
 app.add_middleware(XSSSanitizerMiddleware)
@@ -183,6 +214,22 @@ async def readiness_check():
             }
         )
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Metrik format teks Prometheus (HTTP, pipeline, LLM, pool DB, antrean job).
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404)
+    db = SessionLocal()
+    try:
+        JOB_QUEUE_DEPTH.set(queue_depth(db))
+    except Exception:
+        logger.warning("Queue depth unavailable for metrics", extra={"event_type": "metrics_error"})
+    finally:
+        db.close()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # 404 Handler untuk halaman yang tidak ditemukan
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: HTTPException):
@@ -1,11 +1,10 @@
 # migrate.py
 import asyncio
-from models import Base, engine
+from models import create_all
 
 async def run():
-    # create_all harus dijalankan di context sync, gunakan run_sync
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # create_all (run_sync) + tambah kolom baru ke tabel lama
+    await create_all()
     print("All tables created.")
 
 if __name__ == "__main__":
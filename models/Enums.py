@@ -7,6 +7,12 @@ class JobStatus(str, enum.Enum):
     completed = "completed"
     failed = "failed"
 
+class ExtractionStatus(str, enum.Enum):
+    pending = "pending"
+    processing = "processing"
+    done = "done"
+    failed = "failed"
+
 class RagDocType(str, enum.Enum):
     job_desc = "job_desc"
     rubric = "rubric" 
\ No newline at end of file
@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import Optional
 import uuid
 from datetime import datetime
-from sqlalchemy import Enum, Text, ForeignKey, Index, TIMESTAMP
+from sqlalchemy import Enum, Integer, Text, ForeignKey, Index, TIMESTAMP
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -17,6 +17,8 @@ class Job(Base):
 
     status: Mapped[JobStatus] = mapped_column(Enum(JobStatus, name="job_status"), default=JobStatus.queued, nullable=False)
     error: Mapped[str | None] = mapped_column(Text)
+    # berapa kali job di-claim worker (JOB_BACKEND=queue); dibatasi JOB_MAX_ATTEMPTS
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=func.now(), nullable=False)
@@ -2,7 +2,8 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 from models import Base
-from sqlalchemy import String, Text, Index, TIMESTAMP
+from models.Enums import ExtractionStatus
+from sqlalchemy import Enum, String, Text, Index, TIMESTAMP
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -14,8 +15,22 @@ class Upload(Base):
     report_path: Mapped[str] = mapped_column(String, nullable=False)
     cv_text: Mapped[str | None] = mapped_column(Text)
     project_text: Mapped[str | None] = mapped_column(Text)
+    # dedup: hash isi file + versi extractor yang menghasilkan cv_text/project_text
+    cv_sha256: Mapped[str | None] = mapped_column(String(64))
+    report_sha256: Mapped[str | None] = mapped_column(String(64))
+    extractor_version: Mapped[str | None] = mapped_column(String(32))
+    # upload async: teks diekstrak di background; pipeline menunggu/mengambil alih sampai "done"
+    extraction_status: Mapped[ExtractionStatus] = mapped_column(
+        Enum(ExtractionStatus, native_enum=False, length=16),
+        default=ExtractionStatus.done, server_default=ExtractionStatus.done.value, nullable=False,
+    )
+    extraction_error: Mapped[str | None] = mapped_column(Text)
+    # heartbeat pemilik ekstraksi "processing"; yang diam lebih dari UPLOAD_EXTRACT_WAIT_SEC boleh diambil alih
+    extraction_claimed_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
     jobs: Mapped[list["Job"]] = relationship(back_populates="upload", cascade="all, delete-orphan")
     __table_args__ = (
     Index("ix_uploads_created", "created_at"),
+    Index("ix_uploads_cv_sha256", "cv_sha256", "extractor_version"),
+    Index("ix_uploads_report_sha256", "report_sha256", "extractor_version"),
 )
\ No newline at end of file
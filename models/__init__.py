@@ -104,6 +104,21 @@ async def ensure_schema_and_extensions() -> None:
 async def create_all() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all tidak menambah kolom ke tabel yang sudah ada
+        for stmt in _COLUMN_UPGRADES:
+            await conn.execute(text(stmt))
+
+_COLUMN_UPGRADES = (
+    f'ALTER TABLE "{DEFAULT_SCHEMA}".uploads ADD COLUMN IF NOT EXISTS cv_sha256 VARCHAR(64)',
+    f'ALTER TABLE "{DEFAULT_SCHEMA}".uploads ADD COLUMN IF NOT EXISTS report_sha256 VARCHAR(64)',
+    f'ALTER TABLE "{DEFAULT_SCHEMA}".uploads ADD COLUMN IF NOT EXISTS extractor_version VARCHAR(32)',
+    f"ALTER TABLE \"{DEFAULT_SCHEMA}\".uploads ADD COLUMN IF NOT EXISTS extraction_status VARCHAR(16) NOT NULL DEFAULT 'done'",
+    f'ALTER TABLE "{DEFAULT_SCHEMA}".uploads ADD COLUMN IF NOT EXISTS extraction_error TEXT',
+    f'ALTER TABLE "{DEFAULT_SCHEMA}".uploads ADD COLUMN IF NOT EXISTS extraction_claimed_at TIMESTAMP WITH TIME ZONE',
+    f'ALTER TABLE "{DEFAULT_SCHEMA}".jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0',
+    f'CREATE INDEX IF NOT EXISTS ix_uploads_cv_sha256 ON "{DEFAULT_SCHEMA}".uploads (cv_sha256, extractor_version)',
+    f'CREATE INDEX IF NOT EXISTS ix_uploads_report_sha256 ON "{DEFAULT_SCHEMA}".uploads (report_sha256, extractor_version)',
+)
 
 # ---- FastAPI dependency (async) ---------------------------------------------
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
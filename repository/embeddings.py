@@ -1,64 +1,185 @@
 from __future__ import annotations
-import os, math, hashlib
-from typing import List
+import hashlib, logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
 
 try:
     import httpx
 except Exception:
     httpx = None
 
-from settings import GROQ_API_KEY, LLM_TIMEOUT_SEC
+from core.cache import DiskCache, LRUCache
+from settings import (
+    EMBED_BATCH_MAX_CHARS,
+    EMBED_BATCH_SIZE,
+    EMBED_BASE_URL,
+    EMBED_CACHE_DIR,
+    EMBED_CACHE_DISK_MAX_MB,
+    EMBED_CACHE_MAX_ENTRIES,
+    EMBED_DIM,
+    EMBED_MODEL,
+    EMBED_PROVIDER,
+    GROQ_API_KEY,
+    LLM_TIMEOUT_SEC,
+)
+from repository.http_pool import get_client
+
+log = logging.getLogger("embeddings")
+
+# Konfigurasi provider dibaca sekali saat import
+_PROVIDER = (EMBED_PROVIDER or "mock").strip().lower()
+_DIM = int(EMBED_DIM)
+_BASE_URL = (EMBED_BASE_URL or "https://api.groq.com/openai/v1").rstrip("/")
+_MODEL = EMBED_MODEL or "text-embedding-3-small"
+_REMOTE = _PROVIDER == "groq" and httpx is not None and bool(GROQ_API_KEY)
+
+_MAX_CHARS = 8000
+
+def _hash_embed_matrix(texts: Sequence[str], dim: int) -> np.ndarray:
+    """
+    Versi vektor dari hash-embedding: per teks tetap sha256(seed + counter) per blok 32 byte,
+    tapi konversi uint32 -> float dan normalisasi dikerjakan NumPy sekaligus untuk semua baris.
+    Nilainya sama dengan implementasi per-float sebelumnya dalam toleransi float32 (selisih ~1e-9).
+    """
+    n = len(texts)
+    if n == 0 or dim <= 0:
+        return np.zeros((n, max(dim, 0)), dtype=np.float32)
+    blocks = -(-dim // 8)  # 8 uint32 per digest sha256
+    counters = [i.to_bytes(4, "little") for i in range(blocks)]
+    buf = bytearray()
+    for text in texts:
+        seed = hashlib.sha256((text or "")[:_MAX_CHARS].encode("utf-8")).digest()
+        for c in counters:
+            buf += hashlib.sha256(seed + c).digest()
+    u = np.frombuffer(bytes(buf), dtype="<u4").reshape(n, blocks * 8)[:, :dim]
+    x = (u / 2**32) * 2.0 - 1.0
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (x / norms).astype(np.float32)
 
 def _hash_embed(text: str, dim: int) -> List[float]:
-    text = (text or "")[:8000]
-    vec: List[float] = []
-    seed = hashlib.sha256(text.encode("utf-8")).digest()
-    counter = 0
-    while len(vec) < dim:
-        h = hashlib.sha256(seed + counter.to_bytes(4, "little")).digest()
-        for i in range(0, len(h), 4):
-            if len(vec) >= dim:
-                break
-            n = int.from_bytes(h[i:i+4], "little", signed=False)
-            x = (n / 2**32) * 2.0 - 1.0
-            vec.append(float(x))
-        counter += 1
-    norm = math.sqrt(sum(x*x for x in vec)) or 1.0
-    return [x / norm for x in vec]
+    return _hash_embed_matrix([text], dim)[0].tolist()
+
+def _fit_dim(emb: Sequence[float], text: str) -> np.ndarray:
+    v = np.asarray(emb, dtype=np.float64)
+    if v.shape[0] > _DIM:
+        v = v[:_DIM]
+    elif v.shape[0] < _DIM:
+        v = np.concatenate([v, _hash_embed_matrix([text + "|pad"], _DIM - v.shape[0])[0]])
+    norm = float(np.linalg.norm(v)) or 1.0
+    return (v / norm).astype(np.float32)
+
+def _remote_embed_batch(texts: Sequence[str]) -> Optional[List[np.ndarray]]:
+    """Satu request /embeddings dengan input list; None kalau gagal (caller fallback ke hash, tidak di-cache)."""
+    try:
+        client = get_client("embed", timeout=float(LLM_TIMEOUT_SEC or 30))
+        r = client.post(
+            f"{_BASE_URL}/embeddings",
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={"model": _MODEL, "input": list(texts)},
+        )
+        r.raise_for_status()
+        data = sorted(r.json()["data"], key=lambda d: d.get("index", 0))
+        if len(data) != len(texts):
+            raise ValueError(f"expected {len(texts)} embeddings, got {len(data)}")
+        return [_fit_dim(d["embedding"], t) for d, t in zip(data, texts)]
+    except Exception as e:
+        log.warning(f"[EMBED] provider error, fallback to hash: {e}")
+        return None
+
+def _chunks(texts: Sequence[str]):
+    """Potong input jadi batch dibatasi jumlah item dan total karakter."""
+    chunk: List[int] = []
+    chars = 0
+    for i, t in enumerate(texts):
+        if chunk and (len(chunk) >= EMBED_BATCH_SIZE or chars + len(t) > EMBED_BATCH_MAX_CHARS):
+            yield chunk
+            chunk, chars = [], 0
+        chunk.append(i)
+        chars += len(t)
+    if chunk:
+        yield chunk
+
+# ---------- Memoization (query & dokumen) ----------
+# key = (provider, model, dim, sha256(text)); nilai disimpan sebagai array float32 read-only
+_mem_cache = LRUCache(max_entries=EMBED_CACHE_MAX_ENTRIES)
+_disk_cache: Optional[DiskCache] = None
+if EMBED_CACHE_DIR:
+    try:
+        _disk_cache = DiskCache(EMBED_CACHE_DIR, max_bytes=int(EMBED_CACHE_DISK_MAX_MB * 1024 * 1024))
+    except Exception as e:
+        log.warning(f"[EMBED] disk cache disabled ({EMBED_CACHE_DIR}): {e}")
+
+def _cache_key(text: str) -> str:
+    provider, model = ("groq", _MODEL) if _REMOTE else ("hash", "sha256")
+    h = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{provider}|{model}|{_DIM}|{h}".encode("utf-8")).hexdigest()
+
+def _cache_get(key: str) -> Optional[np.ndarray]:
+    vec = _mem_cache.get(key)
+    if vec is None and _disk_cache is not None:
+        stored = _disk_cache.get(key)
+        if stored is not None:
+            vec = np.asarray(stored, dtype=np.float32)
+            vec.flags.writeable = False
+            _mem_cache.set(key, vec)
+    return vec
+
+def _cache_set(key: str, vec: np.ndarray) -> None:
+    vec = np.array(vec, dtype=np.float32)
+    vec.flags.writeable = False
+    _mem_cache.set(key, vec)
+    if _disk_cache is not None:
+        _disk_cache.set(key, vec.tolist())
+
+def embed_many(texts: Sequence[str]) -> np.ndarray:
+    """
+    Embed banyak teks sekaligus -> matrix float32 contiguous (len(texts), dim).
+    Cache dicek per teks; sisanya di-embed per batch (NumPy untuk hash, list input untuk provider).
+    """
+    items = [(t or "")[:_MAX_CHARS] for t in texts]
+    out = np.empty((len(items), _DIM), dtype=np.float32)
+    keys = [_cache_key(t) for t in items]
+    todo: List[int] = []
+    for i, k in enumerate(keys):
+        cached = _cache_get(k)
+        if cached is not None:
+            out[i] = cached
+        else:
+            todo.append(i)
+    if not todo:
+        return out
+
+    pending = [items[i] for i in todo]
+    if _REMOTE:
+        for chunk in _chunks(pending):
+            batch = [pending[j] for j in chunk]
+            vecs = _remote_embed_batch(batch)
+            if vecs is None:
+                out[[todo[j] for j in chunk]] = _hash_embed_matrix(batch, _DIM)
+                continue
+            for j, v in zip(chunk, vecs):
+                out[todo[j]] = v
+                _cache_set(keys[todo[j]], v)
+    else:
+        mat = _hash_embed_matrix(pending, _DIM)
+        for j, i in enumerate(todo):
+            out[i] = mat[j]
+            _cache_set(keys[i], mat[j])
+    return out
 
 def embed_one(text: str) -> List[float]:
-    text = (text or "")[:8000]
-    provider = (os.getenv("EMBED_PROVIDER") or "mock").strip().lower()
-    dim = int(os.getenv("EMBED_DIM", "768"))
-
-    if provider in {"mock", "local", "zero"}:
-        return _hash_embed(text, dim)
-
-    if provider == "groq":
-        if httpx is None or not GROQ_API_KEY:
-            return _hash_embed(text, dim)
-        base = (os.getenv("EMBED_BASE_URL") or "https://api.groq.com/openai/v1").rstrip("/")
-        model = os.getenv("EMBED_MODEL", "text-embedding-3-small")
-        try:
-            with httpx.Client(timeout=float(LLM_TIMEOUT_SEC or 30)) as client:
-                r = client.post(
-                    f"{base}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {GROQ_API_KEY}",
-                        "Content-Type": "application/json",
-                    },
-                    json={"model": model, "input": text},
-                )
-                r.raise_for_status()
-                emb = r.json()["data"][0]["embedding"]
-                if len(emb) != dim:
-                    if len(emb) > dim:
-                        emb = emb[:dim]
-                    else:
-                        emb = list(emb) + _hash_embed(text + "|pad", dim - len(emb))
-                norm = math.sqrt(sum(x*x for x in emb)) or 1.0
-                return [float(x) / norm for x in emb]
-        except Exception:
-            return _hash_embed(text, dim)
-
-    return _hash_embed(text, dim)
+    return embed_many([text])[0].tolist()
+
+def embed_cache_stats() -> Dict[str, Any]:
+    return {
+        "provider": "groq" if _REMOTE else "hash",
+        "model": _MODEL if _REMOTE else None,
+        "dim": _DIM,
+        "memory": _mem_cache.stats(),
+        "disk": _disk_cache.stats() if _disk_cache is not None else None,
+    }
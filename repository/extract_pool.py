@@ -0,0 +1,290 @@
+from __future__ import annotations
+import asyncio, logging, multiprocessing, threading, time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from core.metrics import EXTRACT_DURATION, EXTRACT_PENDING, EXTRACT_QUEUE_WAIT, EXTRACT_TASKS
+from repository.extract_text import sniff_type, timed_extract, timed_extract_pages
+from settings import (
+    EXTRACT_MAX_CHARS,
+    EXTRACT_MAX_PAGES,
+    EXTRACT_MAX_PENDING,
+    EXTRACT_PDF_PAGES_PER_TASK,
+    EXTRACT_MAX_TASKS_PER_CHILD,
+    EXTRACT_POOL_SIZE,
+    EXTRACT_TIMEOUT_SEC,
+)
+
+log = logging.getLogger("extract")
+
+# Ekstraksi teks (pdfminer/python-docx) jalan di process pool terpisah supaya event loop API
+# tidak tertahan. Pool dibuat lazy; proses yang melewati timeout dimatikan dan pool dibuat ulang.
+# PDF dipecah per range halaman yang dikerjakan paralel per gelombang (wave); gelombang berikutnya
+# tidak dikirim begitu EXTRACT_MAX_CHARS tercapai atau EXTRACT_MAX_PAGES habis.
+
+
+class ExtractTimeoutError(TimeoutError):
+    pass
+
+
+class ExtractBusyError(RuntimeError):
+    pass
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: proses anak tidak mewarisi thread/koneksi DB dari proses API
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, EXTRACT_POOL_SIZE),
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=EXTRACT_MAX_TASKS_PER_CHILD or None,
+            )
+        return _pool
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """Matikan proses pool (task yang macet tidak bisa dibatalkan lewat Future.cancel)."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    for p in list((getattr(pool, "_processes", None) or {}).values()):
+        try:
+            p.terminate()
+        except Exception:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extract_pool() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        # tunggu task yang sedang jalan saja (antrean dibatalkan) supaya proses anak keluar bersih
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _acquire(kind: str, reject: bool = True) -> None:
+    global _pending
+    with _lock:
+        if reject and EXTRACT_MAX_PENDING > 0 and _pending >= EXTRACT_MAX_PENDING:
+            EXTRACT_TASKS.inc(kind=kind, outcome="rejected")
+            raise ExtractBusyError("Too many documents are being extracted, retry later")
+        _pending += 1
+        EXTRACT_PENDING.set(_pending)
+
+
+def _release() -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+        EXTRACT_PENDING.set(_pending)
+
+
+@contextmanager
+def _tracked(kind: str, reject: bool = True):
+    _acquire(kind, reject)
+    state = {"outcome": "error"}
+    try:
+        yield state
+    except ExtractTimeoutError:
+        state["outcome"] = "timeout"
+        raise
+    finally:
+        _release()
+        EXTRACT_TASKS.inc(kind=kind, outcome=state["outcome"])
+
+
+async def extract_text_async(path: str, max_chars: Optional[int] = None) -> str:
+    """
+    Ekstrak teks tanpa memblok event loop. Raise ExtractBusyError kalau antrean penuh dan
+    ExtractTimeoutError kalau melewati EXTRACT_TIMEOUT_SEC. `max_chars` None = EXTRACT_MAX_CHARS,
+    0 = dokumen utuh (mis. rubrik/JD RAG).
+    """
+    kind = sniff_type(path)
+    with _tracked(kind) as state:
+        text, _started, duration = await _run(path, _budget(max_chars))
+        state["outcome"] = "ok"
+        EXTRACT_DURATION.observe(duration, kind=kind)
+        return text
+
+
+def extract_text_sync(path: str, max_chars: Optional[int] = None) -> str:
+    """
+    Versi blocking untuk thread background/worker (ekstraksi upload async, stage pipeline).
+    Tidak ditolak walau antrean penuh: cukup menunggu giliran di pool.
+    """
+    kind = sniff_type(path)
+    with _tracked(kind, reject=False) as state:
+        text, _started, duration = _run_sync(path, _budget(max_chars))
+        state["outcome"] = "ok"
+        EXTRACT_DURATION.observe(duration, kind=kind)
+        return text
+
+
+def _budget(max_chars: Optional[int]) -> int:
+    return EXTRACT_MAX_CHARS if max_chars is None else max(0, int(max_chars))
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def _page_parallel(path: str) -> bool:
+    return EXTRACT_POOL_SIZE > 1 and sniff_type(path) == "pdf"
+
+
+def _take_pages(text: str, need: int) -> str:
+    """Potong di batas halaman (form feed dari TextConverter) begitu panjangnya >= need."""
+    pos = 0
+    while True:
+        i = text.find("\x0c", pos)
+        if i < 0:
+            return text
+        pos = i + 1
+        if pos >= need:
+            return text[:pos]
+
+
+class _PdfMerge:
+    """Gabungkan hasil range halaman berurutan; hasilnya sama dengan ekstraksi sekuensial + early stop."""
+
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.chars = 0
+        self.next_page = 0
+        self.started: Optional[float] = None
+        self.done = False
+
+    def budget(self) -> int:
+        return self.max_chars - self.chars if self.max_chars > 0 else 0
+
+    def wave(self) -> List[Tuple[int, int]]:
+        per = max(1, EXTRACT_PDF_PAGES_PER_TASK)
+        ranges: List[Tuple[int, int]] = []
+        for i in range(max(1, EXTRACT_POOL_SIZE)):
+            first = self.next_page + i * per
+            count = per if EXTRACT_MAX_PAGES <= 0 else min(per, EXTRACT_MAX_PAGES - first)
+            if self.done or count <= 0:
+                break
+            ranges.append((first, count))
+        if not ranges:
+            self.done = True
+        else:
+            self.next_page = ranges[-1][0] + ranges[-1][1]
+        return ranges
+
+    def add(self, results) -> None:
+        for text, started, _duration, _pages, eof in results:
+            if self.done:
+                break
+            self.started = started if self.started is None else min(self.started, started)
+            if self.max_chars > 0 and self.chars + len(text) >= self.max_chars:
+                text = _take_pages(text, self.max_chars - self.chars)
+                self.done = True
+            self.parts.append(text)
+            self.chars += len(text)
+            if eof:
+                self.done = True
+
+    def result(self):
+        started = self.started if self.started is not None else time.time()
+        return "".join(self.parts), started, max(0.0, time.time() - started)
+
+
+def _pdf_parallel_sync(pool: ProcessPoolExecutor, path: str, max_chars: int, deadline: Optional[float]):
+    merge = _PdfMerge(max_chars)
+    while True:
+        ranges = merge.wave()
+        if not ranges:
+            return merge.result()
+        futs = [pool.submit(timed_extract_pages, path, first, count, merge.budget()) for first, count in ranges]
+        merge.add([f.result(timeout=_remaining(deadline)) for f in futs])
+
+
+async def _pdf_parallel_async(pool: ProcessPoolExecutor, path: str, max_chars: int, deadline: Optional[float]):
+    merge = _PdfMerge(max_chars)
+    while True:
+        ranges = merge.wave()
+        if not ranges:
+            return merge.result()
+        futs = [
+            asyncio.wrap_future(pool.submit(timed_extract_pages, path, first, count, merge.budget()))
+            for first, count in ranges
+        ]
+        merge.add(await asyncio.wait_for(asyncio.gather(*futs), _remaining(deadline)))
+
+
+def _run_sync(path: str, max_chars: int):
+    submitted = time.time()
+    if EXTRACT_POOL_SIZE <= 0:
+        result = timed_extract(path, max_chars)
+        EXTRACT_QUEUE_WAIT.observe(max(0.0, result[1] - submitted))
+        return result
+
+    deadline = time.monotonic() + EXTRACT_TIMEOUT_SEC if EXTRACT_TIMEOUT_SEC > 0 else None
+    for attempt in (1, 2):
+        pool = _get_pool()
+        try:
+            if _page_parallel(path):
+                result = _pdf_parallel_sync(pool, path, max_chars, deadline)
+            else:
+                result = pool.submit(timed_extract, path, max_chars).result(timeout=_remaining(deadline))
+        except FutureTimeoutError:
+            log.warning(f"[EXTRACT] timeout after {EXTRACT_TIMEOUT_SEC}s, recycling pool: {path}")
+            _kill_pool(pool)
+            raise ExtractTimeoutError(f"Text extraction timed out after {EXTRACT_TIMEOUT_SEC:g}s")
+        except BrokenProcessPool:
+            _kill_pool(pool)
+            if attempt == 2:
+                raise
+            continue
+        EXTRACT_QUEUE_WAIT.observe(max(0.0, result[1] - submitted))
+        return result
+
+
+async def _run(path: str, max_chars: int):
+    submitted = time.time()
+    if EXTRACT_POOL_SIZE <= 0:
+        # thread tidak bisa dimatikan: timeout hanya melepas request, ekstraksi jalan terus
+        try:
+            result = await asyncio.wait_for(run_in_threadpool(timed_extract, path, max_chars), EXTRACT_TIMEOUT_SEC or None)
+        except asyncio.TimeoutError:
+            raise ExtractTimeoutError(f"Text extraction timed out after {EXTRACT_TIMEOUT_SEC:g}s")
+        EXTRACT_QUEUE_WAIT.observe(max(0.0, result[1] - submitted))
+        return result
+
+    deadline = time.monotonic() + EXTRACT_TIMEOUT_SEC if EXTRACT_TIMEOUT_SEC > 0 else None
+    for attempt in (1, 2):
+        pool = _get_pool()
+        try:
+            if _page_parallel(path):
+                result = await _pdf_parallel_async(pool, path, max_chars, deadline)
+            else:
+                fut: Future = pool.submit(timed_extract, path, max_chars)
+                result = await asyncio.wait_for(asyncio.wrap_future(fut), _remaining(deadline))
+        except asyncio.TimeoutError:
+            log.warning(f"[EXTRACT] timeout after {EXTRACT_TIMEOUT_SEC}s, recycling pool: {path}")
+            _kill_pool(pool)
+            raise ExtractTimeoutError(f"Text extraction timed out after {EXTRACT_TIMEOUT_SEC:g}s")
+        except BrokenProcessPool:
+            # pool dimatikan oleh timeout file lain (atau proses anak crash): coba sekali di pool baru
+            _kill_pool(pool)
+            if attempt == 2:
+                raise
+            continue
+        EXTRACT_QUEUE_WAIT.observe(max(0.0, result[1] - submitted))
+        return result
@@ -1,28 +1,125 @@
 from __future__ import annotations
 import os
 import mimetypes
+import time
+from io import StringIO
+from typing import Optional, Tuple
 
-from pdfminer.high_level import extract_text as pdf_extract_text
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams, LTChar, LTContainer, LTPage
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from settings import (
+    EXTRACT_MAX_CHARS,
+    EXTRACT_MAX_PAGES,
+    EXTRACT_PROFILE,
+    EXTRACT_PROFILES,
+    UPLOAD_MAX_MB_DOCX,
+    UPLOAD_MAX_MB_PDF,
+    UPLOAD_MAX_MB_TXT,
+)
 try:
     import docx  
     HAS_DOCX = True
 except Exception:
     HAS_DOCX = False
 
-def _read_txt(path: str, limit_mb: float = 5.0) -> str:
+# Profil ekstraksi PDF (EXTRACT_PROFILE). Scoring cukup butuh teks urut baca, bukan layout:
+# - default: LAParams() bawaan pdfminer (sama dengan extract_text)
+# - fast: layout analysis per baris/box saja, tanpa pengelompokan hierarkis box (boxes_flow=None)
+# - raw: tanpa layout analysis; karakter sesuai urutan content stream, baris/spasi dari posisi glyph
+PROFILES = EXTRACT_PROFILES
+
+# Naikkan kalau hasil ekstraksi berubah (library/parameter): teks cache per (sha256, versi) tidak dipakai lagi
+EXTRACTOR_VERSION = f"2-p{EXTRACT_MAX_PAGES}-c{EXTRACT_MAX_CHARS}" + (
+    "" if EXTRACT_PROFILE == "default" else f"-{EXTRACT_PROFILE}"
+)
+
+def _read_txt(path: str, limit_mb: float = UPLOAD_MAX_MB_TXT) -> str:
     size_mb = os.path.getsize(path) / (1024 * 1024)
     if size_mb > limit_mb:
         raise ValueError(f"TXT too large: {size_mb:.2f} MB > {limit_mb} MB")
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
-def _read_pdf(path: str, limit_mb: float = 20.0) -> str:
+def _check_pdf_size(path: str, limit_mb: float = UPLOAD_MAX_MB_PDF) -> None:
     size_mb = os.path.getsize(path) / (1024 * 1024)
     if size_mb > limit_mb:
         raise ValueError(f"PDF too large: {size_mb:.2f} MB > {limit_mb} MB")
-    return pdf_extract_text(path) or ""
 
-def _read_docx(path: str, limit_mb: float = 20.0) -> str:
+class _RawTextConverter(TextConverter):
+    """Profil raw: tulis LTChar sesuai urutan gambar; ganti baris kalau posisi y bergeser."""
+
+    def receive_layout(self, ltpage: LTPage) -> None:
+        prev = None
+        for item in _iter_chars(ltpage):
+            text = item.get_text()
+            if prev is not None:
+                if abs(item.y0 - prev.y0) > min(item.height, prev.height) / 2:
+                    self.write_text("\n")
+                elif (
+                    item.x0 - prev.x1 > max(item.width, prev.width) / 4
+                    and not text.isspace()
+                    and not prev.get_text().isspace()
+                ):
+                    self.write_text(" ")  # glyph diposisikan terpisah (Td/TJ) tanpa karakter spasi
+            self.write_text(text)
+            prev = item
+        self.write_text("\n\f" if prev is not None else "\f")
+
+
+def _iter_chars(item):
+    for child in item:
+        if isinstance(child, LTChar):
+            yield child
+        elif isinstance(child, LTContainer):
+            yield from _iter_chars(child)
+
+
+def _device(rsrcmgr: PDFResourceManager, out: StringIO, profile: str) -> TextConverter:
+    if profile == "default":
+        return TextConverter(rsrcmgr, out, laparams=LAParams())
+    if profile == "fast":
+        return TextConverter(rsrcmgr, out, laparams=LAParams(boxes_flow=None))
+    if profile == "raw":
+        return _RawTextConverter(rsrcmgr, out, laparams=None)
+    raise ValueError(f"Unknown extraction profile {profile!r}, expected one of {', '.join(PROFILES)}")
+
+
+def read_pdf_pages(
+    path: str, first: int = 0, count: int = 0, max_chars: int = 0, profile: Optional[str] = None
+) -> Tuple[str, int, bool]:
+    """
+    Ekstrak halaman [first, first+count) saja (count 0 = sampai habis), berhenti begitu
+    teks mencapai max_chars. Tiap halaman diakhiri form feed seperti pdfminer extract_text
+    (profil default: output sama persis), jadi hasil beberapa range bisa digabung berurutan.
+    Return (teks, jumlah halaman diproses, eof).
+    """
+    pagenos = set(range(first, first + count)) if count > 0 else None
+    done = 0
+    with open(path, "rb") as fp, StringIO() as out:
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = _device(rsrcmgr, out, profile or EXTRACT_PROFILE)
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for pageno, page in enumerate(PDFPage.get_pages(fp, caching=True)):
+            if pageno < first:
+                continue
+            if pagenos is not None and pageno not in pagenos:
+                return out.getvalue(), done, False
+            interpreter.process_page(page)
+            done += 1
+            if max_chars > 0 and out.tell() >= max_chars:
+                return out.getvalue(), done, False
+        return out.getvalue(), done, True
+
+def _read_pdf(
+    path: str, limit_mb: float = UPLOAD_MAX_MB_PDF, max_pages: int = 0, max_chars: int = 0,
+    profile: Optional[str] = None,
+) -> str:
+    _check_pdf_size(path, limit_mb)
+    return read_pdf_pages(path, 0, max(0, max_pages), max_chars, profile)[0] or ""
+
+def _read_docx(path: str, limit_mb: float = UPLOAD_MAX_MB_DOCX) -> str:
     if not HAS_DOCX:
         raise RuntimeError("python-docx not installed")
     size_mb = os.path.getsize(path) / (1024 * 1024)
@@ -41,12 +138,37 @@ def sniff_type(path: str) -> str:
     if mime in {"text/plain", "text/markdown"}: return "txt"
     return "unknown"
 
-def extract_text_from_file(path: str) -> str:
+def extract_text_from_file(
+    path: str, max_pages: Optional[int] = None, max_chars: Optional[int] = None, profile: Optional[str] = None
+) -> str:
+    """`profile` (default | fast | raw) hanya berlaku untuk PDF; None = EXTRACT_PROFILE."""
     kind = sniff_type(path)
     if kind == "txt":  return _read_txt(path)
-    if kind == "pdf":  return _read_pdf(path)
+    if kind == "pdf":
+        return _read_pdf(
+            path,
+            max_pages=EXTRACT_MAX_PAGES if max_pages is None else max_pages,
+            max_chars=EXTRACT_MAX_CHARS if max_chars is None else max_chars,
+            profile=profile,
+        )
     if kind == "docx": return _read_docx(path)
     try:
         return _read_txt(path, limit_mb=1.0)
     except Exception:
         return ""
+
+def timed_extract(path: str, max_chars: Optional[int] = None) -> Tuple[str, float, float]:
+    """Entry point proses pool: (teks, waktu mulai epoch, durasi detik) untuk metrik antrean."""
+    started = time.time()
+    t0 = time.perf_counter()
+    text = extract_text_from_file(path, max_chars=max_chars)
+    return text, started, time.perf_counter() - t0
+
+
+def timed_extract_pages(path: str, first: int, count: int, max_chars: int) -> Tuple[str, float, float, int, bool]:
+    """Entry point proses pool untuk satu range halaman PDF: (teks, mulai, durasi, halaman, eof)."""
+    started = time.time()
+    t0 = time.perf_counter()
+    _check_pdf_size(path)
+    text, done, eof = read_pdf_pages(path, first, count, max_chars)
+    return text, started, time.perf_counter() - t0, done, eof
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import logging, threading, time
+from typing import Any, Dict, Optional
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (dibutuhkan httpx untuk http2=True)
+    HAS_H2 = True
+except Exception:
+    HAS_H2 = False
+
+from settings import (
+    HTTP_POOL_HTTP2,
+    HTTP_POOL_KEEPALIVE_SEC,
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE,
+    LLM_TIMEOUT_SEC,
+)
+
+log = logging.getLogger("http_pool")
+
+# Satu httpx.Client (thread-safe) per nama, dipakai ulang lintas job supaya koneksi
+# TCP+TLS ke provider tetap keep-alive.
+_clients: Dict[str, "httpx.Client"] = {}
+_counters: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _hooks(name: str) -> Dict[str, list]:
+    c = _counters[name]
+
+    def on_request(_request) -> None:
+        with _lock:
+            c["requests"] += 1
+
+    def on_response(_response) -> None:
+        with _lock:
+            c["responses"] += 1
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def get_client(name: str, timeout: Optional[float] = None) -> "httpx.Client":
+    """Ambil (atau buat sekali) client ber-pool untuk `name`, mis. "llm" atau "embed"."""
+    if httpx is None:
+        raise RuntimeError("httpx is not installed.")
+    client = _clients.get(name)
+    if client is not None and not client.is_closed:
+        return client
+    with _lock:
+        client = _clients.get(name)
+        if client is not None and not client.is_closed:
+            return client
+        t = float(timeout or LLM_TIMEOUT_SEC)
+        http2 = bool(HTTP_POOL_HTTP2)
+        if http2 and not HAS_H2:
+            log.warning("[HTTP] HTTP_POOL_HTTP2=1 but 'h2' is not installed; falling back to HTTP/1.1")
+            http2 = False
+        limits = httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_POOL_KEEPALIVE_SEC,
+        )
+        _counters[name] = {"requests": 0, "responses": 0, "created_at": time.time(), "http2": http2}
+        client = httpx.Client(
+            timeout=httpx.Timeout(connect=t, read=t, write=t, pool=t),
+            limits=limits,
+            http2=http2,
+            trust_env=True,
+            event_hooks=_hooks(name),
+        )
+        _clients[name] = client
+        log.info(
+            f"[HTTP] pool '{name}' created max_conn={HTTP_POOL_MAX_CONNECTIONS} "
+            f"keepalive={HTTP_POOL_MAX_KEEPALIVE} expiry={HTTP_POOL_KEEPALIVE_SEC}s http2={http2}"
+        )
+        return client
+
+
+def _connection_stats(client: "httpx.Client") -> Dict[str, int]:
+    # httpcore tidak punya API publik untuk ini; best-effort saja
+    try:
+        conns = list(client._transport._pool.connections)  # type: ignore[attr-defined]
+    except Exception:
+        return {}
+    idle = sum(1 for c in conns if c.is_idle())
+    return {"connections": len(conns), "idle": idle, "active": len(conns) - idle}
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        items = list(_clients.items())
+        counters = {k: dict(v) for k, v in _counters.items()}
+    for name, client in items:
+        c = counters.get(name, {})
+        out[name] = {
+            "requests": c.get("requests", 0),
+            "responses": c.get("responses", 0),
+            "http2": c.get("http2", False),
+            "age_sec": round(time.time() - c.get("created_at", time.time()), 1),
+            "closed": client.is_closed,
+            "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_POOL_MAX_KEEPALIVE,
+            **_connection_stats(client),
+        }
+    return out
+
+
+def close_all() -> None:
+    with _lock:
+        items = list(_clients.items())
+        _clients.clear()
+    for name, client in items:
+        try:
+            client.close()
+            log.info(f"[HTTP] pool '{name}' closed")
+        except Exception as e:
+            log.warning(f"[HTTP] pool '{name}' close error: {e}")
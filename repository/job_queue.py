@@ -0,0 +1,193 @@
+from __future__ import annotations
+import json, logging, threading, time, uuid
+from datetime import timedelta
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models import Job, SessionLocal, sync_engine
+from models.Enums import JobStatus
+from core.logging_config import shutdown_logging
+from core.metrics import instrument_engine_pool, start_metrics_flusher, stop_metrics_flusher
+from repository.pipeline import run_pipeline_background
+from repository.rag import start_corpus_listener, stop_corpus_listener
+from settings import (
+    JOB_HEARTBEAT_SEC,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL_SEC,
+    JOB_VISIBILITY_TIMEOUT_SEC,
+)
+
+log = logging.getLogger("be-service.worker")
+
+
+# ---------- Queue primitives (tabel jobs + ix_jobs_status_created) ----------
+def claim_next_job(db: Session) -> Optional[uuid.UUID]:
+    """
+    Ambil job queued paling lama dan tandai processing dalam satu transaksi.
+    FOR UPDATE SKIP LOCKED membuat beberapa worker bisa claim paralel tanpa saling blok.
+    """
+    stmt = (
+        select(Job.id)
+        .where(Job.status == JobStatus.queued)
+        .order_by(Job.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = db.scalar(stmt)
+    if job_id is None:
+        db.rollback()
+        return None
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status=JobStatus.processing, attempts=Job.attempts + 1, updated_at=func.now())
+    )
+    db.commit()
+    return job_id
+
+
+def touch_jobs(db: Session, job_ids: Iterable[uuid.UUID]) -> None:
+    ids = list(job_ids)
+    if not ids:
+        return
+    db.execute(
+        update(Job)
+        .where(Job.id.in_(ids), Job.status == JobStatus.processing)
+        .values(updated_at=func.now())
+    )
+    db.commit()
+
+
+def requeue_stale_jobs(
+    db: Session,
+    older_than_sec: float = JOB_VISIBILITY_TIMEOUT_SEC,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> int:
+    """
+    Job processing tanpa heartbeat (worker mati/restart) dikembalikan ke antrean. Job yang sudah
+    di-claim `max_attempts` kali ditandai failed: kemungkinan job itu sendiri yang membunuh worker.
+    Return jumlah job yang di-requeue.
+    """
+    stale = (
+        Job.status == JobStatus.processing,
+        Job.updated_at < func.now() - timedelta(seconds=float(older_than_sec)),
+    )
+    if max_attempts > 0:
+        failed = db.execute(
+            update(Job)
+            .where(*stale, Job.attempts >= max_attempts)
+            .values(
+                status=JobStatus.failed,
+                error=json.dumps({
+                    "type": "WorkerLost",
+                    "message": f"worker stopped responding on each of {max_attempts} attempts; not requeued",
+                    "step": None,
+                }),
+                updated_at=func.now(),
+            )
+            .returning(Job.id)
+        ).scalars().all()
+        for job_id in failed:
+            log.error(f"[WORKER] job={job_id} failed after {max_attempts} lost attempts")
+    res = db.execute(
+        update(Job)
+        .where(*stale)
+        .values(status=JobStatus.queued, updated_at=func.now())
+    )
+    db.commit()
+    return int(res.rowcount or 0)
+
+
+def queue_depth(db: Session) -> int:
+    return int(db.scalar(select(func.count()).select_from(Job).where(Job.status == JobStatus.queued)) or 0)
+
+
+# ---------- Worker process ----------
+class WorkerProcess:
+    """
+    Satu proses worker dengan `concurrency` thread; tiap thread loop claim -> run pipeline.
+    Job yang sedang jalan di-heartbeat berkala (updated_at) supaya tidak dianggap stale.
+    """
+
+    def __init__(self, concurrency: int = 1, stop_event: Optional[threading.Event] = None):
+        self.concurrency = max(1, int(concurrency))
+        self.stop_event = stop_event or threading.Event()
+        self._running: Set[uuid.UUID] = set()
+        self._lock = threading.Lock()
+
+    def _loop(self, idx: int) -> None:
+        idle = JOB_POLL_INTERVAL_SEC
+        while not self.stop_event.is_set():
+            job_id = None
+            db = SessionLocal()
+            try:
+                job_id = claim_next_job(db)
+            except Exception as e:
+                log.error(f"[WORKER] claim error: {e}")
+            finally:
+                db.close()
+
+            if job_id is None:
+                # backoff ringan saat antrean kosong
+                self.stop_event.wait(idle)
+                idle = min(idle * 2, JOB_POLL_INTERVAL_SEC * 8)
+                continue
+
+            idle = JOB_POLL_INTERVAL_SEC
+            with self._lock:
+                self._running.add(job_id)
+            t0 = time.time()
+            try:
+                log.info(f"[WORKER] thread={idx} job={job_id} started")
+                run_pipeline_background(job_id)
+                log.info(f"[WORKER] thread={idx} job={job_id} done in {(time.time() - t0) * 1000:.0f} ms")
+            except Exception as e:
+                log.error(f"[WORKER] job={job_id} crashed: {e}")
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+
+    def _housekeeping(self) -> None:
+        last_requeue = 0.0
+        while not self.stop_event.wait(JOB_HEARTBEAT_SEC):
+            db = SessionLocal()
+            try:
+                with self._lock:
+                    running = list(self._running)
+                touch_jobs(db, running)
+                if time.time() - last_requeue >= JOB_VISIBILITY_TIMEOUT_SEC / 2:
+                    n = requeue_stale_jobs(db)
+                    last_requeue = time.time()
+                    if n:
+                        log.warning(f"[WORKER] requeued {n} stale job(s)")
+            except Exception as e:
+                log.error(f"[WORKER] housekeeping error: {e}")
+            finally:
+                db.close()
+
+    def run(self) -> None:
+        # koneksi pool hasil fork dari parent tidak boleh dipakai ulang
+        sync_engine.dispose(close=False)
+        instrument_engine_pool(sync_engine, "sync")
+        start_metrics_flusher()
+        start_corpus_listener()
+        threads: List[threading.Thread] = [
+            threading.Thread(target=self._loop, args=(i,), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        threads.append(threading.Thread(target=self._housekeeping, name="job-heartbeat", daemon=True))
+        for t in threads:
+            t.start()
+        log.info(f"[WORKER] process started concurrency={self.concurrency}")
+        try:
+            while not self.stop_event.wait(1.0):
+                pass
+        finally:
+            for t in threads:
+                t.join(timeout=60)
+            stop_corpus_listener()
+            stop_metrics_flusher()
+            log.info("[WORKER] process stopped")
+            shutdown_logging()
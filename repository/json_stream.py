@@ -0,0 +1,72 @@
+from __future__ import annotations
+import json
+from typing import Any, Optional
+
+
+class JsonObjectScanner:
+    """
+    Scanner inkremental untuk objek JSON top-level di dalam teks yang datang per potongan (stream SSE).
+
+    Teks sebelum `{` pertama (mis. pagar ```json) diabaikan. `feed()` mengembalikan True begitu
+    kurung kurawal top-level tertutup dan isinya valid JSON; sisa output model bisa dibuang.
+    String & escape dilacak supaya `{`/`}` di dalam nilai string tidak dihitung.
+    """
+
+    def __init__(self) -> None:
+        self._buf: list[str] = []
+        self._start: Optional[int] = None  # offset `{` pertama dalam teks gabungan
+        self._pos = 0                      # jumlah karakter yang sudah dipindai
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self.result: Optional[str] = None
+        self.value: Any = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    @property
+    def text(self) -> str:
+        """Semua teks yang sudah diterima."""
+        if len(self._buf) > 1:
+            self._buf = ["".join(self._buf)]
+        return self._buf[0] if self._buf else ""
+
+    def feed(self, chunk: str) -> bool:
+        if self.done or not chunk:
+            return self.done
+        self._buf.append(chunk)
+        base = self._pos
+        self._pos += len(chunk)
+        for i, ch in enumerate(chunk):
+            if self._start is None:
+                if ch == "{":
+                    self._start = base + i
+                    self._depth = 1
+                continue
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = True
+            elif ch == "{" or ch == "[":
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self.text[self._start:base + i + 1]
+                    try:
+                        self.value = json.loads(candidate)
+                    except ValueError:
+                        # bukan JSON valid (mis. `{` di prosa sebelum jawaban): cari objek berikutnya
+                        self._start = None
+                        continue
+                    self.result = candidate
+                    return True
+        return False
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import hashlib, json, logging, threading
+from typing import Any, Dict, Optional, Tuple
+
+from core.cache import DiskCache, LRUCache
+from settings import (
+    LLM_CACHE_DIR,
+    LLM_CACHE_DISK_MAX_MB,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SEC,
+)
+
+log = logging.getLogger("llm")
+
+
+def make_key(
+    *,
+    model: str,
+    messages: Any,
+    temperature: float,
+    max_tokens: int,
+    response_format: Optional[Dict[str, Any]],
+) -> str:
+    """Content-addressed key: sha256 dari seluruh input yang menentukan output LLM."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "response_format": response_format,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Dua tier: LRU in-process lalu disk (opsional, dipakai bersama antar proses)."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (content, tier) dengan tier "memory" | "disk" | None."""
+        val = self.memory.get(key)
+        if val is not None:
+            return val, "memory"
+        if self.disk is not None:
+            val = self.disk.get(key)
+            if val is not None:
+                self.memory.set(key, val)
+                return val, "disk"
+        return None, None
+
+    def set(self, key: str, content: str) -> None:
+        self.memory.set(key, content)
+        if self.disk is not None:
+            self.disk.set(key, content)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                disk = None
+                if LLM_CACHE_DIR:
+                    try:
+                        disk = DiskCache(
+                            LLM_CACHE_DIR,
+                            max_bytes=int(LLM_CACHE_DISK_MAX_MB * 1024 * 1024),
+                            ttl_sec=LLM_CACHE_TTL_SEC,
+                        )
+                    except Exception as e:
+                        log.warning(f"[LLM] disk cache disabled ({LLM_CACHE_DIR}): {e}")
+                _cache = LLMResponseCache(LRUCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SEC), disk)
+    return _cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
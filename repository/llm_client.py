@@ -1,9 +1,37 @@
 from __future__ import annotations
-import os, json, re, logging, time
+import os, json, re, logging, time, threading
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 
-from settings import GROQ_API_KEY, LLM_FAILOPEN, LLM_MODEL, LLM_PROVIDER, LLM_RETRIES, LLM_TIMEOUT_SEC
+from settings import (
+    GROQ_API_KEY,
+    LLM_CB_ENABLED,
+    LLM_CB_ERROR_RATE,
+    LLM_CB_HALF_OPEN_CALLS,
+    LLM_CB_MIN_CALLS,
+    LLM_CB_OPEN_SEC,
+    LLM_CB_SLOW_CALL_SEC,
+    LLM_CB_WINDOW_SEC,
+    LLM_CACHE_SAMPLED,
+    LLM_FAILOPEN,
+    LLM_MODEL,
+    LLM_PROVIDER,
+    LLM_RETRIES,
+    LLM_STREAM,
+    LLM_TIMEOUT_SEC,
+)
+from core.metrics import LLM_CACHE_HITS, LLM_CIRCUIT_OPEN, LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS, LLM_TTFT
+from repository.http_pool import get_client
+from repository.json_stream import JsonObjectScanner
+from repository.llm_cache import get_llm_cache, make_key
+from repository.rate_limit import (
+    RateLimitTimeout,
+    backoff_delay,
+    estimate_request_tokens,
+    get_rate_limiter,
+    parse_retry_after,
+)
 
 try:
     import httpx
@@ -12,10 +40,179 @@ except Exception:
 
 log = logging.getLogger("llm")
 
+# status yang layak di-retry; 4xx lain (auth, payload salah) langsung gagal
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+def _retry_info(exc: Exception) -> tuple[bool, float | None]:
+    """(retryable, retry_after_sec) untuk exception dari _chat_once."""
+    if httpx is not None and isinstance(exc, httpx.HTTPStatusError):
+        resp = exc.response
+        retryable = resp.status_code in _RETRYABLE_STATUS
+        return retryable, parse_retry_after(resp.headers.get("retry-after")) if retryable else None
+    return True, None
+
+def parse_json_text(text: str) -> Any:
+    """JSON dari output model (boleh berpagar ```json atau berprosa di sekitarnya); {} kalau gagal."""
+    text = re.sub(r"^```(json)?\s*|\s*```$", "", (text or "").strip(), flags=re.I)
+    try:
+        return json.loads(text)
+    except Exception:
+        m = re.search(r"\{.*\}", text, flags=re.S)
+        if m:
+            try:
+                return json.loads(m.group(0))
+            except Exception:
+                pass
+        return {}
+
+def _cacheable(out: str, force_json: bool, temperature: float) -> bool:
+    """
+    Yang disimpan hanya jawaban yang layak diputar ulang selama TTL: tidak kosong, untuk JSON
+    harus ter-parse jadi objek tidak kosong (bukan prosa/stream terpotong), dan temperature 0
+    kecuali LLM_CACHE_SAMPLED.
+    """
+    if not out:
+        return False
+    if temperature > 0 and not LLM_CACHE_SAMPLED:
+        return False
+    if force_json:
+        parsed = parse_json_text(out)
+        return isinstance(parsed, dict) and bool(parsed)
+    return True
+
 @dataclass
 class LLMResponse:
     content: str
 
+class LLMUnavailableError(RuntimeError):
+    """Circuit breaker terbuka: caller sebaiknya langsung pakai fallback (heuristik)."""
+
+class CircuitBreaker:
+    """
+    closed -> open kalau dalam `window_sec` terakhir ada >= `min_calls` panggilan dan rasio gagal
+    (error atau lebih lambat dari `slow_call_sec`) >= `error_rate`.
+    open -> half_open setelah `open_sec`; di half_open hanya `half_open_calls` probe yang boleh lewat,
+    sukses menutup kembali, gagal membuka lagi. Probe yang tidak pernah di-record (dilepas lewat
+    release_probe, atau hilang) tidak boleh mengunci breaker: kalau semua probe sudah keluar lebih
+    lama dari `open_sec` tanpa hasil, breaker kembali open lalu probe ulang.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        *,
+        window_sec: float = LLM_CB_WINDOW_SEC,
+        min_calls: int = LLM_CB_MIN_CALLS,
+        error_rate: float = LLM_CB_ERROR_RATE,
+        slow_call_sec: float = LLM_CB_SLOW_CALL_SEC,
+        open_sec: float = LLM_CB_OPEN_SEC,
+        half_open_calls: int = LLM_CB_HALF_OPEN_CALLS,
+    ):
+        self.window_sec = float(window_sec)
+        self.min_calls = max(1, int(min_calls))
+        self.error_rate = float(error_rate)
+        self.slow_call_sec = float(slow_call_sec)
+        self.open_sec = float(open_sec)
+        self.half_open_calls = max(1, int(half_open_calls))
+        self._state = self.CLOSED
+        self._calls: deque = deque()  # (ts, failed)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self.opened_count = 0
+        self.rejected = 0
+
+    def _maybe_half_open(self, now: float) -> None:
+        if (
+            self._state == self.HALF_OPEN
+            and self._probes >= self.half_open_calls
+            and now - self._probe_at >= self.open_sec
+        ):
+            log.warning(f"[LLM] circuit half-open probes unanswered for {self.open_sec:.0f}s; reopening")
+            self._open(now)
+        if self._state == self.OPEN and now - self._opened_at >= self.open_sec:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+            log.warning("[LLM] circuit half-open; probing provider")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                self._probe_at = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def release_probe(self) -> None:
+        """Kembalikan jatah probe half-open yang dipakai allow() tapi tidak jadi memanggil provider."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.opened_count += 1
+        LLM_CIRCUIT_OPEN.set(1)
+        log.error(f"[LLM] circuit OPEN for {self.open_sec:.0f}s")
+
+    def record(self, ok: bool, latency_sec: float) -> None:
+        failed = (not ok) or latency_sec > self.slow_call_sec
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                    LLM_CIRCUIT_OPEN.set(0)
+                    log.warning("[LLM] circuit closed")
+                return
+            if self._state == self.OPEN:
+                return
+            self._calls.append((now, failed))
+            while self._calls and now - self._calls[0][0] > self.window_sec:
+                self._calls.popleft()
+            n = len(self._calls)
+            if n >= self.min_calls:
+                fails = sum(1 for _ts, f in self._calls if f)
+                if fails / n >= self.error_rate:
+                    self._open(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            n = len(self._calls)
+            fails = sum(1 for _ts, f in self._calls if f)
+            return {
+                "state": self._state,
+                "window_calls": n,
+                "window_failures": fails,
+                "opened_count": self.opened_count,
+                "rejected": self.rejected,
+            }
+
+def _usage(raw: Dict[str, Any]) -> Dict[str, int]:
+    return {
+        "prompt_tokens": int(raw.get("prompt_tokens") or 0),
+        "completion_tokens": int(raw.get("completion_tokens") or 0),
+        "total_tokens": int(raw.get("total_tokens") or 0),
+    }
+
 class MockLLM:
     def __init__(self):
         self.last_raw = {"backend": "mock"}
@@ -28,6 +225,18 @@ class MockLLM:
     def generate_json(self, prompt: str, **kwargs):
         p = (prompt or "")
 
+        if self._contains_any(p, ['"project_scores"', 'in one pass']):
+            return {
+                "cv_scores": {"skills":3, "exp":3, "ach":3, "culture":3, "feedback":"Mock CV feedback."},
+                "project_scores": {"corr":3, "code":3, "res":3, "docs":3, "bonus":3, "feedback":"Mock project feedback."},
+                "summary": {
+                    "overall_summary": "Mock summary without a live LLM.",
+                    "recommendation": "hold",
+                    "strengths": ["stable mock path"],
+                    "gaps": ["no model reasoning"],
+                    "next_steps": ["enable LLM or review manually"]
+                },
+            }
         if self._contains_any(p, ['overall_summary', 'return json only with this exact schema']):
             return {
                 "overall_summary": "Mock summary without a live LLM.",
@@ -70,14 +279,105 @@ class GroqLLM:
         self.timeout = float(LLM_TIMEOUT_SEC)
         self.retries = int(LLM_RETRIES)
         self.failopen = bool(LLM_FAILOPEN)
+        self.stream = bool(LLM_STREAM)
+
+        # client keep-alive dipakai bersama (lihat repository/http_pool.py)
+        self._client = get_client("llm", timeout=self.timeout)
 
-        self._timeout = httpx.Timeout(connect=self.timeout, read=self.timeout, write=self.timeout, pool=self.timeout)
-        self._client = httpx.Client(timeout=self._timeout, trust_env=True)
+        # per-thread: stage pipeline bisa memanggil LLM yang sama secara paralel
+        self._local = threading.local()
+        self.breaker: CircuitBreaker | None = CircuitBreaker() if LLM_CB_ENABLED else None
 
-        self.last_error: str | None = None
-        self.last_raw: str | None = None
+        log.info(f"[LLM] Groq init model={self.model} base={self.base_url} timeout={self.timeout}s retries={self.retries} failopen={self.failopen} stream={self.stream}")
 
-        log.info(f"[LLM] Groq init model={self.model} base={self.base_url} timeout={self.timeout}s retries={self.retries} failopen={self.failopen}")
+    @property
+    def last_raw(self) -> str | None:
+        return getattr(self._local, "last_raw", None)
+
+    @last_raw.setter
+    def last_raw(self, value: str | None) -> None:
+        self._local.last_raw = value
+
+    def available(self) -> bool:
+        """False selama circuit breaker open (tanpa memakai jatah probe half-open)."""
+        return self.breaker is None or self.breaker.state != CircuitBreaker.OPEN
+
+    @property
+    def last_cache(self) -> str | None:
+        """Tier cache yang melayani panggilan terakhir di thread ini ("memory" | "disk" | None)."""
+        return getattr(self._local, "last_cache", None)
+
+    @property
+    def last_metrics(self) -> Dict[str, Any] | None:
+        """Metrik panggilan terakhir di thread ini: ttft_ms, total_ms, stream, early_stop, cache, usage, attempts."""
+        return getattr(self._local, "last_metrics", None)
+
+    @property
+    def last_error(self) -> str | None:
+        return getattr(self._local, "last_error", None)
+
+    @last_error.setter
+    def last_error(self, value: str | None) -> None:
+        self._local.last_error = value
+
+    def _raise_for_status(self, r) -> None:
+        try:
+            r.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            body = e.response.text
+            msg = f"HTTP {e.response.status_code}: {body[:1000]}"
+            self.last_error = msg
+            log.error(f"[LLM] {msg}")
+            raise
+
+    def _chat_stream(self, url: str, headers: dict, payload: dict, force_json: bool) -> str:
+        """
+        Konsumsi SSE chunk per chunk. Untuk JSON, stream ditutup begitu objek top-level
+        lengkap & valid (sisa padding dari model tidak ditunggu).
+        """
+        t0 = time.perf_counter()
+        metrics = getattr(self._local, "last_metrics", None) or {}
+        scanner = JsonObjectScanner()
+        parts: list[str] = []
+        body = {**payload, "stream": True}
+        for _ in range(2):
+            with self._client.stream("POST", url, headers=headers, json=body) as r:
+                if r.status_code == 400 and force_json and "response_format" in body:
+                    r.read()
+                    log.warning("[LLM] 400 with response_format=json_object; retrying without response_format")
+                    body.pop("response_format", None)
+                    continue
+                if r.status_code >= 400:
+                    r.read()
+                self._raise_for_status(r)
+                for line in r.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        continue
+                    # usage datang di chunk terakhir (OpenAI: "usage", Groq: "x_groq.usage")
+                    usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+                    if usage:
+                        metrics["usage"] = _usage(usage)
+                    choices = chunk.get("choices") or [{}]
+                    delta = choices[0].get("delta") or {}
+                    piece = delta.get("content") or ""
+                    if not piece:
+                        continue
+                    if metrics.get("ttft_ms") is None:
+                        metrics["ttft_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                    parts.append(piece)
+                    if force_json and scanner.feed(piece):
+                        # keluar dari `with` = koneksi stream ditutup
+                        metrics["early_stop"] = True
+                        break
+            break
+        return scanner.result if scanner.done else "".join(parts)
 
     def _chat_once(self, messages, temperature: float, max_tokens: int, force_json: bool) -> str:
         url = f"{self.base_url}/chat/completions"
@@ -86,6 +386,9 @@ class GroqLLM:
         if force_json:
             payload["response_format"] = {"type": "json_object"}
 
+        if self.stream:
+            return self._chat_stream(url, headers, payload, force_json)
+
         r = self._client.post(url, headers=headers, json=payload)
 
         if r.status_code == 400 and force_json:
@@ -93,76 +396,172 @@ class GroqLLM:
             payload.pop("response_format", None)
             r = self._client.post(url, headers=headers, json=payload)
 
-        try:
-            r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            body = e.response.text
-            msg = f"HTTP {e.response.status_code}: {body[:1000]}"
-            self.last_error = msg
-            log.error(f"[LLM] {msg}")
-            raise
+        self._raise_for_status(r)
 
         data = r.json()
+        if data.get("usage") and getattr(self._local, "last_metrics", None) is not None:
+            self._local.last_metrics["usage"] = _usage(data["usage"])
         return data["choices"][0]["message"]["content"]
 
-    def _chat(self, messages, temperature: float, max_tokens: int, force_json: bool) -> str:
+    def _chat(self, messages, temperature: float, max_tokens: int, force_json: bool, use_cache: bool = True) -> str:
+        self._local.last_cache = None
+        self._local.last_metrics = metrics = {
+            "stream": self.stream, "ttft_ms": None, "total_ms": None,
+            "early_stop": False, "cache": None, "usage": None, "attempts": 0,
+        }
+        # sampling (temperature > 0) tidak di-cache kecuali LLM_CACHE_SAMPLED: lookup juga dilewati
+        cacheable_call = temperature <= 0 or LLM_CACHE_SAMPLED
+        cache = get_llm_cache() if use_cache and cacheable_call else None
+        key = None
+        if cache is not None:
+            key = make_key(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"} if force_json else None,
+            )
+            cached, tier = cache.get(key)
+            if cached is not None:
+                self._local.last_cache = metrics["cache"] = tier
+                LLM_CACHE_HITS.inc(tier=tier)
+                log.info(f"[LLM] cache hit ({tier})")
+                return cached
+
+        limiter = get_rate_limiter()
+        est_tokens = estimate_request_tokens(messages, max_tokens)
         last_err = None
         for attempt in range(self.retries + 1):
+            if self.breaker is not None and not self.breaker.allow():
+                self.last_error = "circuit open"
+                LLM_REQUESTS.inc(outcome="circuit_open")
+                raise LLMUnavailableError("LLM circuit breaker is open")
             t0 = time.time()
+            metrics["attempts"] = attempt + 1
             try:
+                if limiter is not None:
+                    waited = limiter.acquire(est_tokens)
+                    if waited > 0.05:
+                        log.info(f"[LLM] rate limiter waited {waited * 1000:.0f} ms")
                 log.info(f"[LLM] groq call (force_json={force_json}) attempt={attempt+1}")
+                t_call = time.time()
+                metrics["ttft_ms"], metrics["early_stop"], metrics["usage"] = None, False, None
                 out = self._chat_once(messages, temperature, max_tokens, force_json)
+                call_sec = time.time() - t_call
+                if self.breaker is not None:
+                    self.breaker.record(True, call_sec)
+                metrics["total_ms"] = round(call_sec * 1000, 1)
+                LLM_REQUESTS.inc(outcome="ok")
+                LLM_LATENCY.observe(call_sec)
+                if metrics["ttft_ms"] is not None:
+                    LLM_TTFT.observe(metrics["ttft_ms"] / 1000)
+                if metrics["usage"]:
+                    LLM_TOKENS.inc(metrics["usage"]["prompt_tokens"], kind="prompt")
+                    LLM_TOKENS.inc(metrics["usage"]["completion_tokens"], kind="completion")
                 dt = (time.time() - t0) * 1000
-                log.info(f"[LLM] groq ok in {dt:.0f} ms")
+                log.info(f"[LLM] groq ok in {dt:.0f} ms (ttft={metrics['ttft_ms']} early_stop={metrics['early_stop']})")
+                # jawaban fail-open tidak pernah disimpan; respons sukses pun dicek dulu (_cacheable)
+                if cache is not None and _cacheable(out, force_json, temperature):
+                    cache.set(key, out)
+                elif cache is not None:
+                    log.info("[LLM] response not cached (empty/invalid JSON)")
                 return out
             except Exception as e:
                 last_err = e
                 log.warning(f"[LLM] groq error attempt={attempt+1}: {e}")
+                LLM_REQUESTS.inc(outcome="rate_limited" if isinstance(e, RateLimitTimeout) else "error")
+                if self.breaker is not None:
+                    if isinstance(e, RateLimitTimeout):
+                        # provider tidak dipanggil: bukan kegagalan, tapi jatah probe harus dikembalikan
+                        self.breaker.release_probe()
+                    else:
+                        self.breaker.record(False, time.time() - t0)
+                retryable, retry_after = _retry_info(e)
+                if not retryable or attempt >= self.retries:
+                    break
+                delay = backoff_delay(attempt, retry_after)
+                if retry_after is not None and limiter is not None:
+                    # provider minta mundur: tahan semua thread/proses, bukan hanya yang ini
+                    limiter.pause(delay)
+                log.info(f"[LLM] retry in {delay * 1000:.0f} ms")
+                time.sleep(delay)
         if self.failopen:
             self.last_error = f"fail-open after retries: {last_err}"
             log.error(f"[LLM] groq failed after retries; fail-open.")
             return "{}"
         raise last_err
 
-    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1024) -> LLMResponse:
+    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1024, bypass_cache: bool = False) -> LLMResponse:
         content = self._chat(
             messages=[{"role": "user", "content": prompt}],
             temperature=temperature,
             max_tokens=max_tokens,
             force_json=False,
+            use_cache=not bypass_cache,
         )
         self.last_raw = content
         return LLMResponse(content=content)
 
-    def generate_json(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1024) -> dict:
+    def generate_json(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1024, bypass_cache: bool = False) -> dict:
         raw = self._chat(
             messages=[{"role": "user", "content": prompt}],
             temperature=temperature,
             max_tokens=max_tokens,
             force_json=True,
+            use_cache=not bypass_cache,
         )
-        text = raw.strip()
-        self.last_raw = text
-        text = re.sub(r"^```(json)?\s*|\s*```$", "", text, flags=re.I)
-        try:
-            return json.loads(text)
-        except Exception:
-            m = re.search(r"\{.*\}", text, flags=re.S)
-            if m:
-                try:
-                    return json.loads(m.group(0))
-                except Exception:
-                    pass
-            return {}
+        self.last_raw = raw.strip()
+        return parse_json_text(raw)
 
-def get_llm():
+_llm_instance = None
+_llm_lock = threading.Lock()
+# Fallback MockLLM saat Groq gagal dibuat (LLM_FAILOPEN) tidak di-cache sebagai instance:
+# dipakai sementara, lalu konstruksi Groq dicoba lagi setelah _LLM_RETRY_SEC
+_llm_fallback = None
+_llm_retry_at = 0.0
+_LLM_RETRY_SEC = 30.0
+
+def _build_llm():
     backend = (LLM_PROVIDER or "").lower()
     if backend == "groq":
+        return GroqLLM()
+    return MockLLM()
+
+def get_llm():
+    """Instance LLM per-proses (dibuat sekali, dipakai ulang oleh semua job)."""
+    global _llm_instance, _llm_fallback, _llm_retry_at
+    llm = _llm_instance
+    if llm is not None:
+        return llm
+    with _llm_lock:
+        if _llm_instance is not None:
+            return _llm_instance
+        if _llm_fallback is not None and time.monotonic() < _llm_retry_at:
+            return _llm_fallback
         try:
-            return GroqLLM()
+            _llm_instance = _build_llm()
         except Exception as e:
-            if LLM_FAILOPEN:
-                log.error(f"[LLM] Groq init failed: {e}. Fallback to MockLLM.")
-                return MockLLM()
-            raise
-    return MockLLM()
+            if not LLM_FAILOPEN:
+                raise
+            log.error(f"[LLM] Groq init failed: {e}. Fallback to MockLLM, retry in {_LLM_RETRY_SEC:g}s.")
+            _llm_fallback = _llm_fallback or MockLLM()
+            _llm_retry_at = time.monotonic() + _LLM_RETRY_SEC
+            return _llm_fallback
+        _llm_fallback = None
+        return _llm_instance
+
+def llm_status() -> Dict[str, Any]:
+    llm = _llm_instance or _llm_fallback
+    breaker = getattr(llm, "breaker", None)
+    return {
+        "backend": type(llm).__name__ if llm is not None else None,
+        "fallback": _llm_instance is None and _llm_fallback is not None,
+        "breaker": breaker.stats() if breaker is not None else None,
+    }
+
+def close_llm() -> None:
+    global _llm_instance, _llm_fallback, _llm_retry_at
+    with _llm_lock:
+        _llm_instance = None
+        _llm_fallback = None
+        _llm_retry_at = 0.0
@@ -1,14 +1,30 @@
 from __future__ import annotations
 import uuid, json, traceback
-from typing import Any, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, List, Dict, Optional, Sequence
 
 from sqlalchemy.orm import Session
 
-from settings import USE_LLM
-from models.Enums import JobStatus
+from settings import (
+    USE_LLM,
+    PIPELINE_MAX_WORKERS,
+    PIPELINE_BATCH_CONCURRENCY,
+    PIPELINE_MODE,
+    PROMPT_BUDGET_P1,
+    PROMPT_BUDGET_P2,
+    PROMPT_BUDGET_P3,
+    PROMPT_BUDGET_P4,
+    PROMPT_BUDGET_FUSED,
+)
+from models.Enums import ExtractionStatus, JobStatus
 from models import Job, Result, Upload, SessionLocal
 from repository.scoring import aggregate_cv, aggregate_project
 from repository.rag import build_cv_context, build_project_context, infer_job_title
+from repository.stages import Stage, StageError, run_stages
+from repository.prompt_packing import estimate_tokens, pack_fields, pack_text
+from repository.pipeline_metrics import LapTimer, build_job_metrics, observe_job
+from repository.upload_extraction import ensure_extracted
 from core.utils import str_to_bool
 
 from repository.heuristics import extract_cv as hx_extract_cv
@@ -17,10 +33,17 @@ from repository.heuristics import score_project as hx_score_project
 from repository.heuristics import summarize as hx_summarize
 
 use_llm: bool = bool(USE_LLM)
+pipeline_mode: str = PIPELINE_MODE  # sudah divalidasi di settings
 
 if use_llm:
-    from repository.llm_client import get_llm
-    from repository.prompts import P1_CV_EXTRACT, P2_CV_SCORER, P3_PROJECT_SCORER, P4_SUMMARIZER
+    from repository.llm_client import LLMUnavailableError, get_llm
+    from repository.prompts import (
+        P1_CV_EXTRACT,
+        P2_CV_SCORER,
+        P3_PROJECT_SCORER,
+        P4_SUMMARIZER,
+        P5_FUSED_EVALUATOR,
+    )
 
 def _as_list(x: Any) -> List[Any]:
     if x is None:
@@ -118,9 +141,227 @@ def coerce_project_scores(raw: Any) -> Dict[str, Any]:
         "feedback": str(raw.get("feedback") or ""),
     }
 
-def run_pipeline_background(job_id: uuid.UUID) -> None:
+def _llm_stages(
+    llm: Any,
+    *,
+    cv_text: str,
+    project_text: str,
+    cv_ctx: str,
+    project_ctx: str,
+    job_title: str,
+    warnings: list[str],
+    llm_raw: Dict[str, Any],
+    engines: Dict[str, str],
+    llm_metrics: Dict[str, Any],
+    prompt_tokens: Dict[str, int],
+    mode: str = "staged",
+) -> List[Stage]:
+    # staged: P1 -> P2, P3 independen, P4 setelah P2 & P3
+    # fused:  P1 -> P5 (skor CV + skor proyek + ringkasan dalam satu panggilan)
+    def p1(_: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = P1_CV_EXTRACT.format(
+            cv_text=pack_text(cv_text, PROMPT_BUDGET_P1, query=f"{job_title}\n{cv_ctx}"),
+        )
+        prompt_tokens["p1"] = estimate_tokens(prompt)
+        out = llm.generate_json(prompt, temperature=0.0, max_tokens=512)
+        llm_raw["p1"] = getattr(llm, "last_raw", None)
+        llm_metrics["p1"] = getattr(llm, "last_metrics", None)
+        try:
+            return coerce_cv_extracted(out)
+        except Exception as e:
+            warnings.append(f"P1 coerce error: {e}")
+            return coerce_cv_extracted({})
+
+    def p2(deps: Dict[str, Any]) -> Dict[str, Any]:
+        cv_extracted = json.dumps(deps["p1_extract"], ensure_ascii=False)
+        prompt = P2_CV_SCORER.format(
+            job_title=job_title,
+            cv_extracted=cv_extracted,
+            cv_ctx=pack_text(
+                cv_ctx,
+                max(1000, PROMPT_BUDGET_P2 - estimate_tokens(cv_extracted)),
+                query=f"{job_title}\n{cv_extracted}",
+            ),
+        )
+        prompt_tokens["p2"] = estimate_tokens(prompt)
+        out = llm.generate_json(prompt, temperature=0.1, max_tokens=256)
+        llm_raw["p2"] = getattr(llm, "last_raw", None)
+        llm_metrics["p2"] = getattr(llm, "last_metrics", None)
+        try:
+            return coerce_cv_scores(out)
+        except Exception as e:
+            warnings.append(f"P2 coerce error: {e}")
+            return {"skills": 3, "exp": 3, "ach": 3, "culture": 3, "feedback": "fallback"}
+
+    def p3(_: Dict[str, Any]) -> Dict[str, Any]:
+        packed = pack_fields(PROMPT_BUDGET_P3, {
+            "project_text": (project_text, f"{job_title}\n{project_ctx}"),
+            "project_ctx": (project_ctx, f"{job_title}\n{project_text}"),
+        })
+        prompt = P3_PROJECT_SCORER.format(job_title=job_title, **packed)
+        prompt_tokens["p3"] = estimate_tokens(prompt)
+        out = llm.generate_json(prompt, temperature=0.1, max_tokens=256)
+        llm_raw["p3"] = getattr(llm, "last_raw", None)
+        llm_metrics["p3"] = getattr(llm, "last_metrics", None)
+        try:
+            return coerce_project_scores(out)
+        except Exception as e:
+            warnings.append(f"P3 coerce error: {e}")
+            return {"corr": 3, "code": 3, "res": 3, "docs": 3, "bonus": 3, "feedback": "fallback"}
+
+    def p4(deps: Dict[str, Any]) -> Dict[str, Any]:
+        cv_scores = json.dumps(deps["p2_cv_score"], ensure_ascii=False)
+        proj_scores = json.dumps(deps["p3_project_score"], ensure_ascii=False)
+        packed = pack_fields(PROMPT_BUDGET_P4, {
+            "cv_ctx": (cv_ctx, cv_scores),
+            "project_ctx": (project_ctx, proj_scores),
+        })
+        prompt = P4_SUMMARIZER.format(
+            job_title=job_title,
+            cv_scores=cv_scores,
+            proj_scores=proj_scores,
+            **packed,
+        )
+        prompt_tokens["p4"] = estimate_tokens(prompt)
+        summary_json: Any = {}
+        try:
+            summary_json = llm.generate_json(prompt, temperature=0.2, max_tokens=256)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            warnings.append(f"P4 generate_json error: {e}")
+            summary_json = {}
+        llm_raw["p4"] = getattr(llm, "last_raw", None)
+        llm_metrics["p4"] = getattr(llm, "last_metrics", None)
+        return summary_json
+
+    def p5(deps: Dict[str, Any]) -> Dict[str, Any]:
+        cv_extracted = json.dumps(deps["p1_extract"], ensure_ascii=False)
+        packed = pack_fields(max(1000, PROMPT_BUDGET_FUSED - estimate_tokens(cv_extracted)), {
+            "cv_ctx": (cv_ctx, f"{job_title}\n{cv_extracted}"),
+            "project_text": (project_text, f"{job_title}\n{project_ctx}"),
+            "project_ctx": (project_ctx, f"{job_title}\n{project_text}"),
+        })
+        prompt = P5_FUSED_EVALUATOR.format(job_title=job_title, cv_extracted=cv_extracted, **packed)
+        prompt_tokens["p5"] = estimate_tokens(prompt)
+        out = llm.generate_json(prompt, temperature=0.1, max_tokens=768)
+        llm_raw["p5"] = getattr(llm, "last_raw", None)
+        llm_metrics["p5"] = getattr(llm, "last_metrics", None)
+        if not isinstance(out, dict):
+            out = {}
+        for key in ("cv_scores", "project_scores", "summary"):
+            if not isinstance(out.get(key), dict):
+                warnings.append(f"P5 missing/invalid '{key}'")
+        try:
+            cv_scores = coerce_cv_scores(out.get("cv_scores"))
+        except Exception as e:
+            warnings.append(f"P5 cv coerce error: {e}")
+            cv_scores = {"skills": 3, "exp": 3, "ach": 3, "culture": 3, "feedback": "fallback"}
+        try:
+            proj_scores = coerce_project_scores(out.get("project_scores"))
+        except Exception as e:
+            warnings.append(f"P5 project coerce error: {e}")
+            proj_scores = {"corr": 3, "code": 3, "res": 3, "docs": 3, "bonus": 3, "feedback": "fallback"}
+        summary = out.get("summary") if isinstance(out.get("summary"), dict) else {}
+        return {"cv": cv_scores, "project": proj_scores, "summary": summary}
+
+    # fallback per stage ke heuristik yang setara kalau circuit breaker LLM open
+    def hx1(_: Dict[str, Any]) -> Dict[str, Any]:
+        return hx_extract_cv(cv_text)
+
+    def hx2(deps: Dict[str, Any]) -> Dict[str, Any]:
+        return hx_score_cv(deps["p1_extract"], cv_ctx=cv_ctx)
+
+    def hx3(_: Dict[str, Any]) -> Dict[str, Any]:
+        return hx_score_project(project_text, project_ctx=project_ctx)
+
+    def hx4(deps: Dict[str, Any]) -> Dict[str, Any]:
+        return {"overall_summary": hx_summarize(deps["p2_cv_score"], deps["p3_project_score"])}
+
+    def hx5(deps: Dict[str, Any]) -> Dict[str, Any]:
+        cv_scores, proj_scores = hx2(deps), hx3(deps)
+        summary = hx4({"p2_cv_score": cv_scores, "p3_project_score": proj_scores})
+        return {"cv": cv_scores, "project": proj_scores, "summary": summary}
+
+    def failed_open() -> bool:
+        # LLM_FAILOPEN: GroqLLM mengembalikan "{}" setelah retry habis, bukan raise
+        return str(getattr(llm, "last_error", None) or "").startswith("fail-open")
+
+    def guarded(name: str, fn, fallback):
+        def run(deps: Dict[str, Any]) -> Dict[str, Any]:
+            available = getattr(llm, "available", None)
+            if available is None or available():
+                if hasattr(llm, "last_error"):
+                    llm.last_error = None  # per thread; sisa error dari stage sebelumnya
+                try:
+                    out = fn(deps)
+                    if not failed_open():
+                        engines[name] = "llm"
+                        return out
+                    warnings.append(f"{name}: {llm.last_error}; heuristic fallback")
+                except LLMUnavailableError as e:
+                    warnings.append(f"{name}: {e}; heuristic fallback")
+            engines[name] = "heuristic"
+            return fallback(deps)
+        return run
+
+    if mode == "fused":
+        # output dipetakan ke nama stage yang sama dengan mode staged
+        return [
+            Stage("p1_extract", guarded("p1_extract", p1, hx1)),
+            Stage("p5_fused", guarded("p5_fused", p5, hx5), ("p1_extract",)),
+            Stage("p2_cv_score", lambda d: d["p5_fused"]["cv"], ("p5_fused",)),
+            Stage("p3_project_score", lambda d: d["p5_fused"]["project"], ("p5_fused",)),
+            Stage("p4_summary", lambda d: d["p5_fused"]["summary"], ("p5_fused",)),
+        ]
+    return [
+        Stage("p1_extract", guarded("p1_extract", p1, hx1)),
+        Stage("p2_cv_score", guarded("p2_cv_score", p2, hx2), ("p1_extract",)),
+        Stage("p3_project_score", guarded("p3_project_score", p3, hx3)),
+        Stage("p4_summary", guarded("p4_summary", p4, hx4), ("p2_cv_score", "p3_project_score")),
+    ]
+
+def _heuristic_stages(*, cv_text: str, project_text: str, cv_ctx: str, project_ctx: str) -> List[Stage]:
+    return [
+        Stage("hx_extract", lambda _: hx_extract_cv(cv_text)),
+        Stage("hx_cv_score", lambda d: hx_score_cv(d["hx_extract"], cv_ctx=cv_ctx), ("hx_extract",)),
+        Stage("hx_proj_score", lambda _: hx_score_project(project_text, project_ctx=project_ctx)),
+        Stage(
+            "hx_summary",
+            lambda d: hx_summarize(d["hx_cv_score"], d["hx_proj_score"]),
+            ("hx_cv_score", "hx_proj_score"),
+        ),
+    ]
+
+@dataclass
+class RagContexts:
+    """Konteks RAG yang sama untuk semua job (rubric/JD tidak tergantung kandidat)."""
+    cv_ctx: str = ""
+    project_ctx: str = ""
+    job_title: str = "General Role"
+    warnings: List[str] = field(default_factory=list)
+
+def load_rag_contexts(db: Session) -> RagContexts:
+    ctx = RagContexts()
+    try:
+        ctx.cv_ctx = build_cv_context(db)
+    except Exception as e:
+        ctx.warnings.append(f"build_cv_context: {e}")
+    try:
+        ctx.project_ctx = build_project_context(db)
+    except Exception as e:
+        ctx.warnings.append(f"build_project_context: {e}")
+    try:
+        ctx.job_title = infer_job_title(db, default="General Role")
+    except Exception as e:
+        ctx.warnings.append(f"infer_job_title: {e}")
+    return ctx
+
+def run_pipeline_background(job_id: uuid.UUID, rag: Optional[RagContexts] = None) -> None:
     db: Session = SessionLocal()
     step = "init"
+    laps = LapTimer()
+    laps.start(step)
     try:
         job = db.get(Job, job_id)
         if not job:
@@ -130,90 +371,61 @@ def run_pipeline_background(job_id: uuid.UUID) -> None:
         db.add(job); db.commit(); db.refresh(job)
 
         upload: Upload = db.get(Upload, job.upload_id)
+        if upload is not None and upload.extraction_status != ExtractionStatus.done:
+            # upload async: ekstraksi teks jadi stage pertama (tunggu atau kerjakan sendiri)
+            step = "extract"
+            laps.start(step)
+            ensure_extracted(db, upload)
         cv_text = (upload.cv_text or "").strip() if upload else ""
         project_text = (upload.project_text or "").strip() if upload else ""
 
         step = "rag_contexts"
-        cv_ctx = ""
-        project_ctx = ""
-        job_title = "General Role"
-        warnings: list[str] = []
-        try:
-            cv_ctx = build_cv_context(db)
-        except Exception as e:
-            warnings.append(f"build_cv_context: {e}")
-        try:
-            project_ctx = build_project_context(db)
-        except Exception as e:
-            warnings.append(f"build_project_context: {e}")
-        try:
-            job_title = infer_job_title(db, default="General Role")
-        except Exception as e:
-            warnings.append(f"infer_job_title: {e}")
+        laps.start(step)
+        if rag is None:
+            rag = load_rag_contexts(db)
+        cv_ctx = rag.cv_ctx
+        project_ctx = rag.project_ctx
+        job_title = rag.job_title
+        warnings: list[str] = list(rag.warnings)
 
         if use_llm:
             llm = get_llm()
-            from repository.prompts import P1_CV_EXTRACT, P2_CV_SCORER, P3_PROJECT_SCORER, P4_SUMMARIZER
             llm_raw = {"p1": None, "p2": None, "p3": None, "p4": None}
+            engines: Dict[str, str] = {}
+            llm_metrics: Dict[str, Any] = {}
+            prompt_tokens: Dict[str, int] = {}
 
-            step = "p1_extract"
-            p1 = P1_CV_EXTRACT.format(cv_text=cv_text[:20000])
-            p1_json = llm.generate_json(p1, temperature=0.0, max_tokens=512)
-            llm_raw["p1"] = getattr(llm, "last_raw", None)
-            try:
-                cv_extracted = coerce_cv_extracted(p1_json)
-            except Exception as e:
-                warnings.append(f"P1 coerce error: {e}")
-                cv_extracted = coerce_cv_extracted({})
-
-            step = "p2_cv_score"
-            p2 = P2_CV_SCORER.format(
-                job_title=job_title,
-                cv_extracted=json.dumps(cv_extracted, ensure_ascii=False),
-                cv_ctx=cv_ctx[:20000],
-            )
-            p2_json = llm.generate_json(p2, temperature=0.1, max_tokens=256)
-            llm_raw["p2"] = getattr(llm, "last_raw", None)
-            try:
-                cv_scores = coerce_cv_scores(p2_json)
-            except Exception as e:
-                warnings.append(f"P2 coerce error: {e}")
-                cv_scores = {"skills": 3, "exp": 3, "ach": 3, "culture": 3, "feedback": "fallback"}
-
-            step = "p3_project_score"
-            p3 = P3_PROJECT_SCORER.format(
-                job_title=job_title,
-                project_text=project_text[:20000],
-                project_ctx=project_ctx[:20000],
+            step = "llm_stages"
+            laps.start(step)
+            cpu_ms: Dict[str, float] = {}
+            outputs, timings = run_stages(
+                _llm_stages(
+                    llm,
+                    cv_text=cv_text,
+                    project_text=project_text,
+                    cv_ctx=cv_ctx,
+                    project_ctx=project_ctx,
+                    job_title=job_title,
+                    warnings=warnings,
+                    llm_raw=llm_raw,
+                    engines=engines,
+                    llm_metrics=llm_metrics,
+                    prompt_tokens=prompt_tokens,
+                    mode=pipeline_mode,
+                ),
+                max_workers=PIPELINE_MAX_WORKERS,
+                cpu_ms=cpu_ms,
             )
-            p3_json = llm.generate_json(p3, temperature=0.1, max_tokens=256)
-            llm_raw["p3"] = getattr(llm, "last_raw", None)
-            try:
-                proj_scores = coerce_project_scores(p3_json)
-            except Exception as e:
-                warnings.append(f"P3 coerce error: {e}")
-                proj_scores = {"corr": 3, "code": 3, "res": 3, "docs": 3, "bonus": 3, "feedback": "fallback"}
+            cv_extracted = outputs["p1_extract"]
+            cv_scores = outputs["p2_cv_score"]
+            proj_scores = outputs["p3_project_score"]
+            summary_json = outputs["p4_summary"]
 
             step = "aggregate"
+            laps.start(step)
             cv_match = aggregate_cv(cv_scores) * 20.0
             proj_score = aggregate_project(proj_scores)
 
-            step = "p4_summary"
-            p4 = P4_SUMMARIZER.format(
-                job_title=job_title,
-                cv_scores=json.dumps(cv_scores, ensure_ascii=False),
-                proj_scores=json.dumps(proj_scores, ensure_ascii=False),
-                cv_ctx=cv_ctx[:4000],
-                project_ctx=project_ctx[:4000],
-            )
-            summary_json = {}
-            try:
-                summary_json = llm.generate_json(p4, temperature=0.2, max_tokens=256)
-            except Exception as e:
-                warnings.append(f"P4 generate_json error: {e}")
-                summary_json = {}
-            llm_raw["p4"] = getattr(llm, "last_raw", None)
-
             overall_text = (summary_json.get("overall_summary") or "").strip() if isinstance(summary_json, dict) else ""
             if not overall_text:
                 overall_text = (
@@ -222,6 +434,14 @@ def run_pipeline_background(job_id: uuid.UUID) -> None:
                 ).strip()
 
             step = "save_result"
+            job_metrics = build_job_metrics(
+                laps,
+                timings=timings,
+                cpu_ms=cpu_ms,
+                engines=engines,
+                llm_metrics=llm_metrics,
+                prompt_tokens=prompt_tokens,
+            )
             res = Result(
                 job_id=job.id,
                 cv_match_rate=cv_match,
@@ -231,36 +451,51 @@ def run_pipeline_background(job_id: uuid.UUID) -> None:
                 overall_summary=overall_text,
                 detail_scores={
                     "mode": "llm",
+                    "pipeline_mode": pipeline_mode,
                     "cv": cv_scores,
                     "project": proj_scores,
                     "cv_extract": cv_extracted,
                     "summary": summary_json,
                     "llm_raw": llm_raw,
+                    "engines": engines,
+                    "llm_metrics": llm_metrics,
+                    "prompt_tokens": {**prompt_tokens, "total": sum(prompt_tokens.values())},
                     "warnings": warnings,
                     "job_title": job_title,
+                    "timings_ms": timings,
+                    "metrics": job_metrics,
                 },
             )
             db.add(res)
             job.status = JobStatus.completed
             db.commit()
+            observe_job(pipeline_mode, "completed", job_metrics)
         else:
-            step = "hx_extract"
-            cv_extracted = hx_extract_cv(cv_text)
-
-            step = "hx_cv_score"
-            cv_scores = hx_score_cv(cv_extracted, cv_ctx=cv_ctx)
-
-            step = "hx_proj_score"
-            proj_scores = hx_score_project(project_text, project_ctx=project_ctx)
+            step = "hx_stages"
+            laps.start(step)
+            cpu_ms = {}
+            outputs, timings = run_stages(
+                _heuristic_stages(
+                    cv_text=cv_text,
+                    project_text=project_text,
+                    cv_ctx=cv_ctx,
+                    project_ctx=project_ctx,
+                ),
+                max_workers=PIPELINE_MAX_WORKERS,
+                cpu_ms=cpu_ms,
+            )
+            cv_extracted = outputs["hx_extract"]
+            cv_scores = outputs["hx_cv_score"]
+            proj_scores = outputs["hx_proj_score"]
+            overall_text = outputs["hx_summary"]
 
             step = "aggregate"
+            laps.start(step)
             cv_match = aggregate_cv(cv_scores) * 20.0
             proj_score = aggregate_project(proj_scores)
 
-            step = "hx_summary"
-            overall_text = hx_summarize(cv_scores, proj_scores)
-
             step = "save_result"
+            job_metrics = build_job_metrics(laps, timings=timings, cpu_ms=cpu_ms)
             res = Result(
                 job_id=job.id,
                 cv_match_rate=cv_match,
@@ -275,14 +510,21 @@ def run_pipeline_background(job_id: uuid.UUID) -> None:
                     "cv_extract": cv_extracted,
                     "warnings": warnings,
                     "job_title": job_title,
+                    "timings_ms": timings,
+                    "metrics": job_metrics,
                 },
             )
             db.add(res)
             job.status = JobStatus.completed
             db.commit()
+            observe_job("heuristic", "completed", job_metrics)
 
     except Exception as e:
         db.rollback()
+        observe_job(pipeline_mode if use_llm else "heuristic", "failed")
+        if isinstance(e, StageError):
+            # laporkan stage asli, bukan wrapper executor
+            step, e = e.stage, e.cause
         try:
             job = db.get(Job, job_id)
             if job:
@@ -299,3 +541,19 @@ def run_pipeline_background(job_id: uuid.UUID) -> None:
             pass
     finally:
         db.close()
+
+def run_pipeline_batch(job_ids: Sequence[uuid.UUID]) -> None:
+    """
+    Jalankan banyak job sekaligus: konteks RAG diambil sekali lalu dipakai semua job.
+    """
+    if not job_ids:
+        return
+    db: Session = SessionLocal()
+    try:
+        rag = load_rag_contexts(db)
+    finally:
+        db.close()
+    workers = max(1, min(PIPELINE_BATCH_CONCURRENCY, len(job_ids)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        # run_pipeline_background tidak pernah raise (error dicatat di job), cukup tunggu selesai
+        list(pool.map(lambda jid: run_pipeline_background(jid, rag), job_ids))
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.metrics import PIPELINE_JOB_LATENCY, PIPELINE_JOBS, PIPELINE_STAGE_LATENCY
+
+# nama stage -> key di llm_raw / llm_metrics / prompt_tokens
+_LLM_KEYS = {
+    "p1_extract": "p1",
+    "p2_cv_score": "p2",
+    "p3_project_score": "p3",
+    "p4_summary": "p4",
+    "p5_fused": "p5",
+}
+
+
+class LapTimer:
+    """
+    Wall & CPU time per fase job (dipanggil di thread yang sama dengan pipeline).
+    `start(name)` menutup fase sebelumnya dan memulai fase baru; `stop()` menutup fase terakhir.
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self._t_job = time.perf_counter()
+        self._name: Optional[str] = None
+        self._t0 = 0.0
+        self._c0 = 0.0
+
+    def start(self, name: str) -> None:
+        self.stop()
+        self._name, self._t0, self._c0 = name, time.perf_counter(), time.thread_time()
+
+    def stop(self) -> None:
+        if self._name is None:
+            return
+        self.phases[self._name] = {
+            "wall_ms": round((time.perf_counter() - self._t0) * 1000, 2),
+            "cpu_ms": round((time.thread_time() - self._c0) * 1000, 2),
+        }
+        self._name = None
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._t_job) * 1000, 2)
+
+
+def build_job_metrics(
+    laps: LapTimer,
+    *,
+    timings: Dict[str, float],
+    cpu_ms: Dict[str, float],
+    engines: Optional[Dict[str, str]] = None,
+    llm_metrics: Optional[Dict[str, Any]] = None,
+    prompt_tokens: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """Struktur ringkas untuk Result.detail_scores["metrics"] (commit terakhir tidak termasuk)."""
+    laps.stop()
+    engines = engines or {}
+    llm_metrics = llm_metrics or {}
+    prompt_tokens = prompt_tokens or {}
+    llm = {"calls": 0, "attempts": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+           "prompt_tokens_est": 0, "cache_hits": 0}
+    stages: Dict[str, Dict[str, Any]] = {}
+    for name, wall in timings.items():
+        st: Dict[str, Any] = {"wall_ms": wall, "cpu_ms": cpu_ms.get(name)}
+        if name in engines:
+            st["engine"] = engines[name]
+        key = _LLM_KEYS.get(name)
+        if key and engines.get(name) == "llm":
+            llm["calls"] += 1
+            if key in prompt_tokens:
+                st["prompt_tokens_est"] = prompt_tokens[key]
+                llm["prompt_tokens_est"] += prompt_tokens[key]
+            m = llm_metrics.get(key)
+            if isinstance(m, dict):
+                usage = m.get("usage") or {}
+                st["attempts"] = m.get("attempts", 0)
+                st["prompt_tokens"] = usage.get("prompt_tokens", 0)
+                st["completion_tokens"] = usage.get("completion_tokens", 0)
+                st["cache"] = m.get("cache")
+                llm["attempts"] += st["attempts"]
+                llm["retries"] += max(0, st["attempts"] - 1)
+                llm["prompt_tokens"] += st["prompt_tokens"]
+                llm["completion_tokens"] += st["completion_tokens"]
+                llm["cache_hits"] += 1 if m.get("cache") else 0
+        stages[name] = st
+    return {"total_ms": laps.total_ms, "phases": laps.phases, "stages": stages, "llm": llm}
+
+
+def observe_job(mode: str, status: str, metrics: Optional[Dict[str, Any]] = None) -> None:
+    """Teruskan hasil job ke registry Prometheus (core/metrics.py)."""
+    PIPELINE_JOBS.inc(mode=mode, status=status)
+    if not metrics:
+        return
+    PIPELINE_JOB_LATENCY.observe(metrics["total_ms"] / 1000, mode=mode)
+    for name, st in metrics.get("stages", {}).items():
+        PIPELINE_STAGE_LATENCY.observe((st.get("wall_ms") or 0) / 1000, stage=name, engine=st.get("engine", mode))
+
+
+def _pct(xs: List[float], q: float) -> Optional[float]:
+    if not xs:
+        return None
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))], 2)
+
+
+def _summary(xs: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(xs),
+        "mean": round(sum(xs) / len(xs), 2) if xs else None,
+        "p50": _pct(xs, 0.50),
+        "p95": _pct(xs, 0.95),
+        "max": round(max(xs), 2) if xs else None,
+    }
+
+
+def aggregate_job_metrics(items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Agregasi lintas job dari kumpulan detail_scores["metrics"] (untuk capacity planning)."""
+    jobs = 0
+    total: List[float] = []
+    phase_wall: Dict[str, List[float]] = {}
+    stage_wall: Dict[str, List[float]] = {}
+    stage_cpu: Dict[str, List[float]] = {}
+    stage_engines: Dict[str, Dict[str, int]] = {}
+    llm = {"calls": 0, "attempts": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+           "prompt_tokens_est": 0, "cache_hits": 0}
+    for m in items:
+        if not isinstance(m, dict):
+            continue
+        jobs += 1
+        if m.get("total_ms") is not None:
+            total.append(float(m["total_ms"]))
+        for name, ph in (m.get("phases") or {}).items():
+            phase_wall.setdefault(name, []).append(float(ph.get("wall_ms") or 0))
+        for name, st in (m.get("stages") or {}).items():
+            stage_wall.setdefault(name, []).append(float(st.get("wall_ms") or 0))
+            if st.get("cpu_ms") is not None:
+                stage_cpu.setdefault(name, []).append(float(st["cpu_ms"]))
+            if st.get("engine"):
+                eng = stage_engines.setdefault(name, {})
+                eng[st["engine"]] = eng.get(st["engine"], 0) + 1
+        for k in llm:
+            llm[k] += int((m.get("llm") or {}).get(k) or 0)
+    return {
+        "jobs": jobs,
+        "total_ms": _summary(total),
+        "phases": {k: _summary(v) for k, v in phase_wall.items()},
+        "stages": {
+            k: {"wall_ms": _summary(v), "cpu_ms": _summary(stage_cpu.get(k, [])),
+                "engines": stage_engines.get(k, {})}
+            for k, v in stage_wall.items()
+        },
+        "llm": {
+            **llm,
+            "cache_hit_ratio": round(llm["cache_hits"] / llm["calls"], 4) if llm["calls"] else 0.0,
+            "tokens_per_job": round((llm["prompt_tokens"] + llm["completion_tokens"]) / jobs, 1) if jobs else 0.0,
+        },
+    }
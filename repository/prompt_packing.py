@@ -0,0 +1,106 @@
+from __future__ import annotations
+import math, re
+from typing import Dict, List, Tuple
+
+# Pengganti potongan karakter tetap ([:20000]) di pipeline: tiap prompt punya budget token,
+# dan kalau teks melebihi budget yang dipilih adalah bagian paling relevan (urutan asli dipertahankan).
+
+_BLOCK_SPLIT = re.compile(r"\n\s*\n")
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_STOP = frozenset(
+    "the and for with from that this are was were have has you your our will can into per "
+    "dan yang untuk dengan dari pada atau ini itu akan dalam oleh sebagai juga".split()
+)
+_SECTION_MAX_TOKENS = 400
+
+
+def estimate_tokens(text: str) -> int:
+    # kasar: ~4 karakter per token (sama dengan estimasi rate limiter)
+    return (len(text or "") + 3) // 4
+
+
+def _terms(text: str) -> set[str]:
+    return {w for w in _WORD.findall((text or "").lower()) if len(w) > 2 and w not in _STOP}
+
+
+def split_sections(text: str, max_tokens: int = _SECTION_MAX_TOKENS) -> List[str]:
+    """Pecah per paragraf; blok yang terlalu panjang (PDF tanpa baris kosong) dipecah per baris."""
+    max_chars = max_tokens * 4
+    out: List[str] = []
+    for block in _BLOCK_SPLIT.split(text or ""):
+        if not block.strip():
+            continue
+        if estimate_tokens(block) <= max_tokens:
+            out.append(block)
+            continue
+        cur: List[str] = []
+        size = 0
+        for line in block.splitlines():
+            for i in range(0, max(len(line), 1), max_chars):
+                piece = line[i:i + max_chars]
+                if cur and size + len(piece) + 1 > max_chars:
+                    out.append("\n".join(cur))
+                    cur, size = [], 0
+                cur.append(piece)
+                size += len(piece) + 1
+        if cur:
+            out.append("\n".join(cur))
+    return out
+
+
+def pack_text(text: str, budget_tokens: int, query: str = "") -> str:
+    """
+    Teks yang muat dalam budget dikembalikan apa adanya. Kalau tidak, section dipilih berdasarkan
+    overlap istilah dengan `query` (rubric/JD atau teks kandidat); section pertama (header CV/judul
+    laporan) diprioritaskan. Tanpa query hasilnya prefix teks yang dipotong di batas section (berhenti di section
+    pertama yang tidak muat).
+    """
+    text = text or ""
+    budget_tokens = max(0, int(budget_tokens))
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+    sections = split_sections(text)
+    q = _terms(query)
+
+    def score(i: int) -> float:
+        if i == 0:
+            return math.inf
+        if not q:
+            return 0.0
+        terms = _terms(sections[i])
+        return len(terms & q) / math.sqrt(len(terms) + 1)
+
+    chosen: List[int] = []
+    used = 0
+    for i in sorted(range(len(sections)), key=lambda i: (-score(i), i)):
+        cost = estimate_tokens(sections[i]) + 1  # + pemisah
+        if used + cost <= budget_tokens:
+            chosen.append(i)
+            used += cost
+        elif not q:
+            break  # tanpa query: prefix section berurutan, tidak melompati section yang tidak muat
+    if not chosen:
+        return text[:budget_tokens * 4]
+    return "\n\n".join(sections[i] for i in sorted(chosen))
+
+
+def pack_fields(budget_tokens: int, fields: Dict[str, Tuple[str, str]]) -> Dict[str, str]:
+    """
+    Bagi satu budget ke beberapa field {nama: (teks, query)}. Field yang lebih kecil dari jatahnya
+    dipakai utuh dan sisanya diberikan ke field lain.
+    """
+    out: Dict[str, str] = {}
+    remaining = max(0, int(budget_tokens))
+    pending = dict(fields)
+    while pending:
+        share = remaining // len(pending)
+        small = [k for k, (t, _q) in pending.items() if estimate_tokens(t) <= share]
+        if not small:
+            for k, (t, q) in pending.items():
+                out[k] = pack_text(t, share, q)
+            break
+        for k in small:
+            t, _q = pending.pop(k)
+            out[k] = t
+            remaining -= estimate_tokens(t)
+    return out
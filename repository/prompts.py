@@ -93,3 +93,44 @@ Return JSON ONLY with this exact schema:
   "next_steps": ["...", "..."]
 }}
 """
+
+# P5 — Fused evaluator (P2 + P3 + P4 dalam satu panggilan, PIPELINE_MODE=fused)
+P5_FUSED_EVALUATOR = """You are a strict evaluator and hiring reviewer for the role: {job_title}.
+In ONE pass, score the candidate's CV, score the project report, and write the overall summary.
+Return ONLY a valid JSON object. Do not include any extra text, explanations, or markdown.
+
+Schema (all keys required):
+{{
+  "cv_scores": {{"skills": 1..5, "exp": 1..5, "ach": 1..5, "culture": 1..5, "feedback": "<1 paragraph>"}},
+  "project_scores": {{"corr": 1..5, "code": 1..5, "res": 1..5, "docs": 1..5, "bonus": 1..5, "feedback": "<1 paragraph>"}},
+  "summary": {{
+    "overall_summary": "<max 3 sentences, concise but specific>",
+    "recommendation": "strong_yes|yes|weak_yes|hold|no",
+    "strengths": ["...", "..."],
+    "gaps": ["...", "..."],
+    "next_steps": ["...", "..."]
+  }}
+}}
+
+Guidelines:
+- cv_scores: use the extracted CV data (JSON) as the main source of truth; JD + CV rubric are the criteria.
+  skills=technical skill match, exp=experience level, ach=achievements/impact, culture=collaboration/ownership.
+- project_scores: focus on the Project Text (not CV); project rubric + JD are the criteria.
+  corr=problem/requirement fit, code=code quality/structure, res=results/measurement,
+  docs=docs/readability, bonus=tests, reliability, retries, etc.
+- summary: must be consistent with the scores above.
+- Clamp each score 1..5 (integer only).
+
+INPUT:
+[EXTRACTED_CV_JSON]
+{cv_extracted}
+
+[JOB_DESCRIPTION_AND_CV_RUBRIC_CONTEXT]
+{cv_ctx}
+
+[PROJECT_TEXT]
+{project_text}
+
+[PROJECT_RUBRIC_AND_JD_CONTEXT]
+{project_ctx}
+"""
@@ -1,18 +1,150 @@
 from __future__ import annotations
-import os
-from typing import Optional, Sequence, List
+import os, functools, logging, select as _select, threading, time
+from typing import Any, Callable, Dict, Optional, Sequence, List
 
-from sqlalchemy import select, case
+from sqlalchemy import select, case, text
 from sqlalchemy.orm import Session
 
-from models import RagDoc
+from core.cache import LRUCache
+from models import RagDoc, sync_engine
 from models.Enums import RagDocType
-from repository.embeddings import embed_one
+from repository.embeddings import embed_many, embed_one
+from settings import RAG_CTX_CACHE_ENABLED, RAG_CTX_CACHE_FALLBACK_TTL_SEC, RAG_CTX_CACHE_TTL_SEC
+
+log = logging.getLogger("rag")
 
 # Pilih operator jarak: "l2" (default) atau "cosine"
 _EMBED_OPS = (os.getenv("EMBED_OPS") or "l2").lower()  # "l2" | "cosine"
 
 
+# ---------- Corpus version (invalidasi cache konteks) ----------
+# Versi naik setiap rubric/JD berubah. Proses lain diberi tahu lewat NOTIFY dan
+# listener di bawah menaikkan versi lokalnya, jadi cache di semua proses ikut invalid.
+_NOTIFY_CHANNEL = "rag_corpus_changed"
+_corpus_version = 0
+_version_lock = threading.Lock()
+_listener_thread: Optional[threading.Thread] = None
+_listener_stop = threading.Event()
+_listener_alive = False
+
+def corpus_version() -> int:
+    return _corpus_version
+
+def _bump_local() -> int:
+    global _corpus_version
+    with _version_lock:
+        _corpus_version += 1
+        return _corpus_version
+
+def bump_corpus_version(db: Session) -> None:
+    """Panggil sebelum commit perubahan rag_docs; NOTIFY terkirim saat transaksi commit."""
+    _bump_local()
+    db.flush()  # error flush rag_docs milik caller, jangan ikut tertelan di bawah
+    try:
+        # SAVEPOINT: di Postgres statement gagal membatalkan seluruh transaksi; dengan savepoint
+        # yang di-rollback hanya NOTIFY-nya, commit rag_docs caller tetap jalan
+        with db.begin_nested():
+            db.execute(text("SELECT pg_notify(:ch, :payload)"), {"ch": _NOTIFY_CHANNEL, "payload": str(os.getpid())})
+    except Exception as e:
+        log.warning(f"[RAG] pg_notify failed: {e}")
+
+def _listen_loop() -> None:
+    global _listener_alive
+    backoff = 1.0
+    while not _listener_stop.is_set():
+        conn = None
+        try:
+            conn = sync_engine.raw_connection()
+            conn.detach()  # koneksi khusus LISTEN, jangan kembali ke pool
+            dbapi = conn.driver_connection
+            dbapi.autocommit = True
+            with dbapi.cursor() as cur:
+                cur.execute(f"LISTEN {_NOTIFY_CHANNEL};")
+            _listener_alive = True
+            # bisa saja ada perubahan selama listener belum tersambung
+            _bump_local()
+            backoff = 1.0
+            while not _listener_stop.is_set():
+                if _select.select([dbapi], [], [], 5.0) == ([], [], []):
+                    continue
+                dbapi.poll()
+                if dbapi.notifies:
+                    dbapi.notifies.clear()
+                    _bump_local()
+        except Exception as e:
+            log.warning(f"[RAG] corpus listener error: {e}; retry in {backoff:.0f}s")
+        finally:
+            _listener_alive = False
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        _listener_stop.wait(backoff)
+        backoff = min(backoff * 2, 60.0)
+
+def start_corpus_listener() -> None:
+    global _listener_thread
+    if not RAG_CTX_CACHE_ENABLED:
+        return
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+    _listener_stop.clear()
+    _listener_thread = threading.Thread(target=_listen_loop, name="rag-corpus-listener", daemon=True)
+    _listener_thread.start()
+
+def stop_corpus_listener() -> None:
+    _listener_stop.set()
+    if _listener_thread is not None:
+        _listener_thread.join(timeout=10)
+
+
+# ---------- Cache konteks (rubric/JD) per corpus version ----------
+_ctx_cache = LRUCache(max_entries=256)
+_ctx_stats = {"hits": 0, "misses": 0}
+
+def _ctx_ttl() -> float:
+    # tanpa listener, invalidasi lintas proses hanya dari TTL -> pakai TTL pendek
+    if _listener_alive:
+        return RAG_CTX_CACHE_TTL_SEC
+    return min(RAG_CTX_CACHE_TTL_SEC, RAG_CTX_CACHE_FALLBACK_TTL_SEC)
+
+def _freeze(v: Any) -> Any:
+    return tuple(v) if isinstance(v, list) else v
+
+def _versioned_cache(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    def wrapper(db: Session, **kwargs: Any) -> Any:
+        if not RAG_CTX_CACHE_ENABLED:
+            return fn(db, **kwargs)
+        key = (fn.__name__, tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+        version = _corpus_version  # diambil sebelum query: bump di tengah jalan = entry langsung basi
+        hit = _ctx_cache.get(key)
+        if hit is not None:
+            hit_version, ts, value = hit
+            if hit_version == version and time.time() - ts < _ctx_ttl():
+                _ctx_stats["hits"] += 1
+                return value
+        _ctx_stats["misses"] += 1
+        value = fn(db, **kwargs)
+        _ctx_cache.set(key, (version, time.time(), value))
+        return value
+    return wrapper
+
+def rag_cache_stats() -> Dict[str, Any]:
+    hits, misses = _ctx_stats["hits"], _ctx_stats["misses"]
+    return {
+        "enabled": bool(RAG_CTX_CACHE_ENABLED),
+        "corpus_version": _corpus_version,
+        "listener_alive": _listener_alive,
+        "ttl_sec": _ctx_ttl(),
+        "entries": len(_ctx_cache),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
+
+
 # ---------- Insert / upsert ----------
 def add_doc(
     db: Session,
@@ -25,16 +157,23 @@ def add_doc(
     vec = embed_one(f"{title}\n\n{body}")
     row = RagDoc(type=doc_type, title=title, body=body, tags=tags or [], embedding=vec)
     db.add(row)
+    bump_corpus_version(db)
     db.commit()
     db.refresh(row)
     return row
 
 def add_many(db: Session, docs: Sequence[tuple[RagDocType, str, str, list[str] | None]]) -> int:
-    count = 0
-    for t, title, body, tags in docs:
-        add_doc(db, doc_type=t, title=title, body=body, tags=tags)
-        count += 1
-    return count
+    if not docs:
+        return 0
+    # embed sekali untuk semua dokumen, simpan dalam satu commit
+    vecs = embed_many([f"{title}\n\n{body}" for _t, title, body, _tags in docs])
+    db.add_all([
+        RagDoc(type=t, title=title, body=body, tags=tags or [], embedding=vecs[i])
+        for i, (t, title, body, tags) in enumerate(docs)
+    ])
+    bump_corpus_version(db)
+    db.commit()
+    return len(docs)
 
 # ---------- Search (prioritize `current` + recency tie-breaker) ----------
 def search(
@@ -111,6 +250,7 @@ def _dedup(seq: List[str]) -> List[str]:
             seen.add(x); out.append(x)
     return out
 
+@_versioned_cache
 def build_cv_context(
     db: Session,
     *,
@@ -154,6 +294,7 @@ def build_cv_context(
 
     return "\n\n---\n\n".join(parts)
 
+@_versioned_cache
 def build_project_context(
     db: Session,
     *,
@@ -195,6 +336,7 @@ def build_project_context(
     return "\n\n---\n\n".join(parts)
 
 # ---------- Infer job title dari vector DB ----------
+@_versioned_cache
 def infer_job_title(
     db: Session,
     *,
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import os, time, uuid, logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import RagDoc
+from models.Enums import RagDocType
+from repository.embeddings import embed_many
+from repository.extract_text import extract_text_from_file, sniff_type
+from repository.rag import bump_corpus_version
+
+log = logging.getLogger("rag")
+
+# (doc_type, title, body, source_path)
+IngestDoc = Tuple[RagDocType, str, str, str]
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    docs: int = 0
+    skipped: int = 0
+    failed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.docs / self.seconds if self.seconds > 0 else 0.0
+
+
+def infer_doc_type(path: str) -> Optional[RagDocType]:
+    """Tebak tipe dari nama folder: .../rubric(s)/... atau .../job_desc|jd/..."""
+    parts = [p.lower() for p in os.path.normpath(path).split(os.sep)[:-1]]
+    for p in reversed(parts):
+        if p in {"rubric", "rubrics"}:
+            return RagDocType.rubric
+        if p in {"job_desc", "job_descs", "jd", "jds", "job_description", "job_descriptions"}:
+            return RagDocType.job_desc
+    return None
+
+
+def iter_files(root: str, recursive: bool = True) -> Iterator[str]:
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if sniff_type(path) in {"txt", "pdf", "docx"}:
+                yield path
+        if not recursive:
+            break
+
+
+def _extract(path: str) -> Tuple[str, str, Optional[str]]:
+    try:
+        return path, extract_text_from_file(path, max_chars=0), None
+    except Exception as e:
+        return path, "", f"{e.__class__.__name__}: {e}"
+
+
+def iter_documents(
+    paths: Iterable[str],
+    *,
+    doc_type: Optional[RagDocType] = None,
+    workers: int = 1,
+    stats: Optional[IngestStats] = None,
+) -> Iterator[IngestDoc]:
+    """
+    Stream (doc_type, title, body, path) dari file. Ekstraksi bisa paralel di process pool;
+    urutan file tetap dipertahankan.
+    """
+    stats = stats or IngestStats()
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results: Iterable[Tuple[str, str, Optional[str]]] = pool.map(_extract, paths, chunksize=4)
+    else:
+        pool = None
+        results = map(_extract, paths)
+    try:
+        for path, body, err in results:
+            stats.files += 1
+            if err:
+                stats.failed += 1
+                log.warning(f"[INGEST] extract failed {path}: {err}")
+                continue
+            t = doc_type or infer_doc_type(path)
+            body = (body or "").strip()
+            if t is None or not body:
+                stats.skipped += 1
+                continue
+            yield t, os.path.splitext(os.path.basename(path))[0], body, path
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _batched(it: Iterable[IngestDoc], size: int) -> Iterator[List[IngestDoc]]:
+    batch: List[IngestDoc] = []
+    for x in it:
+        batch.append(x)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_documents(
+    db: Session,
+    docs: Iterable[IngestDoc],
+    *,
+    tags: Optional[List[str]] = None,
+    batch_size: int = 64,
+    stats: Optional[IngestStats] = None,
+    on_batch: Optional[Callable[[IngestStats], None]] = None,
+) -> IngestStats:
+    """
+    Embed per batch (embed_many) lalu tulis dengan INSERT multi-row, satu transaksi per batch.
+    """
+    stats = stats or IngestStats()
+    t0 = time.perf_counter()
+    for batch in _batched(docs, max(1, batch_size)):
+        vecs = embed_many([f"{title}\n\n{body}" for _t, title, body, _p in batch])
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "type": t,
+                "title": title[:255],
+                "body": body,
+                "tags": list(tags or []),
+                "embedding": vecs[i],
+            }
+            for i, (t, title, body, _p) in enumerate(batch)
+        ]
+        try:
+            db.execute(insert(RagDoc), rows)
+            bump_corpus_version(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        stats.docs += len(rows)
+        stats.batches += 1
+        stats.seconds = time.perf_counter() - t0
+        if on_batch:
+            on_batch(stats)
+    stats.seconds = time.perf_counter() - t0
+    return stats
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import logging, random, threading, time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from settings import (
+    LLM_RATE_LIMIT_BACKEND,
+    LLM_RATE_LIMIT_MAX_WAIT_SEC,
+    LLM_RATE_LIMIT_RPM,
+    LLM_RATE_LIMIT_TPM,
+    LLM_RETRY_BASE_DELAY_SEC,
+    LLM_RETRY_MAX_DELAY_SEC,
+    REDIS_URL,
+)
+
+log = logging.getLogger("llm")
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+# ---------- Retry policy ----------
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Header Retry-After: detik (angka) atau HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff dengan full jitter; Retry-After dari server selalu dihormati
+    (dibatasi LLM_RETRY_MAX_DELAY_SEC).
+    """
+    cap = float(LLM_RETRY_MAX_DELAY_SEC)
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0.0, min(cap, float(LLM_RETRY_BASE_DELAY_SEC) * (2 ** attempt)))
+
+
+def estimate_request_tokens(messages: Any, max_tokens: int) -> int:
+    # kasar: ~4 karakter per token untuk prompt + budget output
+    chars = sum(len(str(m.get("content", ""))) for m in messages or [] if isinstance(m, dict))
+    return chars // 4 + int(max_tokens or 0)
+
+
+# ---------- Token bucket (requests/min & tokens/min) ----------
+class LocalRateLimiter:
+    """Dua token bucket dalam proses, dipakai bersama semua thread."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = max(0, int(rpm))
+        self.tpm = max(0, int(tpm))
+        self._req = float(self.rpm)
+        self._tok = float(self.tpm)
+        self._ts = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self.waits = 0
+        self.wait_sec = 0.0
+
+    def _refill(self, now: float) -> None:
+        dt = now - self._ts
+        self._ts = now
+        if self.rpm:
+            self._req = min(self.rpm, self._req + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(self.tpm, self._tok + dt * self.tpm / 60.0)
+
+    def _wait_needed(self, tokens: int, now: float) -> float:
+        wait = max(0.0, self._blocked_until - now)
+        if self.rpm and self._req < 1:
+            wait = max(wait, (1 - self._req) * 60.0 / self.rpm)
+        if self.tpm and self._tok < tokens:
+            wait = max(wait, (tokens - self._tok) * 60.0 / self.tpm)
+        return wait
+
+    def acquire(self, tokens: int = 0, max_wait: float = LLM_RATE_LIMIT_MAX_WAIT_SEC) -> float:
+        tokens = min(int(tokens), self.tpm) if self.tpm else 0
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_needed(tokens, now)
+                if wait <= 0:
+                    if self.rpm:
+                        self._req -= 1
+                    if self.tpm:
+                        self._tok -= tokens
+                    waited = now - start
+                    if waited > 0.001:
+                        self.waits += 1
+                        self.wait_sec += waited
+                    return waited
+                if now - start + wait > max_wait:
+                    raise RateLimitTimeout(f"rate limiter wait {wait:.1f}s exceeds {max_wait:.0f}s")
+                self._cond.wait(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Server minta mundur (429/Retry-After): tahan semua thread sampai waktu itu."""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local", "rpm": self.rpm, "tpm": self.tpm,
+                "waits": self.waits, "wait_sec": round(self.wait_sec, 3)}
+
+
+_REDIS_ACQUIRE = """
+local now = tonumber(ARGV[1])
+local rpm = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local tokens = tonumber(ARGV[4])
+local blocked = tonumber(redis.call('GET', KEYS[3]) or '0')
+local function load(key, cap)
+  local v = redis.call('HMGET', key, 'level', 'ts')
+  local level = tonumber(v[1]) or cap
+  local ts = tonumber(v[2]) or now
+  return math.min(cap, level + (now - ts) * cap / 60000.0)
+end
+local req = rpm > 0 and load(KEYS[1], rpm) or 0
+local tok = tpm > 0 and load(KEYS[2], tpm) or 0
+local wait = math.max(0, blocked - now)
+if rpm > 0 and req < 1 then wait = math.max(wait, (1 - req) * 60000.0 / rpm) end
+if tpm > 0 and tok < tokens then wait = math.max(wait, (tokens - tok) * 60000.0 / tpm) end
+if wait <= 0 then
+  if rpm > 0 then req = req - 1 end
+  if tpm > 0 then tok = tok - tokens end
+end
+if rpm > 0 then redis.call('HSET', KEYS[1], 'level', req, 'ts', now); redis.call('PEXPIRE', KEYS[1], 120000) end
+if tpm > 0 then redis.call('HSET', KEYS[2], 'level', tok, 'ts', now); redis.call('PEXPIRE', KEYS[2], 120000) end
+return math.ceil(wait)
+"""
+
+
+class RedisRateLimiter(LocalRateLimiter):
+    """
+    Bucket yang sama tapi state-nya di Redis (atomic via Lua) -> berlaku lintas proses/host.
+    Kalau Redis tidak bisa dihubungi di tengah jalan, turun ke bucket lokal (per proses) dengan
+    warning, bukan error: error di sini akan dihitung circuit breaker LLM sebagai kegagalan provider.
+    """
+
+    def __init__(self, rpm: int, tpm: int, url: str, prefix: str = "llm:ratelimit"):
+        super().__init__(rpm, tpm)
+        import redis  # opsional, hanya untuk backend ini
+
+        self._redis = redis.Redis.from_url(url)
+        self._redis.ping()  # from_url belum membuka koneksi; gagal di sini -> get_rate_limiter pakai lokal
+        self._script = self._redis.register_script(_REDIS_ACQUIRE)
+        self._keys = [f"{prefix}:req", f"{prefix}:tok", f"{prefix}:blocked"]
+        self._redis_errors = (redis.RedisError,)
+        self._degraded = False
+
+    def _set_degraded(self, degraded: bool, err: Optional[Exception] = None) -> None:
+        if degraded and not self._degraded:
+            log.warning(f"[LLM] redis rate limiter unreachable ({err}); using local limiter")
+        elif not degraded and self._degraded:
+            log.warning("[LLM] redis rate limiter reachable again")
+        self._degraded = degraded
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000)
+
+    def acquire(self, tokens: int = 0, max_wait: float = LLM_RATE_LIMIT_MAX_WAIT_SEC) -> float:
+        tokens = min(int(tokens), self.tpm) if self.tpm else 0
+        start = time.monotonic()
+        while True:
+            try:
+                wait_ms = int(self._script(keys=self._keys, args=[self._now_ms(), self.rpm, self.tpm, tokens]))
+            except self._redis_errors as e:
+                self._set_degraded(True, e)
+                return super().acquire(tokens, max(0.0, max_wait - (time.monotonic() - start)))
+            self._set_degraded(False)
+            if wait_ms <= 0:
+                waited = time.monotonic() - start
+                if waited > 0.001:
+                    self.waits += 1
+                    self.wait_sec += waited
+                return waited
+            if time.monotonic() - start + wait_ms / 1000 > max_wait:
+                raise RateLimitTimeout(f"rate limiter wait {wait_ms / 1000:.1f}s exceeds {max_wait:.0f}s")
+            # jitter kecil supaya proses-proses tidak bangun bersamaan
+            time.sleep(wait_ms / 1000 + random.uniform(0, 0.05))
+
+    def pause(self, seconds: float) -> None:
+        until = self._now_ms() + int(seconds * 1000)
+        try:
+            cur = int(self._redis.get(self._keys[2]) or 0)
+            if until > cur:
+                self._redis.set(self._keys[2], until, px=int(seconds * 1000) + 1000)
+        except self._redis_errors as e:
+            self._set_degraded(True, e)
+            super().pause(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "backend": "redis", "degraded": self._degraded}
+
+
+_limiter: Optional[LocalRateLimiter] = None
+_limiter_lock = threading.Lock()
+_limiter_ready = False
+
+
+def get_rate_limiter() -> Optional[LocalRateLimiter]:
+    """None kalau LLM_RATE_LIMIT_RPM dan LLM_RATE_LIMIT_TPM sama-sama 0 (nonaktif)."""
+    global _limiter, _limiter_ready
+    if _limiter_ready:
+        return _limiter
+    with _limiter_lock:
+        if not _limiter_ready:
+            if LLM_RATE_LIMIT_RPM > 0 or LLM_RATE_LIMIT_TPM > 0:
+                backend = (LLM_RATE_LIMIT_BACKEND or "local").lower()
+                if backend == "redis":
+                    try:
+                        _limiter = RedisRateLimiter(LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_TPM, REDIS_URL)
+                    except Exception as e:
+                        log.error(f"[LLM] redis rate limiter unavailable ({e}); using local limiter")
+                if _limiter is None:
+                    _limiter = LocalRateLimiter(LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_TPM)
+            _limiter_ready = True
+    return _limiter
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Satu node di graph pipeline.
+    `fn` menerima dict hasil stage lain (hanya yang ada di `deps`) dan mengembalikan output stage.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class StageError(Exception):
+    """Dibungkus oleh executor supaya caller tahu stage mana yang gagal."""
+
+    def __init__(self, stage: str, cause: BaseException):
+        super().__init__(f"{stage}: {cause}")
+        self.stage = stage
+        self.cause = cause
+
+
+def _validate(stages: Dict[str, Stage]) -> None:
+    for st in stages.values():
+        for d in st.deps:
+            if d not in stages:
+                raise ValueError(f"stage '{st.name}' depends on unknown stage '{d}'")
+    # deteksi siklus (DFS sederhana)
+    state: Dict[str, int] = {}
+
+    def visit(n: str) -> None:
+        if state.get(n) == 1:
+            raise ValueError(f"cycle detected at stage '{n}'")
+        if state.get(n) == 2:
+            return
+        state[n] = 1
+        for d in stages[n].deps:
+            visit(d)
+        state[n] = 2
+
+    for n in stages:
+        visit(n)
+
+
+def run_stages(
+    stages: Iterable[Stage],
+    *,
+    max_workers: int = 4,
+    cpu_ms: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Jalankan stage sesuai dependency graph. Stage yang sudah siap (semua deps selesai)
+    dijalankan paralel di thread pool.
+
+    Return (outputs, timings_ms). Kalau `cpu_ms` diberikan, CPU time thread per stage
+    (time.thread_time) ikut diisi ke dict itu. Kalau ada stage yang raise, stage lain yang
+    belum jalan dibatalkan dan exception dibungkus `StageError`.
+    """
+    graph: Dict[str, Stage] = {}
+    for st in stages:
+        if st.name in graph:
+            raise ValueError(f"duplicate stage '{st.name}'")
+        graph[st.name] = st
+    _validate(graph)
+
+    outputs: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    pending = dict(graph)
+
+    def call(st: Stage, inputs: Dict[str, Any]) -> Tuple[Any, float, float]:
+        t0 = time.perf_counter()
+        c0 = time.thread_time()
+        try:
+            out = st.fn(inputs)
+        except BaseException as e:
+            raise StageError(st.name, e) from e
+        return out, (time.perf_counter() - t0) * 1000, (time.thread_time() - c0) * 1000
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stage") as pool:
+        running = {}
+        while pending or running:
+            ready = [st for st in pending.values() if all(d in outputs for d in st.deps)]
+            for st in ready:
+                del pending[st.name]
+                inputs = {d: outputs[d] for d in st.deps}
+                running[pool.submit(call, st, inputs)] = st.name
+
+            if not running:
+                # tidak ada yang bisa jalan tapi masih ada pending -> seharusnya tertangkap _validate
+                raise RuntimeError(f"unresolvable stages: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    out, ms, cpu = fut.result()
+                except StageError:
+                    for other in running:
+                        other.cancel()
+                    raise
+                outputs[name] = out
+                timings[name] = round(ms, 2)
+                if cpu_ms is not None:
+                    cpu_ms[name] = round(cpu, 2)
+
+    return outputs, timings
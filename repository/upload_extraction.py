@@ -0,0 +1,151 @@
+from __future__ import annotations
+import json, logging, threading, time, uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from models import SessionLocal, Upload
+from models.Enums import ExtractionStatus
+from repository.extract_pool import extract_text_sync
+from settings import UPLOAD_EXTRACT_WAIT_SEC
+
+log = logging.getLogger("extract")
+
+# Upload async (UPLOAD_ASYNC_EXTRACT): file disimpan dulu dengan status pending, lalu teks diekstrak
+# oleh background task API atau -- kalau job sudah jalan duluan -- oleh pipeline itu sendiri.
+# Siapa yang berhasil mengubah pending -> processing yang mengerjakan; yang lain menunggu.
+# Pemilik memperbarui extraction_claimed_at (heartbeat) selama bekerja, termasuk saat antre di pool;
+# claim yang diam lebih dari `stale_sec` diambil alih oleh satu penunggu saja (UPDATE bersyarat).
+
+_POLL_SEC = 0.5
+
+
+class ExtractionFailedError(RuntimeError):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def claim_extraction(db: Session, upload_id: uuid.UUID) -> bool:
+    res = db.execute(
+        update(Upload)
+        .where(Upload.id == upload_id, Upload.extraction_status == ExtractionStatus.pending)
+        .values(extraction_status=ExtractionStatus.processing, extraction_claimed_at=_now())
+    )
+    db.commit()
+    return bool(res.rowcount)
+
+
+def take_over_extraction(db: Session, upload_id: uuid.UUID, stale_sec: float = UPLOAD_EXTRACT_WAIT_SEC) -> bool:
+    """processing -> processing milik pemanggil, hanya kalau heartbeat pemilik lama sudah lewat `stale_sec`."""
+    res = db.execute(
+        update(Upload)
+        .where(
+            Upload.id == upload_id,
+            Upload.extraction_status == ExtractionStatus.processing,
+            or_(
+                Upload.extraction_claimed_at.is_(None),
+                Upload.extraction_claimed_at < _now() - timedelta(seconds=max(0.0, stale_sec)),
+            ),
+        )
+        .values(extraction_claimed_at=_now())
+        .execution_options(synchronize_session=False)  # objek di session di-refresh setelah commit
+    )
+    db.commit()
+    return bool(res.rowcount)
+
+
+class _Heartbeat:
+    """Thread kecil yang memperbarui extraction_claimed_at tiap `interval` detik (session sendiri)."""
+
+    def __init__(self, upload_id: uuid.UUID, interval: float):
+        self.upload_id = upload_id
+        self.interval = max(1.0, interval)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"extract-heartbeat-{upload_id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db: Session = SessionLocal()
+            try:
+                db.execute(
+                    update(Upload)
+                    .where(Upload.id == self.upload_id, Upload.extraction_status == ExtractionStatus.processing)
+                    .values(extraction_claimed_at=_now())
+                )
+                db.commit()
+            except Exception as e:
+                log.warning(f"[EXTRACT] upload {self.upload_id} heartbeat failed: {e}")
+            finally:
+                db.close()
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _extract_claimed(db: Session, upload_id: uuid.UUID) -> None:
+    upload = db.get(Upload, upload_id)
+    if upload is None:
+        return
+    t0 = time.perf_counter()
+    try:
+        with _Heartbeat(upload_id, UPLOAD_EXTRACT_WAIT_SEC / 3):
+            if upload.cv_text is None:
+                upload.cv_text = extract_text_sync(upload.cv_path)
+            if upload.project_text is None:
+                upload.project_text = extract_text_sync(upload.report_path)
+        upload.extraction_status = ExtractionStatus.done
+        upload.extraction_error = None
+    except Exception as e:
+        db.rollback()
+        upload = db.get(Upload, upload_id)
+        upload.extraction_status = ExtractionStatus.failed
+        upload.extraction_error = json.dumps({"type": e.__class__.__name__, "message": str(e)})
+        log.warning(f"[EXTRACT] upload {upload_id} failed: {e.__class__.__name__}: {e}")
+    db.commit()
+    log.info(f"[EXTRACT] upload {upload_id} {upload.extraction_status.value} in {time.perf_counter() - t0:.2f}s")
+
+
+def run_upload_extraction(upload_id: uuid.UUID) -> None:
+    """Background task setelah /upload async; tidak pernah raise (hasil dicatat di upload)."""
+    db: Session = SessionLocal()
+    try:
+        if claim_extraction(db, upload_id):
+            _extract_claimed(db, upload_id)
+    except Exception:
+        log.exception(f"[EXTRACT] upload {upload_id} background extraction error")
+    finally:
+        db.close()
+
+
+def ensure_extracted(db: Session, upload: Upload, stale_sec: float = UPLOAD_EXTRACT_WAIT_SEC) -> None:
+    """
+    Stage pipeline: pastikan teks upload tersedia. Ekstraksi yang masih pending dikerjakan di sini;
+    yang sedang diproses di tempat lain ditunggu selama pemiliknya masih mengirim heartbeat, dan
+    diambil alih kalau heartbeat-nya diam lebih dari `stale_sec` (pemiliknya kemungkinan mati).
+    Raise ExtractionFailedError kalau ekstraksi gagal.
+    """
+    while True:
+        db.refresh(upload)
+        status = upload.extraction_status
+        if status == ExtractionStatus.done:
+            return
+        if status == ExtractionStatus.failed:
+            raise ExtractionFailedError(f"text extraction failed: {upload.extraction_error}")
+        if status == ExtractionStatus.pending and claim_extraction(db, upload.id):
+            _extract_claimed(db, upload.id)
+            continue
+        if status == ExtractionStatus.processing and take_over_extraction(db, upload.id, stale_sec):
+            log.warning(f"[EXTRACT] upload {upload.id} owner silent for {stale_sec:g}s, taking over")
+            _extract_claimed(db, upload.id)
+            continue
+        db.rollback()  # lepas snapshot transaksi supaya refresh berikutnya melihat commit proses lain
+        time.sleep(_POLL_SEC)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from models import Upload
+from repository.extract_text import EXTRACTOR_VERSION
+from settings import UPLOAD_CHUNK_KB, UPLOAD_MAX_MB_DOCX, UPLOAD_MAX_MB_PDF, UPLOAD_MAX_MB_TXT
+
+# Batas per tipe (ekstensi); tipe lain memakai batas TXT
+_LIMIT_MB = {".pdf": UPLOAD_MAX_MB_PDF, ".docx": UPLOAD_MAX_MB_DOCX, ".txt": UPLOAD_MAX_MB_TXT}
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+@dataclass
+class StoredFile:
+    path: Path
+    size: int
+    sha256: str
+
+
+def max_bytes_for(filename: str) -> int:
+    ext = Path(filename or "").suffix.lower()
+    return int(_LIMIT_MB.get(ext, UPLOAD_MAX_MB_TXT) * 1024 * 1024)
+
+
+def _write(f, chunk: bytes) -> None:
+    f.write(chunk)
+
+
+async def save_upload(file: UploadFile, dest: Path, max_bytes: int = 0) -> StoredFile:
+    """
+    Salin UploadFile ke `dest` per chunk (UPLOAD_CHUNK_KB) sambil menghitung SHA-256; begitu
+    melewati batas per tipe, salinan parsial dihapus dan UploadTooLargeError di-raise.
+    Catatan: saat handler jalan, Starlette sudah menerima seluruh body dan men-spool part ini ke
+    file sementara, jadi batas di sini baru dicek setelah upload selesai dan file ditulis dua
+    kali. Penolakan selama upload berlangsung hanya lewat BodySizeLimitMiddleware (UPLOAD_MAX_BODY_MB).
+    """
+    max_bytes = max_bytes or max_bytes_for(file.filename)
+    chunk_size = max(1, UPLOAD_CHUNK_KB) * 1024
+    digest = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, dest, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(
+                    f"{file.filename}: file exceeds {max_bytes / (1024 * 1024):g} MB"
+                )
+            digest.update(chunk)
+            await run_in_threadpool(_write, f, chunk)
+    except BaseException:
+        f.close()
+        try:
+            os.unlink(dest)
+        except OSError:
+            pass
+        raise
+    f.close()
+    return StoredFile(path=dest, size=size, sha256=digest.hexdigest())
+
+
+def find_extracted(db: Session, sha256: str) -> Optional[Tuple[str, str]]:
+    """
+    (path, teks) dari upload sebelumnya dengan isi file sama (sebagai CV atau laporan) yang
+    diekstrak oleh EXTRACTOR_VERSION sekarang; None kalau belum ada.
+    """
+    for hash_col, path_col, text_col in (
+        (Upload.cv_sha256, Upload.cv_path, Upload.cv_text),
+        (Upload.report_sha256, Upload.report_path, Upload.project_text),
+    ):
+        row = db.execute(
+            select(path_col, text_col)
+            .where(hash_col == sha256, Upload.extractor_version == EXTRACTOR_VERSION, text_col.is_not(None))
+            .order_by(Upload.created_at.desc())
+            .limit(1)
+        ).first()
+        if row is not None:
+            return row[0], row[1]
+    return None
+
+
+def reuse_stored(stored: StoredFile, previous_path: str) -> Path:
+    """Pakai file lama kalau masih ada (salinan baru dihapus); kalau tidak, simpan salinan baru."""
+    prev = Path(previous_path)
+    if prev != stored.path and prev.exists():
+        stored.path.unlink(missing_ok=True)
+        stored.path = prev
+    return stored.path
@@ -1,19 +1,31 @@
 from __future__ import annotations
+import asyncio
 import os
 import uuid
 from pathlib import Path
 from typing import Optional, Generator, List
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Form
-from models.Enums import RagDocType
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Form, Query
+from models.Enums import ExtractionStatus, RagDocType
 from pydantic import BaseModel
-from repository.extract_text import extract_text_from_file
-from repository.pipeline import run_pipeline_background
-from repository.rag import add_doc
+from repository.extract_pool import ExtractBusyError, ExtractTimeoutError, extract_text_async
+from repository.extract_text import EXTRACTOR_VERSION, sniff_type
+from repository.upload_store import StoredFile, UploadTooLargeError, find_extracted, reuse_stored, save_upload
+from repository.upload_extraction import run_upload_extraction
+from core.metrics import EXTRACT_TASKS
+from repository.pipeline import run_pipeline_background, run_pipeline_batch
+from repository.pipeline_metrics import aggregate_job_metrics
+from repository.rag import add_doc, bump_corpus_version, rag_cache_stats
+from repository.embeddings import embed_cache_stats
+from repository.http_pool import pool_stats
+from repository.llm_cache import cache_stats
+from repository.llm_client import llm_status
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, insert
 
 from models import Upload, Job, Result, SessionLocal, RagDoc  
+from models.Enums import JobStatus
+from settings import JOB_BACKEND, EVALUATE_BATCH_MAX, UPLOAD_ASYNC_EXTRACT
 
 router = APIRouter(tags=["api"])
 
@@ -32,11 +44,64 @@ RAG_DIR = UPLOAD_DIR / "rag"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 RAG_DIR.mkdir(parents=True, exist_ok=True)
 
+async def _extract(path: Path, max_chars: Optional[int] = None) -> str:
+    try:
+        return await extract_text_async(str(path), max_chars)
+    except ExtractBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ExtractTimeoutError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+async def _save(file: UploadFile, dest: Path):
+    try:
+        return await save_upload(file, dest)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+def _cached_text(db: Session, stored: StoredFile) -> Optional[str]:
+    """Teks dari upload lain dengan hash sama (file lama dipakai ulang); None kalau belum ada."""
+    hit = find_extracted(db, stored.sha256)
+    if hit is None:
+        return None
+    reuse_stored(stored, hit[0])
+    EXTRACT_TASKS.inc(kind=sniff_type(str(stored.path)), outcome="dedup")
+    return hit[1]
+
+async def _text_for(db: Session, stored: StoredFile) -> str:
+    text = _cached_text(db, stored)
+    return text if text is not None else await _extract(stored.path)
+
 # ---- Healthcheck ----
 @router.get("/health")
 def health() -> dict:
     return {"status": "ok"}
 
+# ---- Statistik pool HTTP (LLM/embeddings) ----
+@router.get("/llm/pool")
+def llm_pool() -> dict:
+    return {"clients": pool_stats()}
+
+@router.get("/llm/breaker")
+def llm_breaker() -> dict:
+    return llm_status()
+
+@router.get("/llm/cache")
+def llm_cache() -> dict:
+    return cache_stats()
+
+@router.get("/stats/pipeline")
+def pipeline_stats(limit: int = 500, db: Session = Depends(get_db)) -> dict:
+    """Agregasi detail_scores.metrics dari `limit` result terakhir."""
+    limit = max(1, min(limit, 10000))
+    rows = db.execute(
+        select(Result.detail_scores["metrics"]).order_by(Result.created_at.desc()).limit(limit)
+    ).scalars().all()
+    return aggregate_job_metrics(rows)
+
+@router.get("/rag/cache")
+def rag_cache() -> dict:
+    return {**rag_cache_stats(), "embeddings": embed_cache_stats()}
+
 # ---- Upload rubric/JD ke vector DB (buat bisa tandai 'current') ----
 @router.post("/rag/upload")
 async def rag_upload(
@@ -51,10 +116,9 @@ async def rag_upload(
     ext = Path(file.filename).suffix.lower()
     tmp_name = f"rag_{uuid.uuid4()}{ext}"
     tmp_path = (RAG_DIR / tmp_name).resolve()
-    with tmp_path.open("wb") as f:
-        f.write(await file.read())
+    stored = await _save(file, tmp_path)
 
-    text = extract_text_from_file(str(tmp_path))
+    text = await _extract(tmp_path, max_chars=0)  # rubrik/JD disimpan utuh
     tag_list = [t.strip() for t in (tags.split(",") if tags else []) if t.strip()]
 
     # simpan dokumen baru
@@ -79,6 +143,7 @@ async def rag_upload(
         # 2) tambahkan tag 'current' ke dokumen baru
         row.tags = list({*(row.tags or []), 'current'})
         db.add(row)
+        bump_corpus_version(db)
         db.commit()
         db.refresh(row)
 
@@ -89,13 +154,16 @@ async def rag_upload(
         "tags": row.tags,
         "stored": True,
         "current": make_current,
+        "sha256": stored.sha256,
     }
 
 # ---- Upload CV & Project Report ----
 @router.post("/upload")
 async def upload_files(
+    background: BackgroundTasks,
     cv: UploadFile = File(...),
     project_report: UploadFile = File(...),
+    async_extract: Optional[bool] = Query(None),       # default: UPLOAD_ASYNC_EXTRACT
     db: Session = Depends(get_db),
 ):
     allowed = {".pdf", ".docx", ".txt"}
@@ -109,20 +177,58 @@ async def upload_files(
     cv_path = UPLOAD_DIR / cv_name
     pr_path = UPLOAD_DIR / pr_name
 
-    with cv_path.open("wb") as f:
-        f.write(await cv.read())
-    with pr_path.open("wb") as f:
-        f.write(await project_report.read())
+    cv_file = await _save(cv, cv_path)
+    try:
+        pr_file = await _save(project_report, pr_path)
+    except HTTPException:
+        cv_path.unlink(missing_ok=True)
+        raise
 
-    cv_text = extract_text_from_file(str(cv_path))
-    pr_text = extract_text_from_file(str(pr_path))
+    if UPLOAD_ASYNC_EXTRACT if async_extract is None else async_extract:
+        # simpan file saja; ekstraksi jalan di background (job /evaluate menunggu atau mengambil alih)
+        cv_text, pr_text = _cached_text(db, cv_file), _cached_text(db, pr_file)
+        status = ExtractionStatus.done if cv_text is not None and pr_text is not None else ExtractionStatus.pending
+    else:
+        cv_text, pr_text = await asyncio.gather(_text_for(db, cv_file), _text_for(db, pr_file))
+        status = ExtractionStatus.done
 
-    up = Upload(cv_path=str(cv_path), report_path=str(pr_path), cv_text=cv_text, project_text=pr_text)
+    up = Upload(
+        cv_path=str(cv_file.path),
+        report_path=str(pr_file.path),
+        cv_text=cv_text,
+        project_text=pr_text,
+        cv_sha256=cv_file.sha256,
+        report_sha256=pr_file.sha256,
+        extractor_version=EXTRACTOR_VERSION,
+        extraction_status=status,
+    )
     db.add(up)
     db.commit()
     db.refresh(up)
+    if status == ExtractionStatus.pending:
+        background.add_task(run_upload_extraction, up.id)
 
-    return {"upload_id": str(up.id), "cv_path": cv_name, "report_path": pr_name}
+    return {
+        "upload_id": str(up.id),
+        "cv_path": cv_file.path.name,
+        "report_path": pr_file.path.name,
+        "cv_sha256": cv_file.sha256,
+        "report_sha256": pr_file.sha256,
+        "extraction_status": status.value,
+    }
+
+@router.get("/upload/{upload_id}")
+def upload_status(upload_id: uuid.UUID, db: Session = Depends(get_db)):
+    up = db.get(Upload, upload_id)
+    if not up:
+        raise HTTPException(status_code=404, detail="upload not found")
+    return {
+        "upload_id": str(up.id),
+        "extraction_status": up.extraction_status.value,
+        "error": up.extraction_error,
+        "cv_chars": len(up.cv_text) if up.cv_text is not None else None,
+        "report_chars": len(up.project_text) if up.project_text is not None else None,
+    }
 
 # ---- Evaluate & Result ----
 class EvaluateRequest(BaseModel):
@@ -137,6 +243,8 @@ def evaluate(
     upload = db.get(Upload, body.upload_id)
     if not upload:
         raise HTTPException(status_code=404, detail="upload not found")
+    if upload.extraction_status == ExtractionStatus.failed:
+        raise HTTPException(status_code=409, detail={"message": "text extraction failed", "error": upload.extraction_error})
 
     job = Job(upload_id=upload.id)  # default status=queued
     db.add(job)
@@ -144,9 +252,51 @@ def evaluate(
     db.refresh(job)
 
     # Tanpa parameter role: pipeline akan membaca konteks dari vector DB
-    background.add_task(run_pipeline_background, job.id)
+    # JOB_BACKEND=queue: job cukup tersimpan 'queued', worker.py yang mengambilnya
+    if JOB_BACKEND != "queue":
+        background.add_task(run_pipeline_background, job.id)
     return {"id": str(job.id), "status": job.status.value}
 
+class EvaluateBatchRequest(BaseModel):
+    upload_ids: List[uuid.UUID]
+
+@router.post("/evaluate/batch")
+def evaluate_batch(
+    body: EvaluateBatchRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    upload_ids = body.upload_ids
+    if not upload_ids:
+        raise HTTPException(status_code=400, detail="upload_ids must not be empty")
+    if len(upload_ids) > EVALUATE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"too many upload_ids (max {EVALUATE_BATCH_MAX})")
+
+    found = dict(db.execute(
+        select(Upload.id, Upload.extraction_status).where(Upload.id.in_(set(upload_ids)))
+    ).all())
+    missing = [str(u) for u in upload_ids if u not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "upload not found", "upload_ids": missing})
+    failed = [str(u) for u in dict.fromkeys(upload_ids) if found[u] == ExtractionStatus.failed]
+    if failed:
+        raise HTTPException(status_code=409, detail={"message": "text extraction failed", "upload_ids": failed})
+
+    # satu INSERT multi-row + satu commit untuk seluruh batch
+    rows = [{"id": uuid.uuid4(), "upload_id": u, "status": JobStatus.queued} for u in upload_ids]
+    db.execute(insert(Job).values(rows))
+    db.commit()
+
+    job_ids = [r["id"] for r in rows]
+    if JOB_BACKEND != "queue":
+        # konteks RAG dihitung sekali untuk semua job di batch ini
+        background.add_task(run_pipeline_batch, job_ids)
+    return {
+        "ids": [str(j) for j in job_ids],
+        "count": len(job_ids),
+        "status": JobStatus.queued.value,
+    }
+
 @router.get("/result/{job_id}")
 def result(job_id: uuid.UUID, debug: bool = False, db: Session = Depends(get_db)):
     job = db.get(Job, job_id)
@@ -1,4 +1,5 @@
 import os
+import warnings
 from core.utils import getenv_bool, getenv_int, getenv_float
 
 if os.environ.get("ENVIRONTMENT", "dev") != "prod":
@@ -29,6 +30,16 @@ EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "mock")
 EMBED_DIM = getenv_int("EMBED_DIM", 768)
 EMBED_BASE_URL = os.getenv("EMBED_BASE_URL", "https://api.groq.com/openai/v1")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+# batch ke provider: dibatasi jumlah item & total karakter per request
+EMBED_BATCH_SIZE = getenv_int("EMBED_BATCH_SIZE", 64)
+EMBED_BATCH_MAX_CHARS = getenv_int("EMBED_BATCH_MAX_CHARS", 200000)
+EMBED_CACHE_MAX_ENTRIES = getenv_int("EMBED_CACHE_MAX_ENTRIES", 4096)
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")  # kosong = hanya memory
+EMBED_CACHE_DISK_MAX_MB = getenv_float("EMBED_CACHE_DISK_MAX_MB", 256.0)
+# Cache konteks RAG (rubric/JD) per corpus version; invalidasi lintas proses via LISTEN/NOTIFY
+RAG_CTX_CACHE_ENABLED = getenv_bool("RAG_CTX_CACHE_ENABLED", True)
+RAG_CTX_CACHE_TTL_SEC = getenv_float("RAG_CTX_CACHE_TTL_SEC", 600.0)
+RAG_CTX_CACHE_FALLBACK_TTL_SEC = getenv_float("RAG_CTX_CACHE_FALLBACK_TTL_SEC", 30.0)
 
 USE_LLM = getenv_bool("USE_LLM", True)
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "mock")
@@ -37,5 +48,105 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 LLM_TIMEOUT_SEC = getenv_float("LLM_TIMEOUT_SEC", 30.0)
 LLM_RETRIES = getenv_int("LLM_RETRIES", 1)
 LLM_FAILOPEN = getenv_bool("LLM_FAILOPEN", True)
+# Streaming SSE: respons JSON ditutup begitu objek top-level lengkap (+ metrik TTFT)
+LLM_STREAM = getenv_bool("LLM_STREAM", False)
+# Retry: exponential backoff + full jitter, Retry-After dari server dihormati
+LLM_RETRY_BASE_DELAY_SEC = getenv_float("LLM_RETRY_BASE_DELAY_SEC", 0.5)
+LLM_RETRY_MAX_DELAY_SEC = getenv_float("LLM_RETRY_MAX_DELAY_SEC", 20.0)
+# Token bucket client-side (0 = nonaktif); backend "local" (per proses) | "redis" (lintas proses)
+LLM_RATE_LIMIT_RPM = getenv_int("LLM_RATE_LIMIT_RPM", 0)
+LLM_RATE_LIMIT_TPM = getenv_int("LLM_RATE_LIMIT_TPM", 0)
+LLM_RATE_LIMIT_BACKEND = os.getenv("LLM_RATE_LIMIT_BACKEND", "local")
+LLM_RATE_LIMIT_MAX_WAIT_SEC = getenv_float("LLM_RATE_LIMIT_MAX_WAIT_SEC", 60.0)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Circuit breaker: kalau provider error/lambat, stage langsung pakai heuristik
+LLM_CB_ENABLED = getenv_bool("LLM_CB_ENABLED", True)
+LLM_CB_WINDOW_SEC = getenv_float("LLM_CB_WINDOW_SEC", 60.0)
+LLM_CB_MIN_CALLS = getenv_int("LLM_CB_MIN_CALLS", 4)
+LLM_CB_ERROR_RATE = getenv_float("LLM_CB_ERROR_RATE", 0.5)
+LLM_CB_SLOW_CALL_SEC = getenv_float("LLM_CB_SLOW_CALL_SEC", 20.0)
+LLM_CB_OPEN_SEC = getenv_float("LLM_CB_OPEN_SEC", 30.0)
+LLM_CB_HALF_OPEN_CALLS = getenv_int("LLM_CB_HALF_OPEN_CALLS", 1)
+
+# Pool HTTP bersama untuk LLM & embeddings (keep-alive)
+HTTP_POOL_MAX_CONNECTIONS = getenv_int("HTTP_POOL_MAX_CONNECTIONS", 20)
+HTTP_POOL_MAX_KEEPALIVE = getenv_int("HTTP_POOL_MAX_KEEPALIVE", 10)
+HTTP_POOL_KEEPALIVE_SEC = getenv_float("HTTP_POOL_KEEPALIVE_SEC", 60.0)
+HTTP_POOL_HTTP2 = getenv_bool("HTTP_POOL_HTTP2", False)
+
+# Cache respons LLM (key = hash model+prompt+parameter)
+LLM_CACHE_ENABLED = getenv_bool("LLM_CACHE_ENABLED", True)
+LLM_CACHE_TTL_SEC = getenv_float("LLM_CACHE_TTL_SEC", 7 * 24 * 3600.0)
+LLM_CACHE_MAX_ENTRIES = getenv_int("LLM_CACHE_MAX_ENTRIES", 2048)
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache/llm")  # kosong = tanpa tier disk
+LLM_CACHE_DISK_MAX_MB = getenv_float("LLM_CACHE_DISK_MAX_MB", 256.0)
+LLM_CACHE_SAMPLED = getenv_bool("LLM_CACHE_SAMPLED", False)  # cache juga panggilan temperature > 0
+
+# Stage P1..P4 yang saling independen dijalankan paralel
+PIPELINE_MAX_WORKERS = getenv_int("PIPELINE_MAX_WORKERS", 4)
+# Batch: jumlah job paralel dan batas upload_id per request /evaluate/batch
+PIPELINE_BATCH_CONCURRENCY = getenv_int("PIPELINE_BATCH_CONCURRENCY", 4)
+EVALUATE_BATCH_MAX = getenv_int("EVALUATE_BATCH_MAX", 1000)
+# "staged" = P1..P4 (4 panggilan) | "fused" = P1 + satu prompt gabungan P2/P3/P4 (2 panggilan)
+PIPELINE_MODES = ("staged", "fused")
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "staged").strip().lower()
+if PIPELINE_MODE not in PIPELINE_MODES:
+    warnings.warn(f"PIPELINE_MODE={PIPELINE_MODE!r} is not one of {', '.join(PIPELINE_MODES)}; using 'staged'")
+    PIPELINE_MODE = "staged"
+# Metrik Prometheus (/metrics); METRICS_MULTIPROC_DIR wajib kalau API/worker jalan >1 proses
+METRICS_ENABLED = getenv_bool("METRICS_ENABLED", True)
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SEC = getenv_float("METRICS_FLUSH_SEC", 5.0)
+# Access log: satu record per request; path dikecualikan / di-sampling ("/path" atau prefix "/path/*")
+ACCESS_LOG_EXCLUDE_PATHS = os.getenv("ACCESS_LOG_EXCLUDE_PATHS", "/health,/ready,/metrics")
+ACCESS_LOG_SAMPLE_RATE = getenv_float("ACCESS_LOG_SAMPLE_RATE", 1.0)
+ACCESS_LOG_SAMPLE_RULES = os.getenv("ACCESS_LOG_SAMPLE_RULES", "")  # mis. "/result/*=0.1,/llm/*=0.05"
+ACCESS_LOG_SLOW_MS = getenv_float("ACCESS_LOG_SLOW_MS", 1000.0)  # request lambat & 5xx selalu di-log
+# Logging: handler stdout/file ditulis thread background; antrean penuh -> record dibuang & dihitung
+LOG_QUEUE_ENABLED = getenv_bool("LOG_QUEUE_ENABLED", True)
+LOG_QUEUE_SIZE = getenv_int("LOG_QUEUE_SIZE", 10000)
+# Budget token input per prompt (CV/laporan/konteks RAG dipilih per section kalau melebihi)
+PROMPT_BUDGET_P1 = getenv_int("PROMPT_BUDGET_P1", 5000)
+PROMPT_BUDGET_P2 = getenv_int("PROMPT_BUDGET_P2", 5000)
+PROMPT_BUDGET_P3 = getenv_int("PROMPT_BUDGET_P3", 10000)
+PROMPT_BUDGET_P4 = getenv_int("PROMPT_BUDGET_P4", 2000)
+PROMPT_BUDGET_FUSED = getenv_int("PROMPT_BUDGET_FUSED", 12000)
+# Upload: batas body request ditolak saat diterima; batas per tipe dicek saat salin per chunk + SHA-256 (setelah spool)
+UPLOAD_MAX_MB_PDF = getenv_float("UPLOAD_MAX_MB_PDF", 20.0)
+UPLOAD_MAX_MB_DOCX = getenv_float("UPLOAD_MAX_MB_DOCX", 20.0)
+UPLOAD_MAX_MB_TXT = getenv_float("UPLOAD_MAX_MB_TXT", 5.0)
+UPLOAD_MAX_BODY_MB = getenv_float("UPLOAD_MAX_BODY_MB", 45.0)  # ditolak saat diterima; 0 = tanpa batas
+UPLOAD_CHUNK_KB = getenv_int("UPLOAD_CHUNK_KB", 1024)
+# Upload async: /upload langsung mengembalikan upload_id, teks diekstrak di background
+UPLOAD_ASYNC_EXTRACT = getenv_bool("UPLOAD_ASYNC_EXTRACT", False)
+UPLOAD_EXTRACT_WAIT_SEC = getenv_float("UPLOAD_EXTRACT_WAIT_SEC", 150.0)  # heartbeat diam selama ini -> diambil alih
+# Ekstraksi teks upload di process pool terpisah (0 = thread pool proses API)
+EXTRACT_POOL_SIZE = getenv_int("EXTRACT_POOL_SIZE", 2)
+EXTRACT_TIMEOUT_SEC = getenv_float("EXTRACT_TIMEOUT_SEC", 60.0)
+EXTRACT_MAX_PAGES = getenv_int("EXTRACT_MAX_PAGES", 100)  # 0 = tanpa batas
+# PDF berhenti diekstrak setelah ~N karakter (budget prompt terbesar P3 ~10000 token x 4); 0 = tanpa batas
+EXTRACT_MAX_CHARS = getenv_int("EXTRACT_MAX_CHARS", 40000)
+EXTRACT_PDF_PAGES_PER_TASK = getenv_int("EXTRACT_PDF_PAGES_PER_TASK", 4)  # range halaman per task pool
+EXTRACT_MAX_TASKS_PER_CHILD = getenv_int("EXTRACT_MAX_TASKS_PER_CHILD", 50)  # proses didaur ulang (memori pdfminer)
+EXTRACT_MAX_PENDING = getenv_int("EXTRACT_MAX_PENDING", 32)  # antrean penuh -> 503
+EXTRACT_PROFILES = ("default", "fast", "raw")  # profil ekstraksi PDF, lihat repository/extract_text.py
+EXTRACT_PROFILE = os.getenv("EXTRACT_PROFILE", "default").strip().lower()
+if EXTRACT_PROFILE not in EXTRACT_PROFILES:
+    # jangan sampai setiap upload PDF gagal (dan upload async ditandai failed) karena typo
+    warnings.warn(f"EXTRACT_PROFILE={EXTRACT_PROFILE!r} is not one of {', '.join(EXTRACT_PROFILES)}; using 'default'")
+    EXTRACT_PROFILE = "default"
+
+# Eksekusi job: "background" (BackgroundTasks di proses API) | "queue" (worker.py terpisah)
+JOB_BACKENDS = ("background", "queue")
+JOB_BACKEND = os.getenv("JOB_BACKEND", "background").strip().lower()
+if JOB_BACKEND not in JOB_BACKENDS:
+    warnings.warn(f"JOB_BACKEND={JOB_BACKEND!r} is not one of {', '.join(JOB_BACKENDS)}; using 'background'")
+    JOB_BACKEND = "background"
+WORKER_PROCESSES = getenv_int("WORKER_PROCESSES", 1)
+WORKER_CONCURRENCY = getenv_int("WORKER_CONCURRENCY", 2)
+JOB_POLL_INTERVAL_SEC = getenv_float("JOB_POLL_INTERVAL_SEC", 1.0)
+JOB_HEARTBEAT_SEC = getenv_float("JOB_HEARTBEAT_SEC", 30.0)
+JOB_VISIBILITY_TIMEOUT_SEC = getenv_float("JOB_VISIBILITY_TIMEOUT_SEC", 900.0)
+JOB_MAX_ATTEMPTS = getenv_int("JOB_MAX_ATTEMPTS", 3)  # claim ke-N yang stale -> failed; 0 = tanpa batas
 
 SENTRY_DSN = os.getenv("SENTRY_DSN", "")
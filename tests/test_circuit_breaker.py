@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from repository import llm_client
+from repository.llm_client import CircuitBreaker, GroqLLM
+from repository.rate_limit import RateLimitTimeout
+
+
+def _tripped(open_sec: float = 0.05, half_open_calls: int = 1) -> CircuitBreaker:
+    cb = CircuitBreaker(window_sec=60, min_calls=2, error_rate=0.5, slow_call_sec=60,
+                        open_sec=open_sec, half_open_calls=half_open_calls)
+    cb.record(False, 0.01)
+    cb.record(False, 0.01)
+    assert cb.state == CircuitBreaker.OPEN
+    return cb
+
+
+def test_half_open_probe_success_closes():
+    cb = _tripped()
+    time.sleep(0.06)
+    assert cb.allow()
+    assert not cb.allow()
+    cb.record(True, 0.01)
+    assert cb.state == CircuitBreaker.CLOSED
+
+
+def test_released_probe_can_be_reused():
+    cb = _tripped()
+    time.sleep(0.06)
+    assert cb.allow()
+    cb.release_probe()
+    assert cb.allow()
+
+
+def test_unanswered_probe_reopens_then_probes_again():
+    cb = _tripped()
+    time.sleep(0.06)
+    assert cb.allow()  # probe keluar dan tidak pernah di-record
+    assert [cb.allow() for _ in range(3)] == [False, False, False]
+    time.sleep(0.06)
+    assert cb.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert cb.state == CircuitBreaker.HALF_OPEN
+    assert cb.allow()
+
+
+class _TimeoutLimiter:
+    def acquire(self, tokens: int = 0) -> float:
+        raise RateLimitTimeout("rate limiter wait exceeds budget")
+
+    def pause(self, sec: float) -> None:
+        pass
+
+
+def test_rate_limit_timeout_releases_half_open_probe(monkeypatch):
+    monkeypatch.setattr(llm_client, "get_rate_limiter", lambda: _TimeoutLimiter())
+    llm = GroqLLM(api_key="test-key", base_url="http://127.0.0.1:9")
+    llm.retries = 0
+    llm.failopen = False
+    llm.breaker = _tripped()
+    time.sleep(0.06)
+
+    with pytest.raises(RateLimitTimeout):
+        llm._chat([{"role": "user", "content": "hi"}], 0.1, 16, force_json=True, use_cache=False)
+
+    assert llm.breaker.state == CircuitBreaker.HALF_OPEN
+    assert llm.breaker.allow()
@@ -0,0 +1,39 @@
+import hashlib
+import math
+
+import numpy as np
+import pytest
+
+from repository.embeddings import _hash_embed, _hash_embed_matrix
+
+TEXTS = ["", "Jane Doe - Backend Engineer", "python fastapi postgresql " * 50, "ünïcödé ✓", "x" * 9000]
+
+
+def _hash_embed_reference(text, dim):
+    # implementasi per-float lama (sebelum versi NumPy)
+    text = (text or "")[:8000]
+    vec = []
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    counter = 0
+    while len(vec) < dim:
+        h = hashlib.sha256(seed + counter.to_bytes(4, "little")).digest()
+        for i in range(0, len(h), 4):
+            if len(vec) >= dim:
+                break
+            vec.append((int.from_bytes(h[i:i + 4], "little") / 2**32) * 2.0 - 1.0)
+        counter += 1
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+@pytest.mark.parametrize("dim", [1, 7, 8, 384, 770])
+def test_hash_embed_matrix_matches_per_float_reference(dim):
+    expected = np.array([_hash_embed_reference(t, dim) for t in TEXTS])
+    mat = _hash_embed_matrix(TEXTS, dim)
+    assert mat.shape == (len(TEXTS), dim)
+    assert np.allclose(mat, expected, atol=1e-6)
+    assert np.allclose([_hash_embed(t, dim) for t in TEXTS], expected, atol=1e-6)
+
+
+def test_hash_embed_matrix_empty():
+    assert _hash_embed_matrix([], 8).shape == (0, 8)
@@ -0,0 +1,76 @@
+import pytest
+
+from repository import extract_pool
+from repository.extract_text import _read_pdf
+
+
+def _write_pdf(path, pages: int, lines: int = 40) -> None:
+    """PDF teks minimal: `pages` halaman, tiap baris menyebut nomor halaman & baris."""
+    font_id = 3 + 2 * pages
+    objs = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(pages))}] /Count {pages} >>",
+    ]
+    for i in range(pages):
+        body = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(
+            f"(Page {i + 1} line {j + 1}: backend python fastapi postgres redis) '" for j in range(lines)
+        ) + " ET"
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out, offsets = "%PDF-1.4\n", []
+    for num, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    path.write_text(out, encoding="latin-1")
+
+
+@pytest.fixture(scope="module")
+def pdf_30_pages(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "report.pdf"
+    _write_pdf(path, 30)
+    return path
+
+
+@pytest.fixture
+def parallel_pool(monkeypatch):
+    monkeypatch.setattr(extract_pool, "EXTRACT_POOL_SIZE", 3)
+    monkeypatch.setattr(extract_pool, "EXTRACT_PDF_PAGES_PER_TASK", 4)
+    monkeypatch.setattr(extract_pool, "EXTRACT_MAX_PAGES", 0)
+    monkeypatch.setattr(extract_pool, "EXTRACT_TIMEOUT_SEC", 120.0)
+    yield
+    extract_pool.shutdown_extract_pool()
+
+
+@pytest.mark.parametrize("budget", [0, 500, 12345, 40000, 10 ** 7])
+def test_page_parallel_matches_sequential(parallel_pool, pdf_30_pages, budget):
+    expected = _read_pdf(str(pdf_30_pages), max_pages=0, max_chars=budget)
+    assert extract_pool.extract_text_sync(str(pdf_30_pages), max_chars=budget) == expected
+
+
+@pytest.mark.parametrize("budget", [0, 12345])
+def test_page_parallel_respects_page_cap(parallel_pool, monkeypatch, pdf_30_pages, budget):
+    monkeypatch.setattr(extract_pool, "EXTRACT_MAX_PAGES", 10)
+    expected = _read_pdf(str(pdf_30_pages), max_pages=10, max_chars=budget)
+    text = extract_pool.extract_text_sync(str(pdf_30_pages), max_chars=budget)
+    assert text == expected
+    assert "Page 11 " not in text
+
+
+def _results(pages):
+    # (teks, mulai, durasi, halaman, eof) seperti timed_extract_pages
+    return [("".join(f"p{n}{'.' * 9}\x0c" for n in chunk), 0.0, 0.0, len(chunk), eof) for chunk, eof in pages]
+
+
+def test_merge_cuts_at_page_boundary_and_stops():
+    merge = extract_pool._PdfMerge(max_chars=25)
+    merge.add(_results([([0, 1], False), ([2, 3], False), ([4, 5], False)]))
+    text = merge.result()[0]
+    assert text == "p0.........\x0cp1.........\x0cp2.........\x0c"
+    assert merge.done
@@ -0,0 +1,50 @@
+import pytest
+
+from repository import llm_client
+from repository.llm_client import MockLLM, close_llm, get_llm, llm_status
+
+
+class _FakeGroq:
+    pass
+
+
+@pytest.fixture
+def flaky_groq(monkeypatch):
+    calls = {"n": 0, "fail": True}
+
+    def build():
+        calls["n"] += 1
+        if calls["fail"]:
+            raise RuntimeError("groq down")
+        return _FakeGroq()
+
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "groq")
+    monkeypatch.setattr(llm_client, "LLM_FAILOPEN", True)
+    monkeypatch.setattr(llm_client, "GroqLLM", build)
+    close_llm()
+    yield calls
+    close_llm()
+
+
+def test_mock_fallback_is_not_cached(flaky_groq, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_client.time, "monotonic", lambda: now[0])
+
+    assert isinstance(get_llm(), MockLLM)
+    assert llm_status()["fallback"] is True
+    assert isinstance(get_llm(), MockLLM)
+    assert flaky_groq["n"] == 1  # masih dalam interval retry
+
+    flaky_groq["fail"] = False
+    now[0] += llm_client._LLM_RETRY_SEC + 1
+    llm = get_llm()
+    assert isinstance(llm, _FakeGroq)
+    assert get_llm() is llm
+    assert flaky_groq["n"] == 2
+    assert llm_status()["fallback"] is False
+
+
+def test_init_error_raised_without_failopen(flaky_groq, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_FAILOPEN", False)
+    with pytest.raises(RuntimeError):
+        get_llm()
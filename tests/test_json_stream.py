@@ -0,0 +1,56 @@
+import json
+
+from repository.json_stream import JsonObjectScanner
+
+
+def _feed_all(chunks):
+    scanner = JsonObjectScanner()
+    stopped_at = None
+    for i, chunk in enumerate(chunks):
+        if scanner.feed(chunk) and stopped_at is None:
+            stopped_at = i
+    return scanner, stopped_at
+
+
+def test_braces_inside_strings_are_ignored():
+    obj = '{"feedback": "uses {braces} and [brackets] }}", "n": 1}'
+    scanner, _ = _feed_all([obj])
+    assert scanner.done
+    assert scanner.value == {"feedback": "uses {braces} and [brackets] }}", "n": 1}
+
+
+def test_escaped_quotes_do_not_end_string():
+    obj = json.dumps({"quote": 'he said "}" then \\ left', "ok": True})
+    scanner, _ = _feed_all([obj])
+    assert scanner.result == obj
+    assert scanner.value["ok"] is True
+
+
+def test_leading_fence_and_preamble_are_skipped():
+    text = 'Sure! Scores {see below}:\n```json\n{"skills": 4, "exp": 3}\n```'
+    scanner, _ = _feed_all([text])
+    assert scanner.result == '{"skills": 4, "exp": 3}'
+    assert scanner.value == {"skills": 4, "exp": 3}
+
+
+def test_stops_before_trailing_padding():
+    chunks = ['{"a": [1, 2', ']}', "\n```", "\n\n   ", "more tokens"]
+    scanner, stopped_at = _feed_all(chunks)
+    assert stopped_at == 1
+    assert scanner.result == '{"a": [1, 2]}'
+    assert scanner.feed('{"b": 2}')  # sudah selesai: potongan berikutnya diabaikan
+    assert scanner.value == {"a": [1, 2]}
+
+
+def test_object_split_across_chunks():
+    obj = json.dumps({"summary": 'line {1}\\n "quoted" \\\\', "scores": {"x": [1, {"y": 2}]}})
+    scanner, stopped_at = _feed_all(["```json\n"] + list(obj))
+    assert stopped_at == len(obj)
+    assert scanner.result == obj
+    assert scanner.value == json.loads(obj)
+
+
+def test_incomplete_object_is_not_done():
+    scanner, _ = _feed_all(['{"a": "unterminated }', " still string"])
+    assert not scanner.done
+    assert scanner.result is None
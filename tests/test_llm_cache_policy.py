@@ -0,0 +1,68 @@
+import pytest
+
+from repository import llm_client
+from repository.llm_client import GroqLLM, _cacheable
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return (self.data[key], "memory") if key in self.data else (None, None)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+@pytest.mark.parametrize("out, force_json, temperature, expected", [
+    ('{"skills": 4}', True, 0.0, True),
+    ('```json\n{"skills": 4}\n```', True, 0.0, True),
+    ('{"skills": 4, "feedback": "trunc', True, 0.0, False),   # stream terpotong
+    ("I cannot score this CV.", True, 0.0, False),            # prosa
+    ("{}", True, 0.0, False),
+    ("[1, 2]", True, 0.0, False),
+    ("plain text answer", False, 0.0, True),
+    ('{"skills": 4}', True, 0.2, False),                     # sampling
+    ("", False, 0.0, False),
+])
+def test_cacheable(out, force_json, temperature, expected):
+    assert _cacheable(out, force_json, temperature) is expected
+
+
+def test_sampled_calls_cached_when_opted_in(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_CACHE_SAMPLED", True)
+    assert _cacheable('{"skills": 4}', True, 0.2)
+
+
+def _llm(monkeypatch, cache, reply):
+    monkeypatch.setattr(llm_client, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(llm_client, "get_rate_limiter", lambda: None)
+    llm = GroqLLM(api_key="test-key", base_url="http://127.0.0.1:9")
+    llm.breaker = None
+    monkeypatch.setattr(llm, "_chat_once", lambda *a, **kw: reply)
+    return llm
+
+
+def test_invalid_json_reply_is_not_cached(monkeypatch):
+    cache = _DictCache()
+    llm = _llm(monkeypatch, cache, '{"skills": 4, "exp": ')
+    assert llm.generate_json("score this", temperature=0.0) == {}
+    assert cache.data == {}
+
+
+def test_valid_json_reply_is_cached_and_replayed(monkeypatch):
+    cache = _DictCache()
+    llm = _llm(monkeypatch, cache, '{"skills": 4}')
+    assert llm.generate_json("score this", temperature=0.0) == {"skills": 4}
+    assert len(cache.data) == 1
+    monkeypatch.setattr(llm, "_chat_once", lambda *a, **kw: pytest.fail("should be served from cache"))
+    assert llm.generate_json("score this", temperature=0.0) == {"skills": 4}
+    assert llm.last_cache == "memory"
+
+
+def test_sampled_call_skips_cache(monkeypatch):
+    cache = _DictCache()
+    llm = _llm(monkeypatch, cache, '{"overall_summary": "ok"}')
+    llm.generate_json("summarize", temperature=0.2)
+    assert cache.data == {}
@@ -0,0 +1,42 @@
+from repository.pipeline import _llm_stages
+
+
+class _FailOpenLLM:
+    """Meniru GroqLLM dengan LLM_FAILOPEN: retry habis -> "{}" dan last_error fail-open."""
+
+    last_raw = None
+    last_metrics = None
+
+    def __init__(self):
+        self.last_error = None
+
+    def available(self) -> bool:
+        return True
+
+    def generate_json(self, prompt: str, **kwargs) -> dict:
+        self.last_error = "fail-open after retries: HTTP 503"
+        return {}
+
+
+def test_fail_open_stages_use_heuristics():
+    warnings, engines = [], {}
+    stages = _llm_stages(
+        _FailOpenLLM(),
+        cv_text="Backend engineer, 5 years python fastapi postgresql redis docker",
+        project_text="REST API with retry, backoff and unit test coverage",
+        cv_ctx="",
+        project_ctx="",
+        job_title="Backend Engineer",
+        warnings=warnings,
+        llm_raw={},
+        engines=engines,
+        llm_metrics={},
+        prompt_tokens={},
+    )
+    out = {}
+    for stage in stages:
+        out[stage.name] = stage.fn({d: out[d] for d in stage.deps})
+
+    assert set(engines.values()) == {"heuristic"}
+    assert all("fail-open" in w for w in warnings)
+    assert out["p2_cv_score"]["feedback"].startswith("Matched")
@@ -0,0 +1,63 @@
+from repository.prompt_packing import estimate_tokens, pack_fields, pack_text, split_sections
+
+HEADER = "Jane Doe - Backend Engineer"
+SECTIONS = [
+    HEADER,
+    "Hobbies: hiking, photography, cooking, travelling around the archipelago " * 3,
+    "Experience: built python fastapi services on postgresql and redis, kubernetes deploys " * 3,
+    "Volunteering: organised community events and charity runs every weekend " * 3,
+    "Projects: rag pipeline with llm re-ranking, vector search and embeddings " * 3,
+]
+CV = "\n\n".join(SECTIONS)
+
+
+def test_text_within_budget_is_returned_unchanged():
+    assert pack_text(CV, estimate_tokens(CV)) == CV
+    assert pack_text("", 0) == ""
+
+
+def test_packed_text_fits_budget_and_keeps_header():
+    budget = estimate_tokens(CV) // 2
+    out = pack_text(CV, budget, query="backend python fastapi postgresql llm rag embeddings")
+    assert estimate_tokens(out) <= budget
+    assert out.startswith(HEADER)
+
+
+def test_query_selects_relevant_sections_in_original_order():
+    budget = estimate_tokens("\n\n".join([SECTIONS[0], SECTIONS[2], SECTIONS[4]])) + 3
+    out = pack_text(CV, budget, query="python fastapi postgresql redis kubernetes rag llm vector embeddings")
+    parts = out.split("\n\n")
+    assert parts == [SECTIONS[0], SECTIONS[2], SECTIONS[4]]
+
+
+def test_without_query_cuts_at_section_boundary():
+    budget = estimate_tokens("\n\n".join(SECTIONS[:2])) + 2
+    assert pack_text(CV, budget) == "\n\n".join(SECTIONS[:2])
+
+
+def test_without_query_stops_at_first_section_that_does_not_fit():
+    text = "\n\n".join([HEADER, SECTIONS[2], "Skills: python"])
+    budget = estimate_tokens(HEADER) + estimate_tokens("Skills: python") + 2
+    assert pack_text(text, budget) == HEADER  # tidak melompati Experience untuk mengambil Skills
+
+
+def test_long_block_without_blank_lines_is_split():
+    text = "\n".join(f"line {i}: " + "word " * 30 for i in range(200))
+    sections = split_sections(text, max_tokens=100)
+    assert len(sections) > 1
+    assert all(estimate_tokens(s) <= 100 for s in sections)
+    out = pack_text(text, 900)  # section default <= 400 token: header muat
+    assert 0 < estimate_tokens(out) <= 900
+    assert out.startswith("line 0:")
+
+
+def test_budget_smaller_than_any_section_falls_back_to_prefix():
+    text = "x" * 4000
+    assert pack_text(text, 10) == "x" * 40
+
+
+def test_pack_fields_gives_leftover_budget_to_larger_fields():
+    small = "short context"
+    out = pack_fields(200, {"ctx": (small, ""), "cv": (CV, "python fastapi")})
+    assert out["ctx"] == small
+    assert estimate_tokens(out["cv"]) <= 200 - estimate_tokens(small)
@@ -0,0 +1,71 @@
+import sys
+import types
+
+import pytest
+
+from repository import rate_limit
+from repository.rate_limit import LocalRateLimiter, RedisRateLimiter
+
+
+class _RedisError(Exception):
+    pass
+
+
+class _ConnectionError(_RedisError):
+    pass
+
+
+def _fake_redis(monkeypatch, *, ping_ok: bool):
+    """Modul `redis` palsu: server tidak bisa dihubungi (ping dan/atau script gagal)."""
+
+    class Client:
+        def ping(self):
+            if not ping_ok:
+                raise _ConnectionError("Error 111 connecting to localhost:6379. Connection refused.")
+            return True
+
+        def register_script(self, _src):
+            def script(**_kw):
+                raise _ConnectionError("Connection refused")
+            return script
+
+        def get(self, _key):
+            raise _ConnectionError("Connection refused")
+
+        def set(self, *_a, **_kw):
+            raise _ConnectionError("Connection refused")
+
+    module = types.SimpleNamespace(
+        Redis=types.SimpleNamespace(from_url=lambda _url: Client()),
+        RedisError=_RedisError,
+    )
+    monkeypatch.setitem(sys.modules, "redis", module)
+
+
+@pytest.fixture
+def fresh_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiter", None)
+    monkeypatch.setattr(rate_limit, "_limiter_ready", False)
+    monkeypatch.setattr(rate_limit, "LLM_RATE_LIMIT_BACKEND", "redis")
+    monkeypatch.setattr(rate_limit, "LLM_RATE_LIMIT_RPM", 60)
+    monkeypatch.setattr(rate_limit, "LLM_RATE_LIMIT_TPM", 0)
+
+
+def test_unreachable_redis_at_startup_uses_local_limiter(monkeypatch, fresh_limiter):
+    _fake_redis(monkeypatch, ping_ok=False)
+    limiter = rate_limit.get_rate_limiter()
+    assert type(limiter) is LocalRateLimiter
+    assert limiter.acquire(0) >= 0
+
+
+def test_redis_outage_degrades_to_local_bucket(monkeypatch):
+    _fake_redis(monkeypatch, ping_ok=True)
+    limiter = RedisRateLimiter(rpm=2, tpm=0, url="redis://localhost:6379/0")
+
+    assert limiter.acquire(0) < 0.01  # tidak raise ConnectionError ke GroqLLM._chat
+    limiter.pause(0.05)
+    assert limiter.stats()["degraded"] is True
+    with pytest.raises(rate_limit.RateLimitTimeout):
+        # bucket lokal tetap membatasi: jatah rpm habis dan max_wait terlalu kecil
+        limiter.acquire(0)
+        limiter.acquire(0, max_wait=0.01)
@@ -0,0 +1,82 @@
+# worker.py
+"""
+Worker evaluasi standalone (terpisah dari API).
+
+    uv run python worker.py --processes 2 --concurrency 4
+
+Setiap proses menjalankan N thread yang meng-claim job dari tabel `jobs`
+(SELECT ... FOR UPDATE SKIP LOCKED). Set JOB_BACKEND=queue di API supaya
+/evaluate hanya enqueue dan tidak menjalankan pipeline di proses web.
+"""
+import argparse
+import multiprocessing as mp
+import signal
+import threading
+import time
+
+from core.logging_config import logger
+from settings import WORKER_CONCURRENCY, WORKER_PROCESSES
+
+
+def _process_main(concurrency: int) -> None:
+    from repository.job_queue import WorkerProcess
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    WorkerProcess(concurrency=concurrency, stop_event=stop).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluation job worker pool")
+    parser.add_argument("--processes", "-p", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--concurrency", "-c", type=int, default=WORKER_CONCURRENCY,
+                        help="concurrent jobs per process")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        logger.info("Worker starting", extra={"event_type": "worker_start", "processes": 1,
+                                               "concurrency": args.concurrency})
+        _process_main(args.concurrency)
+        return
+
+    stopping = threading.Event()
+
+    def _stop(*_):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    ctx = mp.get_context("spawn")
+    procs = {}
+
+    def _spawn(slot: int) -> None:
+        p = ctx.Process(target=_process_main, args=(args.concurrency,), name=f"worker-{slot}")
+        p.start()
+        procs[slot] = p
+
+    logger.info("Worker pool starting", extra={"event_type": "worker_start", "processes": args.processes,
+                                                "concurrency": args.concurrency})
+    for slot in range(args.processes):
+        _spawn(slot)
+
+    # supervisor: restart proses yang mati sampai diminta berhenti
+    while not stopping.wait(2.0):
+        for slot, p in list(procs.items()):
+            if not p.is_alive():
+                logger.warning("Worker process exited; restarting",
+                               extra={"event_type": "worker_restart", "slot": slot, "exitcode": p.exitcode})
+                _spawn(slot)
+
+    for p in procs.values():
+        if p.is_alive():
+            p.terminate()  # SIGTERM -> selesai graceful di child
+    deadline = time.time() + 90
+    for p in procs.values():
+        p.join(timeout=max(0.0, deadline - time.time()))
+    logger.info("Worker pool stopped", extra={"event_type": "worker_stop"})
+
+
+if __name__ == "__main__":
+    main()